@@ -2,24 +2,40 @@ from typing import TypedDict, List, Optional, Any, Dict, Annotated
 import operator
 
 from langchain_core.messages import BaseMessage
-from langgraph.graph.message import add_messages
+from credentialwatch_agent.compaction import add_messages_bounded
 
 class AgentState(TypedDict):
     """
     Common state for agents.
     """
-    messages: Annotated[List[BaseMessage], add_messages]
+    # add_messages, trimmed to the most recent turns that fit CHAT_HISTORY_MAX_TOKENS
+    messages: Annotated[List[BaseMessage], add_messages_bounded]
     # Add other common fields if needed
 
 class ExpirySweepState(TypedDict):
     """
     State for the expiry sweep graph.
     """
-    providers: List[Dict[str, Any]]
+    # Columnar expiring credentials (ExpiringBatch.to_state())
+    expiring: Dict[str, Any]
     alerts_created: int
     errors: List[str]
     summary: str
     window_days: int
+    alerts_elapsed_seconds: float
+    items_scanned: int
+    pages_fetched: int
+    full_sweep: bool
+    alerts_skipped: int
+    alerts_cursor: int
+    # Streaming sweeps: where paging continues ({"offset", "cursor", "done"})
+    page_position: Dict[str, Any]
+    streaming: bool
+    workers: int
+    partition_by: str
+    partitions: int
+    severity_counts: Dict[str, int]
+    credential_type_counts: Dict[str, int]
 
 def merge_dicts(a: Dict, b: Dict) -> Dict:
     return {**a, **b}
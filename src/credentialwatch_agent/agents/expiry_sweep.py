@@ -1,93 +1,443 @@
-from typing import Dict, Any, List
+import os
+import time
+import asyncio
+from typing import Dict, Any, List, Optional, Tuple, AsyncIterator
 from langgraph.graph import StateGraph, END
 from credentialwatch_agent.agents.common import ExpirySweepState
-from credentialwatch_agent.mcp_client import mcp_client
+from credentialwatch_agent.mcp_client import mcp_client, parse_tool_result
+from credentialwatch_agent.expiry_index import expiry_index
+from credentialwatch_agent.alert_ledger import alert_ledger, ledger_expiry, ledger_key
+from credentialwatch_agent.tracing import timed_node
+from credentialwatch_agent.sweep_partitions import partition_count, partition_items, run_partitions
+from credentialwatch_agent.sweep_batch import SEVERITIES, ExpiringBatch, classify_severity, merge_counts
+
+# Alert stage tuning. The alert Space answers in seconds, so calls are issued
+# concurrently up to ALERT_CONCURRENCY at a time.
+ALERT_CONCURRENCY = int(os.getenv("ALERT_CONCURRENCY", "8"))
+ALERT_TIMEOUT_SECONDS = float(os.getenv("ALERT_TIMEOUT_SECONDS", "30"))
+ALERT_BATCH_SIZE = int(os.getenv("ALERT_BATCH_SIZE", "100"))
+
+# Streaming sweep tuning: page size for list_expiring_credentials and how many
+# fetched pages may wait for the alert stage before fetching pauses.
+SWEEP_PAGE_SIZE = int(os.getenv("SWEEP_PAGE_SIZE", "500"))
+SWEEP_QUEUE_PAGES = int(os.getenv("SWEEP_QUEUE_PAGES", "2"))
+
+# Checkpointed progress: create_alerts handles at least SWEEP_CHECKPOINT_CHUNK items per
+# graph step, and chunks grow so a run takes at most SWEEP_MAX_CHECKPOINTS steps.
+# Each step is checkpointed with the full item list, so this bounds checkpoint volume.
+SWEEP_CHECKPOINT_CHUNK = int(os.getenv("SWEEP_CHECKPOINT_CHUNK", "500"))
+SWEEP_MAX_CHECKPOINTS = int(os.getenv("SWEEP_MAX_CHECKPOINTS", "20"))
+
+def build_alert(item: Dict[str, Any], severity: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Builds the log_alert arguments for an expiring credential item.
+    """
+    days = item.get("days_remaining", 90)
+    credential_id = item.get("credential_id")
+    return {
+        "provider_id": item.get("provider_id"),
+        "credential_id": "unknown" if credential_id is None else credential_id, # Fallback if not provided in list
+        "severity": severity or classify_severity(days),
+        "message": f"Credential {item.get('credential')} for {item.get('name')} expires in {days} days."
+    }
 
 async def fetch_expiring_credentials(state: ExpirySweepState) -> Dict[str, Any]:
     """
-    Fetches expiring credentials from the Credential DB MCP.
+    Fetches expiring credentials from the local expiry index, or from the Credential DB
+    MCP when the index cannot answer.
     """
     print("Fetching expiring credentials...")
     # We check for a window defined in state or default to 90.
     window_days = state.get("window_days", 90)
-    result = await mcp_client.call_tool(
-        "cred_db", 
-        "list_expiring_credentials", 
-        {"window_days": window_days}
-    )
-    
-    # Handle mock/real response structure
-    expiring_items = result.get("expiring", []) if isinstance(result, dict) else []
+    # Alerts are created from this list, so the index re-fetches the window first.
+    result = await expiry_index.query(window_days, fresh=True)
+    if result is None:
+        result = await mcp_client.call_tool(
+            "cred_db", 
+            "list_expiring_credentials", 
+            {"window_days": window_days}
+        )
     
-    return {"providers": expiring_items}
+        # Handle mock/real response structure
+        result = parse_tool_result(result)
+    batch = ExpiringBatch.from_rows(result.get("expiring", []) if isinstance(result, dict) else [])
+    counts = batch.counts()
 
-async def create_alerts(state: ExpirySweepState) -> Dict[str, Any]:
+    return {
+        "expiring": batch.to_state(),
+        "items_scanned": len(batch),
+        "alerts_cursor": 0,
+        "severity_counts": counts["by_severity"],
+        "credential_type_counts": counts["by_credential_type"],
+    }
+
+def supports_paging() -> bool:
+    """True if list_expiring_credentials pages by cursor or offset, which streaming sweeps need."""
+    params = (mcp_client.get_tool_schema("cred_db", "list_expiring_credentials") or {}).get("properties", {})
+    return "limit" in params and ("cursor" in params or "offset" in params)
+
+async def _page_expiring_credentials(
+    window_days: int,
+    page_size: int,
+    position: Optional[Dict[str, Any]] = None,
+) -> AsyncIterator[Tuple[List[Dict[str, Any]], Dict[str, Any], Optional[int]]]:
+    """
+    Yields (page, position after it, total if reported) for the expiring credentials,
+    starting at `position` (a position yielded earlier, for resuming).
+    Uses cursor or offset/limit paging when the tool's schema declares it. Otherwise the
+    full list is yielded as one page, so it is fetched once per run; sweeps against such
+    a server run unstreamed (see supports_paging).
+    """
+    schema = mcp_client.get_tool_schema("cred_db", "list_expiring_credentials") or {}
+    params = schema.get("properties", {})
+    supports_cursor = "cursor" in params and "limit" in params
+    supports_offset = "offset" in params and "limit" in params
+    offset = (position or {}).get("offset", 0)
+    cursor = (position or {}).get("cursor")
+
+    if not (supports_cursor or supports_offset):
+        result = parse_tool_result(await mcp_client.call_tool(
+            "cred_db", "list_expiring_credentials", {"window_days": window_days}
+        ))
+        items = result.get("expiring", []) if isinstance(result, dict) else []
+        if items[offset:]:
+            yield items[offset:], {"offset": len(items), "cursor": None}, len(items)
+        return
+
+    while True:
+        arguments = {"window_days": window_days, "limit": page_size}
+        if supports_cursor and cursor is not None:
+            arguments["cursor"] = cursor
+        elif supports_offset:
+            arguments["offset"] = offset
+        result = parse_tool_result(await mcp_client.call_tool("cred_db", "list_expiring_credentials", arguments))
+        if not isinstance(result, dict):
+            return
+
+        page = result.get("expiring", [])
+        offset += len(page)
+        cursor = result.get("next_cursor") if supports_cursor else None
+        total = result.get("total")
+        if page:
+            yield page, {"offset": offset, "cursor": cursor}, total
+
+        if supports_cursor and cursor:
+            continue
+        if page and supports_offset and (result.get("has_more") or (total is not None and offset < total)):
+            continue
+        return
+
+async def _log_alert(item: Dict[str, Any], severity: str, semaphore: asyncio.Semaphore) -> Optional[str]:
+    """
+    Logs a single alert. Returns an error string on failure, None on success.
     """
-    Creates alerts for the expiring credentials found.
+    async with semaphore:
+        try:
+            await asyncio.wait_for(
+                mcp_client.call_tool("alert", "log_alert", build_alert(item, severity)),
+                timeout=ALERT_TIMEOUT_SECONDS
+            )
+            return None
+        except asyncio.TimeoutError:
+            return f"Failed to create alert for {item}: timed out after {ALERT_TIMEOUT_SECONDS}s"
+        except Exception as e:
+            return f"Failed to create alert for {item}: {e}"
+
+async def _log_alert_batch(batch: List[Tuple[Dict[str, Any], str]], semaphore: asyncio.Semaphore) -> Optional[str]:
+    """
+    Logs a batch of alerts through the bulk log_alerts tool.
+    Returns an error string on failure, None on success.
+    """
+    async with semaphore:
+        try:
+            await asyncio.wait_for(
+                mcp_client.call_tool("alert", "log_alerts", {"alerts": [build_alert(item, severity) for item, severity in batch]}),
+                timeout=ALERT_TIMEOUT_SECONDS
+            )
+            return None
+        except asyncio.TimeoutError:
+            return f"Failed to create {len(batch)} alerts in batch: timed out after {ALERT_TIMEOUT_SECONDS}s"
+        except Exception as e:
+            return f"Failed to create {len(batch)} alerts in batch: {e}"
+
+async def _alert_items(
+    batch: ExpiringBatch,
+    semaphore: asyncio.Semaphore,
+    full: bool = False,
+) -> Tuple[int, List[str], int]:
+    """
+    Logs alerts for a batch concurrently, batching through log_alerts when available.
+    Severity is classified for the whole batch at once.
+    Unless full is set, items already in the alert ledger at the same or a higher
+    severity are skipped, and successful alerts are recorded in the ledger.
+    Returns the number of alerts created, the errors in item order and the number skipped.
     """
-    expiring_items = state.get("providers", [])
     alerts_count = 0
     errors = []
+    skipped = 0
+
+    severities = batch.severities()
+    items = [(item, SEVERITIES[code]) for item, code in zip(batch.rows(), severities.tolist())]
+    if not full:
+        flags = await alert_ledger.pending_async([(ledger_key(item), severity, ledger_expiry(item)) for item, severity in items])
+        pending = [entry for entry, flag in zip(items, flags) if flag]
+        skipped = len(items) - len(pending)
+        items = pending
+
+    sent = []
+    if items and mcp_client.has_tool("alert", "log_alerts"):
+        batches = [items[i:i + ALERT_BATCH_SIZE] for i in range(0, len(items), ALERT_BATCH_SIZE)]
+        results = await asyncio.gather(*(_log_alert_batch(chunk, semaphore) for chunk in batches))
+        for chunk, error in zip(batches, results):
+            if error is None:
+                alerts_count += len(chunk)
+                sent.extend(chunk)
+            else:
+                errors.append(error)
+    else:
+        results = await asyncio.gather(*(_log_alert(item, severity, semaphore) for item, severity in items))
+        for (item, severity), error in zip(items, results):
+            if error is None:
+                alerts_count += 1
+                sent.append((item, severity))
+            else:
+                errors.append(error)
+
+    await alert_ledger.record_async([(ledger_key(item), severity, ledger_expiry(item)) for item, severity in sent])
+    return alerts_count, errors, skipped
+
+def alert_chunk_size(total: int) -> int:
+    """Number of items create_alerts handles per graph step for a run of `total` items."""
+    return max(1, SWEEP_CHECKPOINT_CHUNK, -(-total // max(1, SWEEP_MAX_CHECKPOINTS)))
+
+async def create_alerts(state: ExpirySweepState) -> Dict[str, Any]:
+    """
+    Creates alerts for the next chunk of expiring credentials found.
+    Calls are issued concurrently (bounded by ALERT_CONCURRENCY), and sent in
+    batches when the alert server exposes a bulk log_alerts tool.
+    Errors are reported in item order. Already-alerted items are skipped unless full_sweep is set.
 
-    print(f"Found {len(expiring_items)} expiring items. Creating alerts...")
+    Progress is recorded as alerts_cursor, so a checkpointed run that stops part way
+    resumes from the last completed chunk.
+    """
+    expiring = ExpiringBatch.from_state(state.get("expiring"))
+    full = state.get("full_sweep", False)
+    start = state.get("alerts_cursor", 0)
+    end = min(len(expiring), start + alert_chunk_size(len(expiring)))
+
+    print(f"Found {len(expiring)} expiring items. Creating alerts for items {start}-{end}...")
+
+    semaphore = asyncio.Semaphore(max(1, ALERT_CONCURRENCY))
+    started = time.perf_counter()
+    alerts_count, errors, skipped = await _alert_items(expiring.slice(start, end), semaphore, full)
+    elapsed = time.perf_counter() - started
+
+    return {
+        "alerts_cursor": end,
+        "alerts_created": state.get("alerts_created", 0) + alerts_count,
+        "errors": state.get("errors", []) + errors,
+        "alerts_skipped": state.get("alerts_skipped", 0) + skipped,
+        "alerts_elapsed_seconds": state.get("alerts_elapsed_seconds", 0.0) + elapsed,
+    }
+
+def alerts_remaining(state: ExpirySweepState) -> str:
+    """
+    Loops create_alerts until every fetched item has been handled.
+    """
+    if state.get("alerts_cursor", 0) < len(ExpiringBatch.from_state(state.get("expiring"))):
+        return "create_alerts"
+    return "summarize_sweep"
+
+async def alert_partitions(state: ExpirySweepState) -> Dict[str, Any]:
+    """
+    Partitioned variant of create_alerts: splits the fetched items (by provider hash,
+    expiry bucket or credential type) into partitions sized from the fetched count,
+    alerts them across a pool of worker processes and merges the results.
+    """
+    expiring = ExpiringBatch.from_state(state.get("expiring"))
+    workers = max(1, state.get("workers", 1))
+    count = partition_count(len(expiring), workers)
+    partitions = partition_items(expiring, count, state.get("partition_by", "provider"))
+    print(f"Found {len(expiring)} expiring items. Alerting {len(partitions)} partitions on up to {workers} workers...")
+
+    started = time.perf_counter()
+    results = await run_partitions(partitions, workers, state.get("full_sweep", False))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "alerts_cursor": len(expiring),
+        "alerts_created": sum(result["alerts_created"] for result in results),
+        "alerts_skipped": sum(result["alerts_skipped"] for result in results),
+        "errors": [error for result in results for error in result["errors"]],
+        "alerts_elapsed_seconds": elapsed,
+        "partitions": len(partitions),
+    }
+
+def stream_chunk_size(total: Optional[int], processed: int) -> int:
+    """
+    Items stream_expiring_credentials alerts per graph step: as for create_alerts when
+    the server reports a total, otherwise as many as all earlier steps together (so a
+    run still takes a bounded number of steps).
+    """
+    if total is not None:
+        return alert_chunk_size(total)
+    return max(1, SWEEP_CHECKPOINT_CHUNK, processed)
+
+async def stream_expiring_credentials(state: ExpirySweepState) -> Dict[str, Any]:
+    """
+    Streaming variant of fetch + alert: pages through list_expiring_credentials and
+    alerts on each page while the next one is fetched. At most SWEEP_QUEUE_PAGES
+    fetched pages wait in memory, and only aggregates are returned to the graph state.
+
+    Each graph step handles a chunk of pages and records the position after the last
+    one alerted as page_position, so a checkpointed run that stops part way resumes
+    paging from there.
+    """
+    window_days = state.get("window_days", 90)
+    full = state.get("full_sweep", False)
+    processed = state.get("alerts_cursor", 0)
+    position = state.get("page_position") or {}
+    print(f"Streaming expiring credentials in pages of {SWEEP_PAGE_SIZE} from item {processed}...")
+
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, SWEEP_QUEUE_PAGES))
+    fetch_errors = []
+    exhausted = False
 
-    for item in expiring_items:
+    async def produce():
+        nonlocal exhausted
+        fetched = 0
         try:
-            # Determine severity based on days_remaining
-            days = item.get("days_remaining", 90)
-            severity = "low"
-            if days <= 30:
-                severity = "critical"
-            elif days <= 60:
-                severity = "high"
-            elif days <= 90:
-                severity = "medium"
-
-            provider_id = item.get("provider_id")
-            credential_id = item.get("credential_id", "unknown") # Fallback if not provided in list
-            message = f"Credential {item.get('credential')} for {item.get('name')} expires in {days} days."
-
-            await mcp_client.call_tool(
-                "alert",
-                "log_alert",
-                {
-                    "provider_id": provider_id,
-                    "credential_id": credential_id,
-                    "severity": severity,
-                    "message": message
-                }
-            )
-            alerts_count += 1
+            async for page, after, total in _page_expiring_credentials(window_days, SWEEP_PAGE_SIZE, position):
+                await queue.put((page, after))
+                fetched += len(page)
+                if fetched >= stream_chunk_size(total, processed):
+                    break
+            else:
+                exhausted = True
         except Exception as e:
-            errors.append(f"Failed to create alert for {item}: {e}")
+            fetch_errors.append(f"Failed to fetch expiring credentials: {e}")
+            exhausted = True
+        # Not in a finally: once cancelled, nothing reads the queue and the put could block forever.
+        await queue.put(None)
+
+    semaphore = asyncio.Semaphore(max(1, ALERT_CONCURRENCY))
+    scanned = 0
+    pages = 0
+    alerts_count = 0
+    skipped = 0
+    errors = []
+    severity_counts = state.get("severity_counts") or {}
+    credential_type_counts = state.get("credential_type_counts") or {}
+
+    started = time.perf_counter()
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            entry = await queue.get()
+            if entry is None:
+                break
+            page, after = entry
+            pages += 1
+            scanned += len(page)
+            batch = ExpiringBatch.from_rows(page)
+            counts = batch.counts()
+            severity_counts = merge_counts(severity_counts, counts["by_severity"])
+            credential_type_counts = merge_counts(credential_type_counts, counts["by_credential_type"])
+            created, page_errors, page_skipped = await _alert_items(batch, semaphore, full)
+            alerts_count += created
+            skipped += page_skipped
+            errors.extend(page_errors)
+            position = after
+    finally:
+        # The consumer stopped early (error or cancellation): stop fetching and wait for the producer to exit.
+        if not producer.done():
+            producer.cancel()
+        await asyncio.gather(producer, return_exceptions=True)
+    elapsed = time.perf_counter() - started
+
+    return {
+        "page_position": {**position, "done": exhausted},
+        "alerts_cursor": processed + scanned,
+        "items_scanned": state.get("items_scanned", 0) + scanned,
+        "pages_fetched": state.get("pages_fetched", 0) + pages,
+        "alerts_created": state.get("alerts_created", 0) + alerts_count,
+        "alerts_skipped": state.get("alerts_skipped", 0) + skipped,
+        "errors": state.get("errors", []) + fetch_errors + errors,
+        "alerts_elapsed_seconds": state.get("alerts_elapsed_seconds", 0.0) + elapsed,
+        "severity_counts": severity_counts,
+        "credential_type_counts": credential_type_counts,
+    }
 
-    return {"alerts_created": alerts_count, "errors": errors}
+def pages_remaining(state: ExpirySweepState) -> str:
+    """
+    Loops stream_expiring_credentials until the last page has been alerted.
+    """
+    if not (state.get("page_position") or {}).get("done"):
+        return "stream_expiring_credentials"
+    return "summarize_sweep"
 
 async def summarize_sweep(state: ExpirySweepState) -> Dict[str, Any]:
     """
     Summarizes the sweep results.
     """
-    count = len(state.get("providers", []))
+    count = state.get("items_scanned", 0)
     alerts = state.get("alerts_created", 0)
     errors = state.get("errors", [])
+    elapsed = state.get("alerts_elapsed_seconds", 0.0)
     
     summary = f"Sweep completed. Scanned {count} expiring items. Created {alerts} alerts."
+    if state.get("severity_counts"):
+        by_severity = state["severity_counts"]
+        summary += " By severity: " + ", ".join(f"{by_severity[s]} {s}" for s in SEVERITIES if s in by_severity) + "."
+    if state.get("alerts_skipped"):
+        summary += f" Skipped {state['alerts_skipped']} already-alerted items."
+    if elapsed > 0:
+        summary += f" Alert stage took {elapsed:.2f}s ({count / elapsed:.1f} items/s)."
+    if state.get("pages_fetched"):
+        summary += f" Fetched {state['pages_fetched']} pages."
+    if state.get("partitions"):
+        summary += f" Alerted {state['partitions']} partitions on up to {state.get('workers', 1)} worker processes."
     if errors:
         summary += f" Encountered {len(errors)} errors."
     
     return {"summary": summary}
 
-# Build the graph
-workflow = StateGraph(ExpirySweepState)
+def build_expiry_sweep_graph(checkpointer=None, streaming: bool = False, partitioned: bool = False):
+    """
+    Builds the expiry sweep graph, optionally with a checkpointer so runs can be resumed.
+    The streaming graph overlaps fetching and alerting and keeps only aggregates in state.
+    The partitioned graph fetches everything, then alerts partitions in worker processes.
+    """
+    workflow = StateGraph(ExpirySweepState)
+
+    if partitioned:
+        workflow.add_node("fetch_expiring_credentials", timed_node("expiry_sweep", "fetch_expiring_credentials", fetch_expiring_credentials))
+        workflow.add_node("alert_partitions", timed_node("expiry_sweep", "alert_partitions", alert_partitions))
+        workflow.add_node("summarize_sweep", timed_node("expiry_sweep", "summarize_sweep", summarize_sweep))
+
+        workflow.set_entry_point("fetch_expiring_credentials")
+
+        workflow.add_edge("fetch_expiring_credentials", "alert_partitions")
+        workflow.add_edge("alert_partitions", "summarize_sweep")
+    elif streaming:
+        workflow.add_node("stream_expiring_credentials", timed_node("expiry_sweep", "stream_expiring_credentials", stream_expiring_credentials))
+        workflow.add_node("summarize_sweep", timed_node("expiry_sweep", "summarize_sweep", summarize_sweep))
+
+        workflow.set_entry_point("stream_expiring_credentials")
+
+        workflow.add_conditional_edges("stream_expiring_credentials", pages_remaining)
+    else:
+        workflow.add_node("fetch_expiring_credentials", timed_node("expiry_sweep", "fetch_expiring_credentials", fetch_expiring_credentials))
+        workflow.add_node("create_alerts", timed_node("expiry_sweep", "create_alerts", create_alerts))
+        workflow.add_node("summarize_sweep", timed_node("expiry_sweep", "summarize_sweep", summarize_sweep))
 
-workflow.add_node("fetch_expiring_credentials", fetch_expiring_credentials)
-workflow.add_node("create_alerts", create_alerts)
-workflow.add_node("summarize_sweep", summarize_sweep)
+        workflow.set_entry_point("fetch_expiring_credentials")
 
-workflow.set_entry_point("fetch_expiring_credentials")
+        workflow.add_conditional_edges("fetch_expiring_credentials", alerts_remaining)
+        workflow.add_conditional_edges("create_alerts", alerts_remaining)
+    workflow.add_edge("summarize_sweep", END)
 
-workflow.add_edge("fetch_expiring_credentials", "create_alerts")
-workflow.add_edge("create_alerts", "summarize_sweep")
-workflow.add_edge("summarize_sweep", END)
+    return workflow.compile(checkpointer=checkpointer)
 
-expiry_sweep_graph = workflow.compile()
+expiry_sweep_graph = build_expiry_sweep_graph()
+expiry_sweep_stream_graph = build_expiry_sweep_graph(streaming=True)
@@ -1,37 +1,78 @@
-from typing import Annotated, Literal, TypedDict, List
-from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
+import os
+import time
+import logging
+from typing import Annotated, Any, Dict, Literal, Optional, TypedDict, List
+from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig
 from langchain_core.tools import tool
 from langchain_openai import ChatOpenAI
 from langgraph.graph import StateGraph, END
-from langgraph.prebuilt import ToolNode
 from credentialwatch_agent.mcp_client import mcp_client
+from credentialwatch_agent.expiry_index import expiry_index, expiry_index_tool
 from credentialwatch_agent.agents.common import AgentState
+from credentialwatch_agent.compaction import compact_tool_message
+from credentialwatch_agent.tool_executor import tool_executor
+from credentialwatch_agent.tracing import timed_node
+from credentialwatch_agent.rate_limiter import rate_limits, request_context
+
+logger = logging.getLogger("interactive_query")
 
 # --- Tool Definitions ---
 
-# Tools are now dynamically loaded from mcp_client
+# Tools are now dynamically loaded from mcp_client, plus local tools answered in-process.
+
+_local_tools = [expiry_index_tool(expiry_index)]
+
+def local_tools() -> List[Any]:
+    """Tools the agent gets besides the MCP ones."""
+    return _local_tools if expiry_index.enabled else []
+
+# --- Model ---
+
+_chat_model: Optional[ChatOpenAI] = None
+
+def get_chat_model() -> ChatOpenAI:
+    """
+    Returns the shared chat model. Reusing one instance keeps its HTTP connection pool warm.
+    """
+    global _chat_model
+    if _chat_model is None:
+        # 429/503 retries happen in rate_limits.call("llm", ...), which also pauses other
+        # callers for the Retry-After; the client's own retries would multiply them.
+        _chat_model = ChatOpenAI(model=os.getenv("OPENAI_MODEL", "gpt-4o"), temperature=0, max_retries=0)
+    return _chat_model
+
+def set_chat_model(model: Any):
+    """
+    Replaces the shared chat model (e.g. with a fake one for benchmarks) and drops compiled graphs.
+    """
+    global _chat_model
+    _chat_model = model
+    _graph_registry.clear()
 
 
 # --- Graph Definition ---
 
+def _thread_id(config: Optional[RunnableConfig]) -> Optional[str]:
+    # Rate limiters queue each conversation separately.
+    return ((config or {}).get("configurable") or {}).get("thread_id")
+
 # We can use the prebuilt AgentState or our custom one.
-# For simplicity, we'll use a state compatible with ToolNode (requires 'messages').
+# For simplicity, we'll use a state with a 'messages' list.
 
-def get_interactive_query_graph(checkpointer=None):
+def build_interactive_query_graph(tools: List[Any], checkpointer=None):
     """
-    Factory function to create the graph with dynamic tools.
+    Builds and compiles the ReAct graph for a given tool set.
     """
-    tools = mcp_client.get_tools()
+    model_with_tools = get_chat_model().bind_tools(tools)
     
-    async def agent_node(state: AgentState):
+    async def agent_node(state: AgentState, config: RunnableConfig):
         """
-        Invokes the LLM to decide the next step.
+        Invokes the LLM to decide the next step, as an interactive request of this thread.
         """
         messages = state["messages"]
-        model = ChatOpenAI(model="gpt-4o", temperature=0) 
-        
-        model_with_tools = model.bind_tools(tools)
-        response = await model_with_tools.ainvoke(messages)
+        with request_context("interactive", _thread_id(config)):
+            response = await rate_limits.call("llm", lambda: model_with_tools.ainvoke(messages))
         return {"messages": [response]}
 
     def should_continue(state: AgentState) -> Literal["tools", "__end__"]:
@@ -44,10 +85,22 @@ def get_interactive_query_graph(checkpointer=None):
             return "tools"
         return "__end__"
 
+    tools_by_name = {t.name: t for t in tools}
+
+    async def tools_node(state: AgentState, config: RunnableConfig):
+        """
+        Runs the requested tools concurrently, each under its own deadline, and compacts
+        their results before they reach the model.
+        """
+        last_message = state["messages"][-1]
+        with request_context("interactive", _thread_id(config)):
+            results = await tool_executor.run(last_message.tool_calls, tools_by_name, config)
+        return {"messages": [compact_tool_message(m) for m in results]}
+
     workflow = StateGraph(AgentState)
 
-    workflow.add_node("agent", agent_node)
-    workflow.add_node("tools", ToolNode(tools))
+    workflow.add_node("agent", timed_node("interactive_query", "agent", agent_node))
+    workflow.add_node("tools", timed_node("interactive_query", "tools", tools_node))
 
     workflow.set_entry_point("agent")
 
@@ -58,3 +111,32 @@ def get_interactive_query_graph(checkpointer=None):
     workflow.add_edge("tools", "agent")
 
     return workflow.compile(checkpointer=checkpointer)
+
+# Compiled graphs keyed by id(checkpointer): (tools_version, checkpointer, graph).
+_graph_registry: Dict[int, tuple] = {}
+_registry_stats = {"builds": 0, "hits": 0, "last_build_ms": 0.0}
+
+def get_interactive_query_graph(checkpointer=None):
+    """
+    Returns the compiled graph for the current MCP tool set (plus the local tools).
+    Graphs are compiled once per tool-set version and checkpointer, and rebuilt
+    only when mcp_client reports that its tool list changed.
+    """
+    version = mcp_client.tools_version
+    entry = _graph_registry.get(id(checkpointer))
+    if entry is not None and entry[0] == version and entry[1] is checkpointer:
+        _registry_stats["hits"] += 1
+        return entry[2]
+
+    started = time.perf_counter()
+    graph = build_interactive_query_graph(mcp_client.get_tools() + local_tools(), checkpointer=checkpointer)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    _graph_registry[id(checkpointer)] = (version, checkpointer, graph)
+    _registry_stats["builds"] += 1
+    _registry_stats["last_build_ms"] = elapsed_ms
+    logger.info(f"Compiled interactive query graph for tool set v{version} in {elapsed_ms:.1f} ms.")
+    return graph
+
+def graph_registry_stats() -> Dict[str, Any]:
+    """Returns build/hit counters for the compiled graph registry."""
+    return dict(_registry_stats, graphs=len(_graph_registry))
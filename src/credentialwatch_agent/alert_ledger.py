@@ -0,0 +1,172 @@
+import os
+import time
+import asyncio
+import sqlite3
+import logging
+import threading
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Higher rank = more severe. Used to detect escalations.
+SEVERITY_RANK = {"low": 0, "medium": 1, "high": 2, "critical": 3}
+
+LedgerKey = Tuple[str, str]
+# (key, severity, expiry date ordinal or None)
+LedgerEntry = Tuple[LedgerKey, str, Optional[int]]
+
+# Expiry dates derived from days_remaining can be a day apart when the list was
+# fetched before midnight; a renewal moves the date by months.
+EXPIRY_TOLERANCE_DAYS = 1
+
+class AlertLedger:
+    """
+    Local SQLite record of alerts already sent, keyed by (provider_id, credential_id, severity).
+    Lets incremental sweeps skip credentials that were already alerted at the same or a higher severity.
+
+    Each entry remembers the credential's expiry date. Once the credential is renewed into a
+    new expiry cycle, entries of the old cycle no longer count and are cleared when the new
+    cycle is first alerted. The sqlite calls block, so sweeps use the async variants
+    (pending_async, record_async), which run them on a worker thread.
+    """
+
+    def __init__(self, path: Optional[str] = None, realert_after_days: Optional[float] = None):
+        if path is None:
+            path = os.getenv("ALERT_LEDGER_PATH", "alert_ledger.db")
+        if realert_after_days is None:
+            realert_after_days = float(os.getenv("ALERT_LEDGER_REALERT_DAYS", "0"))
+        self.path = path
+        # Opt-in: 0 (default) disables re-alerting; otherwise an alert older than this is sent again.
+        self.realert_after_days = realert_after_days
+        self._conn: Optional[sqlite3.Connection] = None
+        # One connection, used from worker threads one at a time.
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger("alert_ledger")
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS alert_ledger (
+                    provider_id TEXT NOT NULL,
+                    credential_id TEXT NOT NULL,
+                    severity TEXT NOT NULL,
+                    last_alerted_at REAL NOT NULL,
+                    expiry INTEGER,
+                    PRIMARY KEY (provider_id, credential_id, severity)
+                )
+                """
+            )
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(alert_ledger)")}
+            if "expiry" not in columns:
+                # Ledgers from before expiry tracking; their entries match any expiry date.
+                self._conn.execute("ALTER TABLE alert_ledger ADD COLUMN expiry INTEGER")
+            self._conn.commit()
+            self.logger.info(f"Opened alert ledger at {self.path}")
+        return self._conn
+
+    def should_alert(self, key: LedgerKey, severity: str, now: Optional[float] = None, expiry: Optional[int] = None) -> bool:
+        """
+        True if the credential has never been alerted at this severity or higher in its
+        current expiry cycle (i.e. it is new, renewed or an escalation), or the last such
+        alert is older than realert_after_days.
+        """
+        return self.pending([(key, severity, expiry)], now)[0]
+
+    def pending(self, entries: Iterable[LedgerEntry], now: Optional[float] = None) -> List[bool]:
+        """should_alert for many (key, severity, expiry) entries in one go."""
+        now = time.time() if now is None else now
+        results = []
+        with self._lock:
+            conn = self._connect()
+            for key, severity, expiry in entries:
+                rows = conn.execute(
+                    "SELECT severity, last_alerted_at, expiry FROM alert_ledger WHERE provider_id = ? AND credential_id = ?",
+                    key,
+                ).fetchall()
+                results.append(not any(self._suppresses(row, severity, expiry, now) for row in rows))
+        return results
+
+    def _suppresses(self, row: Tuple[str, float, Optional[int]], severity: str, expiry: Optional[int], now: float) -> bool:
+        prior_severity, last_alerted_at, prior_expiry = row
+        if SEVERITY_RANK.get(prior_severity, 0) < SEVERITY_RANK.get(severity, 0):
+            return False
+        if expiry is not None and prior_expiry is not None and abs(prior_expiry - expiry) > EXPIRY_TOLERANCE_DAYS:
+            return False
+        if self.realert_after_days > 0 and now - last_alerted_at > self.realert_after_days * 86400:
+            return False
+        return True
+
+    def record(self, entries: Iterable[LedgerEntry], now: Optional[float] = None):
+        """Records (key, severity, expiry) entries as alerted now, clearing entries of older expiry cycles."""
+        now = time.time() if now is None else now
+        rows = [(key[0], key[1], severity, now, expiry) for key, severity, expiry in entries]
+        if not rows:
+            return
+        with self._lock:
+            conn = self._connect()
+            conn.executemany(
+                """
+                DELETE FROM alert_ledger
+                WHERE provider_id = ? AND credential_id = ? AND expiry IS NOT NULL AND ABS(expiry - ?) > ?
+                """,
+                [(provider_id, credential_id, expiry, EXPIRY_TOLERANCE_DAYS) for provider_id, credential_id, _, _, expiry in rows if expiry is not None],
+            )
+            conn.executemany(
+                """
+                INSERT INTO alert_ledger (provider_id, credential_id, severity, last_alerted_at, expiry)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (provider_id, credential_id, severity)
+                DO UPDATE SET last_alerted_at = excluded.last_alerted_at, expiry = excluded.expiry
+                """,
+                rows,
+            )
+            conn.commit()
+
+    async def pending_async(self, entries: List[LedgerEntry], now: Optional[float] = None) -> List[bool]:
+        """pending() on a worker thread, off the event loop."""
+        if not entries:
+            return []
+        return await asyncio.to_thread(self.pending, entries, now)
+
+    async def record_async(self, entries: List[LedgerEntry], now: Optional[float] = None):
+        """record() on a worker thread, off the event loop."""
+        if entries:
+            await asyncio.to_thread(self.record, entries, now)
+
+    def count(self) -> int:
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM alert_ledger").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+def ledger_key(item: Dict[str, Any]) -> LedgerKey:
+    """Ledger key for an expiring credential item; falls back to the credential name when there is no id."""
+    credential_id = item.get("credential_id")
+    if credential_id is None:
+        credential_id = item.get("credential", "unknown")
+    return str(item.get("provider_id")), str(credential_id)
+
+def ledger_expiry(item: Dict[str, Any], today: Optional[int] = None) -> Optional[int]:
+    """Expiry date ordinal of an item, from expiry_date or else days_remaining; None if it has neither."""
+    expiry = item.get("expiry_date")
+    if expiry:
+        try:
+            return date.fromisoformat(str(expiry)[:10]).toordinal()
+        except ValueError:
+            pass
+    days = item.get("days_remaining")
+    if days is None:
+        return None
+    return (date.today().toordinal() if today is None else today) + int(days)
+
+# Global instance (the database is opened on first use)
+alert_ledger = AlertLedger()
@@ -0,0 +1,214 @@
+import os
+import re
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from credentialwatch_agent.mcp_client import mcp_client
+from credentialwatch_agent.result_cache import INVALIDATES
+from credentialwatch_agent.tool_index import canonical_name
+from credentialwatch_agent.intent_router import normalize
+from credentialwatch_agent import metrics
+
+logger = logging.getLogger("answer_cache")
+
+# Public NPI registry lookups: none of our write tools change their results.
+REGISTRY_TOOLS = frozenset({"search_providers", "get_provider_by_npi"})
+# Read tools with a known set of invalidating writes; any other tool depends on "*",
+# which every write bumps.
+TRACKED_TOOLS = frozenset(name for names in INVALIDATES.values() for name in names)
+
+# Questions that refer back to the conversation cannot be answered from another thread's turn.
+_CONTEXT_WORDS = re.compile(
+    r"\b(he|she|him|her|his|hers|they|them|their|theirs|it|its|those|these|same|above|previous|earlier|again|else|instead)\b"
+)
+
+# (normalized question, tool-set version, chat model)
+AnswerKey = Tuple[str, int, str]
+
+class _Answer:
+    __slots__ = ("answer", "generations", "tools", "size", "expires_at")
+
+    def __init__(self, answer: str, generations: Dict[str, int], tools: List[str], expires_at: float):
+        self.answer = answer
+        self.generations = generations
+        self.tools = tools
+        self.size = len(answer.encode("utf-8"))
+        self.expires_at = expires_at
+
+def _model_name() -> str:
+    # Without creating the model, so routed questions don't need OpenAI credentials.
+    from credentialwatch_agent.agents import interactive_query
+    model = interactive_query._chat_model
+    if model is None:
+        return os.getenv("OPENAI_MODEL", "gpt-4o")
+    return str(getattr(model, "model_name", None) or type(model).__name__)
+
+def turn_messages(messages: Sequence[BaseMessage]) -> List[BaseMessage]:
+    """Messages of the latest turn: the last human message and everything after it."""
+    for index in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[index], HumanMessage):
+            return list(messages[index:])
+    return list(messages)
+
+class AnswerCache:
+    """
+    LRU cache of final chat answers, keyed on the normalized question, the MCP tool-set
+    version and the chat model.
+
+    Each answer remembers which tools produced it and the data generation of each of
+    them. Write tools (log_alert, add_or_update_credential, mark_alert_resolved, ...)
+    bump the generations of the read tools they make stale, per result_cache.INVALIDATES,
+    which drops the answers built on them. Answers that called a write tool, hit a tool
+    error, or refer back to the conversation are not cached.
+    """
+
+    def __init__(
+        self,
+        enabled: Optional[bool] = None,
+        ttl_seconds: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ):
+        if enabled is None:
+            enabled = os.getenv("ANSWER_CACHE_ENABLED", "false").lower() in ("1", "true", "yes")
+        if ttl_seconds is None:
+            ttl_seconds = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "600"))
+        if max_entries is None:
+            max_entries = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "256"))
+        if max_bytes is None:
+            max_bytes = int(os.getenv("ANSWER_CACHE_MAX_BYTES", str(4 * 1024 * 1024)))
+        self.enabled = enabled
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self._entries: "OrderedDict[AnswerKey, _Answer]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self.uncacheable = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def key(self, question: str) -> Optional[AnswerKey]:
+        """Cache key for a question, or None if the cache is off or the question depends on the conversation."""
+        if not self.enabled:
+            return None
+        text = normalize(question)
+        if not text or _CONTEXT_WORDS.search(text):
+            return None
+        return text, mcp_client.tools_version, _model_name()
+
+    def generations(self) -> Dict[str, int]:
+        """Current data generations; take them before a turn runs and pass them to put()."""
+        return dict(self._generations)
+
+    def get(self, key: AnswerKey) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at > time.monotonic() and self._is_current(entry.generations):
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry.answer
+        if entry is not None:
+            self._remove(key)
+        self.misses += 1
+        return None
+
+    def put(self, key: AnswerKey, generations: Dict[str, int], messages: Sequence[BaseMessage]) -> bool:
+        """
+        Caches the answer of a finished turn (its messages, from the question on), if it is
+        cacheable and no write ran since `generations` was taken. Returns True if stored.
+        """
+        turn = turn_messages(messages)
+        answer = turn[-1] if turn else None
+        tools = sorted({canonical_name(m.name or "") for m in turn if isinstance(m, ToolMessage)})
+        failed = any(isinstance(m, ToolMessage) and m.status == "error" for m in turn)
+        if (
+            not isinstance(answer, AIMessage) or answer.tool_calls or not isinstance(answer.content, str)
+            or not answer.content or failed or any(name in INVALIDATES for name in tools)
+        ):
+            self.uncacheable += 1
+            return False
+
+        depends_on = {self._dependency(name) for name in tools} - {None}
+        snapshot = {name: generations.get(name, 0) for name in depends_on}
+        if not self._is_current(snapshot):
+            # A write ran while the agent was answering.
+            self.uncacheable += 1
+            return False
+
+        entry = _Answer(answer.content, snapshot, tools, time.monotonic() + self.ttl_seconds)
+        if entry.size > self.max_bytes:
+            self.uncacheable += 1
+            return False
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = entry
+        self._bytes += entry.size
+        self.stored += 1
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+        return True
+
+    def invalidate_for_write(self, tool_name: str) -> int:
+        """Bumps the generations a write tool makes stale and drops the answers built on them."""
+        if tool_name not in INVALIDATES:
+            return 0
+        for name in (*INVALIDATES[tool_name], "*"):
+            self._generations[name] = self._generations.get(name, 0) + 1
+        stale = [key for key, entry in self._entries.items() if not self._is_current(entry.generations)]
+        for key in stale:
+            self._remove(key)
+        self.invalidations += len(stale)
+        if stale:
+            logger.info(f"'{tool_name}' invalidated {len(stale)} cached answers.")
+        return len(stale)
+
+    def on_tool_call(self, tool_name: str, seconds: float, ok: bool):
+        # mcp_client call listener; a failed write may still have changed data.
+        self.invalidate_for_write(tool_name)
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stored": self.stored,
+            "uncacheable": self.uncacheable,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    @staticmethod
+    def _dependency(tool_name: str) -> Optional[str]:
+        if tool_name in REGISTRY_TOOLS:
+            return None
+        return tool_name if tool_name in TRACKED_TOOLS else "*"
+
+    def _is_current(self, generations: Dict[str, int]) -> bool:
+        return all(self._generations.get(name, 0) == generation for name, generation in generations.items())
+
+    def _remove(self, key: AnswerKey):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+# Global instance, shared by all conversations
+answer_cache = AnswerCache()
+mcp_client.add_call_listener(answer_cache.on_tool_call)
+
+metrics.registry.add_collector(lambda: metrics.stats_gauges("credentialwatch_answer_cache", "Chat answer cache", answer_cache.stats()))
@@ -0,0 +1,75 @@
+import json
+from typing import Any, AsyncIterator, Iterator, List, Optional, Sequence
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from credentialwatch_agent.tool_index import canonical_name
+
+# Tools the fake model calls on each question, in one response (so they run concurrently).
+DEFAULT_SCRIPT = (
+    ("search_providers", {"query": "kim"}),
+    ("get_open_alerts", {"limit": 5}),
+)
+
+class FakeChatModel(BaseChatModel):
+    """
+    Deterministic stand-in for the chat model, so graph and tool overhead can be measured
+    without OpenAI. For each question it requests the scripted tool calls (those the bound
+    tools provide), then answers with a fixed text that names the tools it saw.
+    Streaming yields the answer word by word, like a real model.
+    """
+
+    script: Sequence[Any] = DEFAULT_SCRIPT
+    tool_names: List[str] = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> "FakeChatModel":
+        return self.model_copy(update={"tool_names": [getattr(t, "name", str(t)) for t in tools]})
+
+    def _reply(self, messages: List[BaseMessage]) -> AIMessage:
+        turn_start = max((i for i, m in enumerate(messages) if isinstance(m, HumanMessage)), default=0)
+        results = [m for m in messages[turn_start:] if isinstance(m, ToolMessage)]
+        if results:
+            names = ", ".join(sorted({canonical_name(m.name or "") for m in results}))
+            return AIMessage(content=f"Checked {len(results)} tool results ({names}). Nothing else needs attention today.")
+
+        by_short_name = {canonical_name(name): name for name in self.tool_names}
+        tool_calls = [
+            {"name": by_short_name[short_name], "args": dict(args), "id": f"call_{turn_start}_{i}"}
+            for i, (short_name, args) in enumerate(self.script)
+            if short_name in by_short_name
+        ]
+        if not tool_calls:
+            return AIMessage(content="No tools are available to answer this.")
+        return AIMessage(content="", tool_calls=tool_calls)
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+    def _chunks(self, messages: List[BaseMessage]) -> Iterator[AIMessageChunk]:
+        reply = self._reply(messages)
+        if reply.tool_calls:
+            yield AIMessageChunk(content="", tool_call_chunks=[
+                {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": i}
+                for i, call in enumerate(reply.tool_calls)
+            ])
+            return
+        for word in reply.content.split(" "):
+            yield AIMessageChunk(content=word + " ")
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        for chunk in self._chunks(messages):
+            generation = ChatGenerationChunk(message=chunk)
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.content, chunk=generation)
+            yield generation
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        for chunk in self._chunks(messages):
+            generation = ChatGenerationChunk(message=chunk)
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.content, chunk=generation)
+            yield generation
@@ -0,0 +1,463 @@
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import logging
+import platform
+import resource
+import tempfile
+import tracemalloc
+import subprocess
+import multiprocessing
+from contextlib import AsyncExitStack
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+logger = logging.getLogger("benchmarks")
+
+BACKENDS = ("mock", "local")
+DEFAULT_SWEEP_SIZES = (1000, 10000, 100000)
+# Roughly 0.3 credentials per provider expire within 90 days; oversize so a window can be found.
+PROVIDERS_PER_EXPIRING_ITEM = 4
+SEED = 42
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Nearest-rank percentile (q in 0-100) of values, 0.0 if empty."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, min(len(ordered), round(q / 100 * len(ordered) + 0.5)))
+    return ordered[rank - 1]
+
+def latency_summary(seconds: Sequence[float]) -> Dict[str, Any]:
+    return {
+        "count": len(seconds),
+        "p50_ms": round(percentile(seconds, 50) * 1000, 3),
+        "p95_ms": round(percentile(seconds, 95) * 1000, 3),
+        "max_ms": round(max(seconds, default=0.0) * 1000, 3),
+    }
+
+def _rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        return 0.0
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere.
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+def plan_dataset(items: int, seed: int = SEED) -> Dict[str, int]:
+    """Dataset size and sweep window that yield about `items` expiring credentials."""
+    from credentialwatch_agent.local_servers.synthetic import SyntheticDataset
+
+    providers = max(100, items * PROVIDERS_PER_EXPIRING_ITEM)
+    dataset = SyntheticDataset(providers, seed=seed)
+    return {"providers": providers, "window_days": dataset.window_for(items)}
+
+def measure_state_memory(items: int = 100000, seed: int = SEED) -> Dict[str, Any]:
+    """
+    Compares `items` expiring credentials held as parsed tool dicts with the columnar
+    ExpiringBatch: retained memory, checkpoint size and severity classification time.
+    """
+    from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+    from credentialwatch_agent.local_servers.synthetic import SyntheticDataset
+    from credentialwatch_agent.sweep_batch import ExpiringBatch
+    from credentialwatch_agent.sweep_batch import classify_severity
+
+    dataset = SyntheticDataset(max(100, items * PROVIDERS_PER_EXPIRING_ITEM), seed=seed)
+    payload = json.dumps(dataset.list_expiring(dataset.window_for(items), limit=items))
+
+    tracemalloc.start()
+    try:
+        # Columnar first, from rows that are then dropped, so shared strings are counted.
+        before = tracemalloc.get_traced_memory()[0]
+        batch = ExpiringBatch.from_rows(json.loads(payload)["expiring"])
+        batch_bytes = tracemalloc.get_traced_memory()[0] - before
+        before = tracemalloc.get_traced_memory()[0]
+        rows = json.loads(payload)["expiring"]
+        rows_bytes = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+    started = time.perf_counter()
+    [classify_severity(row.get("days_remaining", 90)) for row in rows]
+    per_item_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    batch.counts(batch.severities())
+    vectorized_seconds = time.perf_counter() - started
+
+    serde = JsonPlusSerializer()
+    per_100k = 100000 / max(1, len(rows))
+    return {
+        "items": len(rows),
+        "dict_rows_mb_per_100k": round(rows_bytes * per_100k / 2**20, 2),
+        "columnar_mb_per_100k": round(batch_bytes * per_100k / 2**20, 2),
+        "dict_rows_checkpoint_mb_per_100k": round(len(serde.dumps_typed(rows)[1]) * per_100k / 2**20, 2),
+        "columnar_checkpoint_mb_per_100k": round(len(serde.dumps_typed(batch.to_state())[1]) * per_100k / 2**20, 2),
+        "severity_per_item_ms": round(per_item_seconds * 1000, 3),
+        "severity_and_counts_vectorized_ms": round(vectorized_seconds * 1000, 3),
+    }
+
+class _CallRecorder:
+    """Collects call_tool latencies per tool."""
+
+    def __init__(self):
+        self.calls: Dict[str, List[float]] = {}
+        self.failures = 0
+
+    def __call__(self, tool_name: str, seconds: float, ok: bool):
+        self.calls.setdefault(tool_name, []).append(seconds)
+        if not ok:
+            self.failures += 1
+
+    def summary(self) -> Dict[str, Any]:
+        every_call = [s for seconds in self.calls.values() for s in seconds]
+        return {
+            "all": latency_summary(every_call),
+            "failures": self.failures,
+            "by_tool": {name: latency_summary(seconds) for name, seconds in sorted(self.calls.items())},
+        }
+
+async def _use_in_process_servers(stack: AsyncExitStack, providers: int, seed: int):
+    """Serves the synthetic servers in this process over in-memory MCP sessions."""
+    from mcp.shared.memory import create_connected_server_and_client_session
+    from langchain_mcp_adapters.tools import load_mcp_tools
+    from credentialwatch_agent.local_servers.servers import FaultProfile, build_alert_server, build_cred_db_server, build_npi_server
+    from credentialwatch_agent.local_servers.synthetic import AlertStore, SyntheticDataset
+    from credentialwatch_agent.mcp_client import mcp_client
+
+    dataset = SyntheticDataset(providers, seed=seed)
+    servers = {
+        "npi": build_npi_server(dataset, FaultProfile.from_env("npi")),
+        "cred_db": build_cred_db_server(dataset, FaultProfile.from_env("cred_db")),
+        "alert": build_alert_server(AlertStore(), FaultProfile.from_env("alert")),
+    }
+    tools = []
+    for name, server in servers.items():
+        session = await stack.enter_async_context(create_connected_server_and_client_session(server))
+        tools.extend(await load_mcp_tools(session, server_name=name))
+    mcp_client.use_tools(tools)
+
+async def _sweep_scenario(spec: Dict[str, Any]) -> Dict[str, Any]:
+    from credentialwatch_agent.main import run_expiry_sweep
+    from credentialwatch_agent.mcp_client import mcp_client
+
+    recorder = _CallRecorder()
+    async with AsyncExitStack() as stack:
+        if spec["backend"] == "mock":
+            await _use_in_process_servers(stack, spec["providers"], spec["seed"])
+        else:
+            await mcp_client.connect()
+        setup_rss = _rss_mb()
+        mcp_client.add_call_listener(recorder)
+        started = time.perf_counter()
+        result = await run_expiry_sweep(spec["window_days"], streaming=spec["streaming"], full=True)
+        elapsed = time.perf_counter() - started
+
+    items = result.get("items_scanned", 0)
+    return {
+        "items": items,
+        "alerts_created": result.get("alerts_created"),
+        "errors": len(result.get("errors") or []),
+        "seconds": round(elapsed, 4),
+        "items_per_second": round(items / elapsed, 1) if elapsed > 0 else 0.0,
+        "tool_calls": recorder.summary(),
+        "setup_rss_mb": round(setup_rss, 1),
+    }
+
+async def _chat_scenario(spec: Dict[str, Any]) -> Dict[str, Any]:
+    from credentialwatch_agent.main import run_chat_turn, stream_chat_turn
+    from credentialwatch_agent.mcp_client import mcp_client
+    from credentialwatch_agent.agents.interactive_query import set_chat_model
+    from credentialwatch_agent.benchmarks.fake_chat import FakeChatModel
+
+    set_chat_model(FakeChatModel())
+    recorder = _CallRecorder()
+    async with AsyncExitStack() as stack:
+        if spec["backend"] == "mock":
+            await _use_in_process_servers(stack, spec["providers"], spec["seed"])
+        else:
+            await mcp_client.connect()
+        setup_rss = _rss_mb()
+        mcp_client.add_call_listener(recorder)
+
+        turns = []
+        first_tokens = []
+        streamed = []
+        threads = max(1, spec["threads"])
+        for i in range(spec["turns"]):
+            started = time.perf_counter()
+            await run_chat_turn(f"Any open alerts for Dr Kim? ({i})", [], thread_id=f"bench-{i % threads}")
+            turns.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            first_token = None
+            async for _ in stream_chat_turn(f"And expiring credentials? ({i})", [], thread_id=f"bench-stream-{i % threads}"):
+                if first_token is None:
+                    first_token = time.perf_counter() - started
+            streamed.append(time.perf_counter() - started)
+            first_tokens.append(first_token or 0.0)
+
+    total = sum(turns)
+    return {
+        "turns": len(turns),
+        "turns_per_second": round(len(turns) / total, 2) if total > 0 else 0.0,
+        "turn_latency": latency_summary(turns),
+        "streamed_turn_latency": latency_summary(streamed),
+        "time_to_first_update": latency_summary(first_tokens),
+        "tool_calls": recorder.summary(),
+        "setup_rss_mb": round(setup_rss, 1),
+    }
+
+async def _transport_scenario(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """Per-call latency of read tools over one MCP transport, sequential and then concurrent."""
+    from credentialwatch_agent.mcp_client import mcp_client
+
+    started = time.perf_counter()
+    await mcp_client.connect()
+    connect_seconds = time.perf_counter() - started
+
+    def call(i: int):
+        if i % 2:
+            return mcp_client.call_tool("npi", "search_providers", {"query": "smith", "limit": 5})
+        return mcp_client.call_tool("cred_db", "get_provider_snapshot", {"provider_id": 1 + i % spec["providers"]})
+
+    # The first call of each server opens its session; it is reported separately.
+    started = time.perf_counter()
+    await asyncio.gather(call(0), call(1))
+    first_call_seconds = time.perf_counter() - started
+
+    sequential = _CallRecorder()
+    mcp_client.add_call_listener(sequential)
+    for i in range(spec["calls"]):
+        await call(i)
+    mcp_client.remove_call_listener(sequential)
+
+    concurrent = _CallRecorder()
+    mcp_client.add_call_listener(concurrent)
+    started = time.perf_counter()
+    semaphore = asyncio.Semaphore(spec["concurrency"])
+
+    async def limited(i: int):
+        async with semaphore:
+            await call(i)
+
+    await asyncio.gather(*(limited(i) for i in range(spec["calls"])))
+    concurrent_seconds = time.perf_counter() - started
+    mcp_client.remove_call_listener(concurrent)
+
+    result = {
+        "transports": {name: stats.get("transport") for name, stats in mcp_client.server_stats().items()},
+        "connect_ms": round(connect_seconds * 1000, 1),
+        "first_call_ms": round(first_call_seconds * 1000, 1),
+        "sequential": sequential.summary()["all"],
+        "concurrent": {
+            "concurrency": spec["concurrency"],
+            "calls_per_second": round(spec["calls"] / concurrent_seconds, 1) if concurrent_seconds > 0 else 0.0,
+            **concurrent.summary()["all"],
+        },
+        "failures": sequential.failures + concurrent.failures,
+        "http_pool": mcp_client.http_pool_stats(),
+    }
+    await mcp_client.close()
+    return result
+
+_SCENARIOS = {"sweep": _sweep_scenario, "chat": _chat_scenario, "transport": _transport_scenario}
+
+def _run_scenario(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """Entry point of the per-scenario worker process, so peak RSS is per scenario."""
+    os.environ.update(spec.get("env", {}))
+    logging.basicConfig(level=spec.get("log_level", "WARNING"))
+    scenario = _SCENARIOS[spec["kind"]]
+    result = asyncio.run(scenario(spec))
+    result["peak_rss_mb"] = round(_peak_rss_mb(), 1)
+    return result
+
+def _run_isolated(spec: Dict[str, Any]) -> Dict[str, Any]:
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(1) as pool:
+        return pool.apply(_run_scenario, (spec,))
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+class _LocalServers:
+    """Runs `credentialwatch local-servers` in a subprocess on free ports."""
+
+    def __init__(self, providers: int, seed: int, latency_ms: float, error_rate: float):
+        self.providers = providers
+        self.seed = seed
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.ports = {name: _free_port() for name in ("npi", "cred_db", "alert")}
+        self.command = [
+            sys.executable, "-m", "credentialwatch_agent.cli", "local-servers",
+            "--providers", str(providers), "--seed", str(seed),
+            "--npi-port", str(self.ports["npi"]), "--cred-db-port", str(self.ports["cred_db"]),
+            "--alert-port", str(self.ports["alert"]),
+            "--latency-ms", str(latency_ms), "--error-rate", str(error_rate),
+        ]
+        self.process: Optional[subprocess.Popen] = None
+
+    def stdio_command(self, server_name: str) -> List[str]:
+        """The same server and data over stdio, started by the MCP client itself."""
+        return [
+            sys.executable, "-m", "credentialwatch_agent.cli", "local-servers", "--stdio", server_name,
+            "--providers", str(self.providers), "--seed", str(self.seed),
+            "--latency-ms", str(self.latency_ms), "--error-rate", str(self.error_rate),
+        ]
+
+    @property
+    def env(self) -> Dict[str, str]:
+        return {
+            "NPI_MCP_URL": f"http://127.0.0.1:{self.ports['npi']}/sse",
+            "CRED_DB_MCP_URL": f"http://127.0.0.1:{self.ports['cred_db']}/sse",
+            "ALERT_MCP_URL": f"http://127.0.0.1:{self.ports['alert']}/sse",
+        }
+
+    def __enter__(self) -> "_LocalServers":
+        self.process = subprocess.Popen(self.command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.monotonic() + 300
+        for port in self.ports.values():
+            while True:
+                if self.process.poll() is not None:
+                    raise RuntimeError(f"Local servers exited with code {self.process.returncode}.")
+                if time.monotonic() > deadline:
+                    raise TimeoutError("Local servers did not start in time.")
+                try:
+                    socket.create_connection(("127.0.0.1", port), timeout=1).close()
+                    break
+                except OSError:
+                    time.sleep(0.2)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmarks(
+    backend: str = "mock",
+    sweep_sizes: Sequence[int] = DEFAULT_SWEEP_SIZES,
+    streaming_modes: Sequence[bool] = (False, True),
+    chat_turns: int = 20,
+    chat_threads: int = 4,
+    latency_ms: float = 0.0,
+    error_rate: float = 0.0,
+    seed: int = SEED,
+    transports: Sequence[str] = (),
+    transport_calls: int = 200,
+    transport_concurrency: int = 8,
+) -> Dict[str, Any]:
+    """
+    Runs the sweep at each size and streaming mode, then the chat scenario, each in a
+    fresh process, and returns all results as one JSON-serializable report.
+    backend "mock" serves the synthetic servers in-process over in-memory MCP sessions;
+    "local" starts the local servers in a subprocess.
+    Each of `transports` (sse, streamable_http, stdio) is then compared on per-call
+    latency against the local servers, whatever the backend.
+    """
+    from credentialwatch_agent.transports import ENV_PREFIXES, TRANSPORTS
+
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}' (expected one of {', '.join(BACKENDS)}).")
+    unknown = [transport for transport in transports if transport not in TRANSPORTS or transport == "auto"]
+    if unknown:
+        raise ValueError(f"Unknown transports {', '.join(unknown)} (expected sse, streamable_http or stdio).")
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="credentialwatch-bench-") as workdir:
+        def run(spec: Dict[str, Any], providers: int) -> Dict[str, Any]:
+            spec = dict(spec, backend=backend, seed=seed, providers=providers)
+            spec["env"] = {
+                "ALERT_LEDGER_PATH": os.path.join(workdir, f"ledger-{len(results)}.db"),
+                "SWEEP_CHECKPOINT_PATH": os.path.join(workdir, f"sweeps-{len(results)}.db"),
+                "MCP_CACHE_ENABLED": os.getenv("MCP_CACHE_ENABLED", "true"),
+                # Rate limits model remote quotas; off unless set, so runs measure the code path.
+                "RATE_LIMIT_ENABLED": os.getenv("RATE_LIMIT_ENABLED", "false"),
+            }
+            if backend == "mock":
+                spec["env"].update({
+                    f"LOCAL_MCP_{name.upper()}_{key}": str(value)
+                    for name in ("npi", "cred_db", "alert")
+                    for key, value in (("LATENCY_MS", latency_ms), ("ERROR_RATE", error_rate))
+                })
+                return _run_isolated(spec)
+            with _LocalServers(providers, seed, latency_ms, error_rate) as servers:
+                spec["env"].update(servers.env)
+                return _run_isolated(spec)
+
+        for size in sweep_sizes:
+            plan = plan_dataset(size, seed)
+            for streaming in streaming_modes:
+                logger.info(f"Sweep benchmark: {size} items, streaming={streaming}, backend={backend}")
+                spec = {"kind": "sweep", "window_days": plan["window_days"], "streaming": streaming}
+                result = run(spec, plan["providers"])
+                results.append({"scenario": "sweep", "size": size, "streaming": streaming, **plan, **result})
+
+        logger.info("Sweep state memory: dict rows vs columnar batch")
+        results.append({"scenario": "sweep_state_memory", **measure_state_memory(seed=seed)})
+
+        if chat_turns > 0:
+            logger.info(f"Chat benchmark: {chat_turns} turns, backend={backend}")
+            result = run({"kind": "chat", "turns": chat_turns, "threads": chat_threads}, 1000)
+            results.append({"scenario": "chat", **result})
+
+        if transports:
+            providers = 1000
+            with _LocalServers(providers, seed, latency_ms, error_rate) as servers:
+                for transport in transports:
+                    logger.info(f"Transport benchmark: {transport}, {transport_calls} calls")
+                    spec = {"kind": "transport", "calls": transport_calls, "concurrency": transport_concurrency, "seed": seed, "providers": providers}
+                    spec["env"] = {
+                        **servers.env,
+                        "MCP_TRANSPORT": transport,
+                        # Every call goes to a server: no result cache, manifest or rate limits.
+                        "MCP_CACHE_ENABLED": "false",
+                        "MCP_MANIFEST_CACHE": "false",
+                        "RATE_LIMIT_ENABLED": "false",
+                    }
+                    if transport == "stdio":
+                        spec["env"].update({
+                            f"{ENV_PREFIXES[name]}_MCP_COMMAND": " ".join(servers.stdio_command(name))
+                            for name in ENV_PREFIXES
+                        })
+                    results.append({"scenario": "transport", "transport": transport, **_run_isolated(spec)})
+
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "backend": backend,
+        "latency_ms": latency_ms,
+        "error_rate": error_rate,
+        "seed": seed,
+        "results": results,
+    }
+
+def write_report(report: Dict[str, Any], path: Optional[str] = None):
+    text = json.dumps(report, indent=2)
+    if path:
+        with open(path, "w") as f:
+            f.write(text + "\n")
+        logger.info(f"Wrote benchmark report to {path}")
+    else:
+        print(text)
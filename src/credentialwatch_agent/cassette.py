@@ -0,0 +1,185 @@
+import os
+import gzip
+import json
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from langchain_core.tools import StructuredTool, ToolException
+from credentialwatch_agent.tool_index import canonical_name
+
+logger = logging.getLogger("cassette")
+
+MODES = ("off", "record", "replay")
+
+def cassette_mode() -> str:
+    mode = os.getenv("MCP_CASSETTE_MODE", "off").lower()
+    if mode not in MODES:
+        raise ValueError(f"Unknown MCP_CASSETTE_MODE '{mode}' (expected one of {', '.join(MODES)}).")
+    return mode
+
+def cassette_path() -> str:
+    return os.getenv("MCP_CASSETTE_PATH", "mcp_cassette.jsonl.gz")
+
+def _open(path: str, mode: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+def _request_key(tool_name: str, arguments: Dict[str, Any]) -> Tuple[str, str]:
+    return canonical_name(tool_name), json.dumps(arguments, sort_keys=True, default=str)
+
+class CassetteRecorder:
+    """
+    Appends MCP traffic to a cassette: one JSON line with the tool manifest each time
+    the tool list is loaded, then one line per server request with its arguments,
+    result (or error), latency and offset from the start of recording.
+    Files ending in .gz are gzip-compressed.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or cassette_path()
+        self._file = None
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self.records = 0
+
+    def _write(self, record: Dict[str, Any]):
+        line = json.dumps(record, separators=(",", ":"), default=str)
+        with self._lock:
+            if self._file is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._file = _open(self.path, "a")
+                logger.info(f"Recording MCP traffic to {self.path}")
+            self._file.write(line + "\n")
+            self.records += 1
+            if self.records % 100 == 0:
+                self._file.flush()
+
+    def record_tools(self, tools: List[Any]):
+        manifest = []
+        for tool in tools:
+            schema = getattr(tool, "args_schema", None)
+            if schema is not None and not isinstance(schema, dict):
+                schema = schema.model_json_schema()
+            manifest.append({"name": tool.name, "description": tool.description, "args_schema": schema})
+        self._write({"type": "tools", "tools": manifest})
+
+    def record_call(self, server_name: str, tool_name: str, arguments: Dict[str, Any], started: float, elapsed: float, result: Any = None, error: Optional[BaseException] = None):
+        record = {
+            "type": "call",
+            "server": server_name,
+            "tool": tool_name,
+            "args": arguments,
+            "at_ms": round((started - self._started) * 1000, 3),
+            "elapsed_ms": round(elapsed * 1000, 3),
+        }
+        if error is None:
+            record["result"] = result
+        else:
+            record["error"] = f"{type(error).__name__}: {error}"
+        self._write(record)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+class CassettePlayer:
+    """
+    Serves recorded responses instead of calling servers.
+
+    Requests are matched on tool and arguments; repeated identical requests get the
+    recorded responses in order (the last one repeats once they run out). A request with
+    no recorded match fails, unless strict is turned off (MCP_CASSETTE_STRICT=false): then
+    it gets the next recorded response of the same tool.
+    latency_scale 1.0 reproduces recorded latencies, 0 (default) replays at full speed.
+    """
+
+    def __init__(self, path: Optional[str] = None, latency_scale: Optional[float] = None, strict: Optional[bool] = None):
+        if latency_scale is None:
+            latency_scale = float(os.getenv("MCP_CASSETTE_LATENCY_SCALE", "0"))
+        if strict is None:
+            strict = os.getenv("MCP_CASSETTE_STRICT", "true").lower() not in ("0", "false", "no")
+        self.path = path or cassette_path()
+        self.latency_scale = latency_scale
+        self.strict = strict
+        self._manifest: Dict[str, Dict[str, Any]] = {}
+        self._by_request: Dict[Tuple[str, str], Deque[Dict[str, Any]]] = {}
+        self._by_tool: Dict[str, Deque[Dict[str, Any]]] = {}
+        self.calls = 0
+        self.exact_matches = 0
+        self.fallback_matches = 0
+        self._load()
+
+    def _load(self):
+        with _open(self.path, "r") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if record.get("type") == "tools":
+                    for tool in record["tools"]:
+                        self._manifest[tool["name"]] = tool
+                elif record.get("type") == "call":
+                    key = _request_key(record["tool"], record.get("args") or {})
+                    self._by_request.setdefault(key, deque()).append(record)
+                    self._by_tool.setdefault(key[0], deque()).append(record)
+        recorded = sum(len(calls) for calls in self._by_tool.values())
+        logger.info(f"Loaded cassette {self.path}: {len(self._manifest)} tools, {recorded} recorded calls.")
+
+    def _next(self, queue: Deque[Dict[str, Any]]) -> Dict[str, Any]:
+        return queue.popleft() if len(queue) > 1 else queue[0]
+
+    async def play(self, tool_name: str, arguments: Dict[str, Any]) -> Any:
+        self.calls += 1
+        key = _request_key(tool_name, arguments)
+        queue = self._by_request.get(key)
+        if queue:
+            self.exact_matches += 1
+            record = self._next(queue)
+        elif not self.strict and self._by_tool.get(key[0]):
+            self.fallback_matches += 1
+            record = self._next(self._by_tool[key[0]])
+            logger.warning(f"No recorded call of '{tool_name}' with {key[1]}; replaying another recorded call of it.")
+        else:
+            raise ToolException(f"Cassette {self.path} has no recorded call of '{tool_name}' with arguments {key[1]}.")
+
+        if self.latency_scale > 0:
+            await asyncio.sleep(record.get("elapsed_ms", 0.0) / 1000 * self.latency_scale)
+        if "error" in record:
+            raise ToolException(record["error"])
+        return record.get("result")
+
+    def tools(self) -> List[StructuredTool]:
+        """Tools built from the recorded manifest that answer from the cassette."""
+        tools = []
+        for name, spec in self._manifest.items():
+            tools.append(self._replay_tool(name, spec))
+        return tools
+
+    def _replay_tool(self, name: str, spec: Dict[str, Any]) -> StructuredTool:
+        async def _call(**arguments: Any) -> Any:
+            return await self.play(name, arguments)
+
+        return StructuredTool(
+            name=name,
+            description=spec.get("description") or name,
+            args_schema=spec.get("args_schema") or {"type": "object", "properties": {}},
+            coroutine=_call,
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "calls": self.calls,
+            "exact_matches": self.exact_matches,
+            "fallback_matches": self.fallback_matches,
+            "latency_scale": self.latency_scale,
+            "strict": self.strict,
+        }
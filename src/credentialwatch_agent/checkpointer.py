@@ -0,0 +1,254 @@
+import os
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+import aiosqlite
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+logger = logging.getLogger("checkpointer")
+
+class RetentionPolicy:
+    """
+    Limits on stored conversation state.
+    ttl_seconds: threads idle longer than this are deleted (0 disables).
+    max_threads: least recently used threads beyond this are deleted (0 disables).
+    keep_checkpoints: checkpoints kept per thread, newest first (0 keeps all).
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: Optional[float] = None,
+        max_threads: Optional[int] = None,
+        keep_checkpoints: Optional[int] = None,
+    ):
+        if ttl_seconds is None:
+            ttl_seconds = float(os.getenv("CHAT_THREAD_TTL_SECONDS", str(24 * 3600)))
+        if max_threads is None:
+            max_threads = int(os.getenv("CHAT_MAX_THREADS", "1000"))
+        if keep_checkpoints is None:
+            keep_checkpoints = int(os.getenv("CHAT_CHECKPOINTS_PER_THREAD", "10"))
+        self.ttl_seconds = ttl_seconds
+        self.max_threads = max_threads
+        self.keep_checkpoints = keep_checkpoints
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "ttl_seconds": self.ttl_seconds,
+            "max_threads": self.max_threads,
+            "keep_checkpoints": self.keep_checkpoints,
+        }
+
+class BoundedInMemorySaver(InMemorySaver):
+    """
+    InMemorySaver with per-thread TTL, LRU eviction across threads and pruning of old checkpoints.
+    """
+
+    def __init__(self, policy: Optional[RetentionPolicy] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.policy = policy or RetentionPolicy()
+        self._last_access: "OrderedDict[str, float]" = OrderedDict()
+        self.evicted_threads = 0
+        self.pruned_checkpoints = 0
+
+    def get_tuple(self, config):
+        thread_id = config["configurable"]["thread_id"]
+        if thread_id in self._last_access:
+            self._touch(thread_id)
+        return super().get_tuple(config)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        next_config = super().put(config, checkpoint, metadata, new_versions)
+        thread_id = config["configurable"]["thread_id"]
+        self._touch(thread_id)
+        self._prune_thread(thread_id, config["configurable"]["checkpoint_ns"])
+        self._evict()
+        return next_config
+
+    def delete_thread(self, thread_id: str) -> None:
+        super().delete_thread(thread_id)
+        self._last_access.pop(thread_id, None)
+
+    def _touch(self, thread_id: str):
+        self._last_access[thread_id] = time.monotonic()
+        self._last_access.move_to_end(thread_id)
+
+    def _prune_thread(self, thread_id: str, checkpoint_ns: str):
+        keep = self.policy.keep_checkpoints
+        checkpoints = self.storage[thread_id][checkpoint_ns]
+        if keep <= 0 or len(checkpoints) <= keep:
+            return
+
+        # Checkpoint ids are time-ordered, so the oldest sort first.
+        dropped_ids = sorted(checkpoints)[:-keep]
+        dropped_versions = set()
+        for checkpoint_id in dropped_ids:
+            saved_checkpoint = self.serde.loads_typed(checkpoints.pop(checkpoint_id)[0])
+            dropped_versions.update(saved_checkpoint["channel_versions"].items())
+            self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+
+        # Drop channel blobs that no remaining checkpoint refers to.
+        kept_versions = set()
+        for saved in checkpoints.values():
+            kept_versions.update(self.serde.loads_typed(saved[0])["channel_versions"].items())
+        for channel, version in dropped_versions - kept_versions:
+            self.blobs.pop((thread_id, checkpoint_ns, channel, version), None)
+        self.pruned_checkpoints += len(dropped_ids)
+
+    def _evict(self):
+        now = time.monotonic()
+        ttl = self.policy.ttl_seconds
+        while self._last_access:
+            thread_id, last_access = next(iter(self._last_access.items()))
+            expired = ttl > 0 and now - last_access > ttl
+            over_limit = 0 < self.policy.max_threads < len(self._last_access)
+            if not (expired or over_limit):
+                break
+            self.delete_thread(thread_id)
+            self.evicted_threads += 1
+
+    def stats(self) -> Dict[str, Any]:
+        checkpoints = sum(len(c) for namespaces in self.storage.values() for c in namespaces.values())
+        blob_bytes = sum(len(value[1]) for value in self.blobs.values())
+        checkpoint_bytes = sum(
+            len(saved[0][1]) + len(saved[1][1])
+            for namespaces in self.storage.values()
+            for c in namespaces.values()
+            for saved in c.values()
+        )
+        return {
+            "backend": "memory",
+            "threads": len(self._last_access),
+            "checkpoints": checkpoints,
+            "approx_bytes": blob_bytes + checkpoint_bytes,
+            "evicted_threads": self.evicted_threads,
+            "pruned_checkpoints": self.pruned_checkpoints,
+            **self.policy.as_dict(),
+        }
+
+class BoundedSqliteSaver(AsyncSqliteSaver):
+    """
+    On-disk AsyncSqliteSaver with the same retention rules as BoundedInMemorySaver.
+    Thread access times are kept in the same database, so limits survive restarts.
+    """
+
+    def __init__(self, conn: aiosqlite.Connection, policy: Optional[RetentionPolicy] = None, **kwargs):
+        super().__init__(conn, **kwargs)
+        self.policy = policy or RetentionPolicy()
+        self.evicted_threads = 0
+        self.pruned_checkpoints = 0
+
+    async def setup(self) -> None:
+        if self.is_setup:
+            return
+        await super().setup()
+        async with self.lock:
+            await self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS thread_access (thread_id TEXT PRIMARY KEY, last_access REAL NOT NULL)"
+            )
+            await self.conn.execute("CREATE INDEX IF NOT EXISTS thread_access_last ON thread_access (last_access)")
+            await self.conn.commit()
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        next_config = await super().aput(config, checkpoint, metadata, new_versions)
+        thread_id = str(config["configurable"]["thread_id"])
+        await self._after_put(thread_id, config["configurable"]["checkpoint_ns"])
+        return next_config
+
+    async def _after_put(self, thread_id: str, checkpoint_ns: str):
+        keep = self.policy.keep_checkpoints
+        async with self.lock:
+            await self.conn.execute(
+                "INSERT INTO thread_access (thread_id, last_access) VALUES (?, ?) "
+                "ON CONFLICT (thread_id) DO UPDATE SET last_access = excluded.last_access",
+                (thread_id, time.time()),
+            )
+            if keep > 0:
+                cursor = await self.conn.execute(
+                    """
+                    DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id NOT IN (
+                        SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?
+                        ORDER BY checkpoint_id DESC LIMIT ?
+                    )
+                    """,
+                    (thread_id, checkpoint_ns, thread_id, checkpoint_ns, keep),
+                )
+                self.pruned_checkpoints += max(cursor.rowcount, 0)
+                await self.conn.execute(
+                    """
+                    DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id NOT IN (
+                        SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?
+                    )
+                    """,
+                    (thread_id, checkpoint_ns, thread_id, checkpoint_ns),
+                )
+
+            stale = []
+            if self.policy.ttl_seconds > 0:
+                async with self.conn.execute(
+                    "SELECT thread_id FROM thread_access WHERE last_access < ?",
+                    (time.time() - self.policy.ttl_seconds,),
+                ) as rows:
+                    stale.extend([row[0] async for row in rows])
+            if self.policy.max_threads > 0:
+                async with self.conn.execute(
+                    "SELECT thread_id FROM thread_access ORDER BY last_access DESC LIMIT -1 OFFSET ?",
+                    (self.policy.max_threads,),
+                ) as rows:
+                    stale.extend([row[0] async for row in rows])
+            await self.conn.commit()
+
+        for stale_thread_id in dict.fromkeys(stale):
+            await self.adelete_thread(stale_thread_id)
+            async with self.lock:
+                await self.conn.execute("DELETE FROM thread_access WHERE thread_id = ?", (stale_thread_id,))
+                await self.conn.commit()
+            self.evicted_threads += 1
+
+    async def astats(self) -> Dict[str, Any]:
+        await self.setup()
+        async with self.lock:
+            async with self.conn.execute("SELECT COUNT(*) FROM thread_access") as rows:
+                threads = (await rows.fetchone())[0]
+            async with self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(checkpoint) + LENGTH(metadata)), 0) FROM checkpoints"
+            ) as rows:
+                checkpoints, checkpoint_bytes = await rows.fetchone()
+            async with self.conn.execute("SELECT COALESCE(SUM(LENGTH(value)), 0) FROM writes") as rows:
+                write_bytes = (await rows.fetchone())[0]
+        return {
+            "backend": "sqlite",
+            "threads": threads,
+            "checkpoints": checkpoints,
+            "approx_bytes": checkpoint_bytes + write_bytes,
+            "evicted_threads": self.evicted_threads,
+            "pruned_checkpoints": self.pruned_checkpoints,
+            **self.policy.as_dict(),
+        }
+
+def create_chat_checkpointer(backend: Optional[str] = None, policy: Optional[RetentionPolicy] = None) -> BaseCheckpointSaver:
+    """
+    Creates the conversation checkpointer selected by CHAT_CHECKPOINTER ("memory" or "sqlite").
+    The sqlite backend stores threads in CHAT_CHECKPOINT_PATH and must be created inside a running event loop.
+    """
+    backend = (backend or os.getenv("CHAT_CHECKPOINTER", "memory")).lower()
+    if backend == "memory":
+        return BoundedInMemorySaver(policy=policy)
+    if backend == "sqlite":
+        path = os.getenv("CHAT_CHECKPOINT_PATH", "chat_checkpoints.db")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        logger.info(f"Using SQLite chat checkpointer at {path}")
+        return BoundedSqliteSaver(aiosqlite.connect(path), policy=policy)
+    raise ValueError(f"Unknown CHAT_CHECKPOINTER backend '{backend}' (expected 'memory' or 'sqlite').")
+
+async def checkpointer_stats(saver: BaseCheckpointSaver) -> Dict[str, Any]:
+    """Returns size and eviction counters for a checkpointer created by create_chat_checkpointer."""
+    if isinstance(saver, BoundedSqliteSaver):
+        return await saver.astats()
+    if isinstance(saver, BoundedInMemorySaver):
+        return saver.stats()
+    return {"backend": type(saver).__name__}
@@ -0,0 +1,173 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+import logging
+from typing import List, Optional
+
+def _parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="credentialwatch", description="CredentialWatch agent command line.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    sweep = subparsers.add_parser("sweep", help="Run an expiry sweep and log alerts.")
+    sweep.add_argument("--window-days", type=int, default=90, help="Look-ahead window in days (default: 90).")
+    sweep.add_argument("--full", action="store_true", help="Alert every expiring credential, ignoring the alert ledger.")
+    sweep.add_argument("--streaming", action="store_true", default=None, help="Page through credentials instead of loading them all.")
+    sweep.add_argument("--resume", metavar="RUN_ID", help="Continue an incomplete sweep run from its last checkpoint.")
+    sweep.add_argument("--workers", type=int, help="Alert in this many worker processes, split into partitions (default: SWEEP_WORKERS, 0 = off).")
+    sweep.add_argument("--partition-by", choices=("provider", "expiry", "credential_type"), help="How to partition a multi-worker sweep (default: provider).")
+    sweep.add_argument("--list-incomplete", action="store_true", help="List incomplete sweep runs and exit.")
+
+    servers = subparsers.add_parser("local-servers", help="Serve local npi, cred_db and alert MCP servers with synthetic data.")
+    servers.add_argument("--providers", type=int, default=1000, help="Number of synthetic providers (default: 1000).")
+    servers.add_argument("--credentials-per-provider", type=float, default=2.5, help="Average credentials per provider (default: 2.5).")
+    servers.add_argument("--seed", type=int, default=42, help="Random seed for the synthetic data (default: 42).")
+    servers.add_argument("--host", default="127.0.0.1", help="Interface to listen on (default: 127.0.0.1).")
+    servers.add_argument("--npi-port", type=int, default=8001)
+    servers.add_argument("--cred-db-port", type=int, default=8002)
+    servers.add_argument("--alert-port", type=int, default=8003)
+    servers.add_argument("--latency-ms", type=float, default=0.0, help="Fixed latency added to every tool call.")
+    servers.add_argument("--jitter-ms", type=float, default=0.0, help="Mean of an extra, exponentially distributed latency.")
+    servers.add_argument("--error-rate", type=float, default=0.0, help="Probability that a tool call fails (0-1).")
+    servers.add_argument("--stdio", choices=("npi", "cred_db", "alert"), help="Serve only this server, over stdin/stdout.")
+
+    bench = subparsers.add_parser("bench", help="Benchmark sweep throughput and chat-turn latency; prints a JSON report.")
+    bench.add_argument("--backend", choices=("mock", "local"), default="mock",
+                       help="mock: synthetic servers in-process over in-memory MCP sessions; local: local SSE servers in a subprocess.")
+    bench.add_argument("--sizes", default="1000,10000,100000", help="Comma-separated sweep sizes in expiring items (default: 1000,10000,100000).")
+    bench.add_argument("--modes", choices=("batch", "streaming", "both"), default="both", help="Sweep modes to run (default: both).")
+    bench.add_argument("--chat-turns", type=int, default=20, help="Chat turns with the fake chat model; 0 skips chat (default: 20).")
+    bench.add_argument("--latency-ms", type=float, default=0.0, help="Latency injected into every tool call.")
+    bench.add_argument("--error-rate", type=float, default=0.0, help="Probability that a tool call fails (0-1).")
+    bench.add_argument("--seed", type=int, default=42)
+    bench.add_argument("--transports", default="", help="Comma-separated MCP transports to compare on per-call latency against local servers, e.g. sse,streamable_http,stdio.")
+    bench.add_argument("--transport-calls", type=int, default=200, help="Calls per transport, sequential and then concurrent (default: 200).")
+    bench.add_argument("--output", help="Write the JSON report to this file instead of stdout.")
+
+    check = subparsers.add_parser("mcp-check", help="Connect to the MCP servers, list tools and run a few read-only calls.")
+    check.add_argument("--query", default="cardiology", help="search_providers query (default: cardiology).")
+    check.add_argument("--window-days", type=int, default=90, help="list_expiring_credentials window (default: 90).")
+    cassette = check.add_mutually_exclusive_group()
+    cassette.add_argument("--record", metavar="PATH", help="Record the MCP traffic to this cassette.")
+    cassette.add_argument("--replay", metavar="PATH", help="Serve the calls from this cassette instead of the servers.")
+    check.add_argument("--latency-scale", type=float, help="With --replay: 1 reproduces recorded latencies, 0 runs at full speed.")
+
+    return parser.parse_args(argv)
+
+async def _run_sweep(args: argparse.Namespace):
+    from credentialwatch_agent.main import run_expiry_sweep, list_incomplete_sweeps
+    from credentialwatch_agent.mcp_client import mcp_client
+
+    if args.list_incomplete:
+        return await list_incomplete_sweeps()
+    try:
+        return await run_expiry_sweep(args.window_days, streaming=args.streaming, full=args.full, resume=args.resume,
+                                      workers=args.workers, partition_by=args.partition_by)
+    finally:
+        await mcp_client.close()
+
+async def _run_local_servers(args: argparse.Namespace):
+    from credentialwatch_agent.local_servers.synthetic import SyntheticDataset
+    from credentialwatch_agent.local_servers.servers import serve, serve_stdio
+
+    dataset = SyntheticDataset(args.providers, args.credentials_per_provider, seed=args.seed)
+    if args.stdio:
+        await serve_stdio(dataset, args.stdio, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate)
+        return
+    await serve(
+        dataset,
+        host=args.host,
+        ports={"npi": args.npi_port, "cred_db": args.cred_db_port, "alert": args.alert_port},
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+    )
+
+def _run_bench(args: argparse.Namespace):
+    from credentialwatch_agent.benchmarks.runner import run_benchmarks, write_report
+
+    modes = {"batch": (False,), "streaming": (True,), "both": (False, True)}[args.modes]
+    report = run_benchmarks(
+        backend=args.backend,
+        sweep_sizes=[int(size) for size in args.sizes.split(",") if size.strip()],
+        streaming_modes=modes,
+        chat_turns=args.chat_turns,
+        latency_ms=args.latency_ms,
+        error_rate=args.error_rate,
+        seed=args.seed,
+        transports=[transport.strip().replace("-", "_") for transport in args.transports.split(",") if transport.strip()],
+        transport_calls=args.transport_calls,
+    )
+    write_report(report, args.output)
+
+async def _run_mcp_check(args: argparse.Namespace):
+    # The global client reads the cassette settings when it is created.
+    if args.record:
+        os.environ.update({"MCP_CASSETTE_MODE": "record", "MCP_CASSETTE_PATH": args.record})
+    elif args.replay:
+        os.environ.update({"MCP_CASSETTE_MODE": "replay", "MCP_CASSETTE_PATH": args.replay})
+    if args.latency_scale is not None:
+        os.environ["MCP_CASSETTE_LATENCY_SCALE"] = str(args.latency_scale)
+    from credentialwatch_agent.mcp_client import mcp_client, parse_tool_result
+    from credentialwatch_agent.transports import ENV_PREFIXES, server_transport
+
+    report = {
+        "urls": {"npi": mcp_client.npi_url, "cred_db": mcp_client.cred_db_url, "alert": mcp_client.alert_url},
+        "transports": {name: server_transport(name) for name in ENV_PREFIXES},
+        "cassette_mode": mcp_client.cassette_mode,
+        "calls": [],
+    }
+    try:
+        started = time.perf_counter()
+        await mcp_client.connect()
+        report["connect_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        report["tools"] = sorted(tool.name for tool in mcp_client.get_tools())
+        report["mock_mode"] = mcp_client.tool_stats()["mock_mode"]
+
+        checks = [
+            ("npi", "search_providers", {"query": args.query}),
+            ("cred_db", "list_expiring_credentials", {"window_days": args.window_days}),
+        ]
+        for server_name, tool_name, arguments in checks:
+            call = {"server": server_name, "tool": tool_name, "args": arguments}
+            started = time.perf_counter()
+            try:
+                result = parse_tool_result(await mcp_client.call_tool(server_name, tool_name, arguments))
+                call["ok"] = True
+                call["result"] = {key: len(value) if isinstance(value, list) else value for key, value in result.items()} if isinstance(result, dict) else result
+            except Exception as e:
+                call["ok"] = False
+                call["error"] = f"{type(e).__name__}: {e}"
+            call["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            report["calls"].append(call)
+        report["cassette"] = mcp_client.cassette_stats()
+        report["startup"] = mcp_client.startup_stats()
+        report["servers"] = mcp_client.server_stats()
+        report["http_pool"] = mcp_client.http_pool_stats()
+    finally:
+        await mcp_client.close()
+    return report
+
+def main(argv: Optional[List[str]] = None):
+    args = _parse_args(argv)
+    if args.command == "sweep":
+        result = asyncio.run(_run_sweep(args))
+        print(json.dumps(result, indent=2, default=str))
+    elif args.command == "local-servers":
+        # Over stdio the client owns stderr too; keep it to warnings.
+        level = logging.WARNING if args.stdio else logging.INFO
+        logging.basicConfig(level=level, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+        try:
+            asyncio.run(_run_local_servers(args))
+        except KeyboardInterrupt:
+            pass
+    elif args.command == "bench":
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+        _run_bench(args)
+    elif args.command == "mcp-check":
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+        print(json.dumps(asyncio.run(_run_mcp_check(args)), indent=2, default=str))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+import os
+import json
+import logging
+from typing import Any, Dict, List, Optional, Sequence
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage, ToolMessage
+from langgraph.graph.message import add_messages
+from credentialwatch_agent.mcp_client import parse_tool_result
+from credentialwatch_agent.tool_index import canonical_name
+
+logger = logging.getLogger("compaction")
+
+# Fields kept per record, per tool (dotted paths reach into nested records). Tools not
+# listed keep every field. Lists inside a kept record (e.g. licenses) are kept whole,
+# only capped in length.
+TOOL_PROJECTIONS: Dict[str, List[str]] = {
+    "search_providers": [
+        "npi", "full_name", "name", "primary_specialty", "primary_taxonomy", "taxonomy",
+        "primary_address.city", "primary_address.state",
+    ],
+    "get_provider_by_npi": [
+        "npi", "full_name", "name", "enumeration_type", "primary_specialty", "primary_taxonomy",
+        "primary_address.city", "primary_address.state", "licenses",
+    ],
+}
+
+# Per-tool row caps; other tools use TOOL_RESULT_MAX_ROWS.
+TOOL_MAX_ROWS: Dict[str, int] = {
+    "search_providers": 10,
+}
+
+def compaction_enabled() -> bool:
+    return os.getenv("TOOL_COMPACTION_ENABLED", "true").lower() in ("1", "true", "yes")
+
+def approx_tokens(text: str) -> int:
+    """Rough token estimate (about 4 characters per token), without a tokenizer download."""
+    return (len(text) + 3) // 4
+
+def message_tokens(message: BaseMessage) -> int:
+    content = message.content if isinstance(message.content, str) else json.dumps(message.content, default=str)
+    tokens = approx_tokens(content)
+    for tool_call in getattr(message, "tool_calls", None) or []:
+        tokens += approx_tokens(json.dumps(tool_call.get("args", {}), default=str)) + 4
+    return tokens + 4
+
+def _project(record: Any, fields: Sequence[str]) -> Any:
+    if not isinstance(record, dict):
+        return record
+    projected: Dict[str, Any] = {}
+    for path in fields:
+        source = record
+        parts = path.split(".")
+        for part in parts:
+            if not isinstance(source, dict) or part not in source:
+                break
+            source = source[part]
+        else:
+            target = projected
+            for part in parts[:-1]:
+                target = target.setdefault(part, {})
+            target[parts[-1]] = source
+    return projected
+
+def _compact_rows(rows: List[Any], fields: Optional[Sequence[str]], max_rows: int) -> List[Any]:
+    if fields:
+        rows = [_project(row, fields) for row in rows]
+    return rows[:max_rows] if max_rows > 0 else rows
+
+def _cap_lists(data: Dict[str, Any], rows: Dict[str, List[Any]]) -> Dict[str, Any]:
+    """data with each list in `rows` (key -> compacted list) replaced, plus a "<key>_more_not_shown" count for capped ones."""
+    compacted: Dict[str, Any] = {}
+    for key, value in data.items():
+        if key in rows:
+            compacted[key] = rows[key]
+            if len(rows[key]) < len(value):
+                compacted[f"{key}_more_not_shown"] = len(value) - len(rows[key])
+        else:
+            compacted[key] = value
+    return compacted
+
+def _is_record(data: Dict[str, Any], fields: Optional[Sequence[str]]) -> bool:
+    """True if the dict is itself a projected record rather than a wrapper around a list of them."""
+    return bool(fields) and any(path.split(".")[0] in data for path in fields)
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"), default=str)
+
+def compact_tool_result(
+    tool_name: str,
+    result: Any,
+    max_rows: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+) -> str:
+    """
+    Shrinks a tool result before it enters the conversation: projects each record to
+    the fields in TOOL_PROJECTIONS, caps lists at max_rows with a "N more" marker and
+    keeps the serialized result within max_bytes.
+
+    A dict result is either one record (projected itself; its lists are only capped) or
+    a wrapper such as {"results": [...], "total": n} (each list's rows are projected).
+    """
+    name = canonical_name(tool_name)
+    if max_rows is None:
+        max_rows = TOOL_MAX_ROWS.get(name, int(os.getenv("TOOL_RESULT_MAX_ROWS", "20")))
+    if max_bytes is None:
+        max_bytes = int(os.getenv("TOOL_RESULT_MAX_BYTES", "6000"))
+    fields = TOOL_PROJECTIONS.get(name)
+
+    data = parse_tool_result(result)
+    if isinstance(data, list):
+        compacted: Any = _compact_rows(data, fields, max_rows)
+        if len(compacted) < len(data):
+            compacted = {"results": compacted, "more_not_shown": len(data) - len(compacted)}
+    elif isinstance(data, dict) and _is_record(data, fields):
+        record = _project(data, fields)
+        compacted = _cap_lists(record, {k: _compact_rows(v, None, max_rows) for k, v in record.items() if isinstance(v, list)})
+    elif isinstance(data, dict):
+        compacted = _cap_lists(data, {k: _compact_rows(v, fields, max_rows) for k, v in data.items() if isinstance(v, list)})
+    elif isinstance(data, str):
+        compacted = data
+    else:
+        compacted = data
+
+    text = compacted if isinstance(compacted, str) else _dumps(compacted)
+    if max_bytes > 0 and len(text.encode("utf-8")) > max_bytes:
+        marker = f" …[truncated, {len(text)} chars total]"
+        text = text.encode("utf-8")[:max(0, max_bytes - len(marker.encode("utf-8")))].decode("utf-8", "ignore") + marker
+    return text
+
+class CompactionStats:
+    """Running totals of approximate tokens before and after compaction."""
+
+    def __init__(self):
+        self.results = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+        self.history_trims = 0
+        self.history_tokens_dropped = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "results_compacted": self.results,
+            "tool_tokens_before": self.tokens_before,
+            "tool_tokens_after": self.tokens_after,
+            "tool_tokens_saved": self.tokens_before - self.tokens_after,
+            "history_trims": self.history_trims,
+            "history_tokens_dropped": self.history_tokens_dropped,
+        }
+
+compaction_stats = CompactionStats()
+
+def compact_tool_message(message: ToolMessage) -> ToolMessage:
+    """Returns a copy of a ToolMessage with compacted content, recording token counts."""
+    if not compaction_enabled() or message.status == "error":
+        return message
+    before = message_tokens(message)
+    content = compact_tool_result(message.name or "", message.content)
+    compacted = message.model_copy(update={"content": content})
+    after = message_tokens(compacted)
+
+    compaction_stats.results += 1
+    compaction_stats.tokens_before += before
+    compaction_stats.tokens_after += after
+    logger.info(f"Compacted result of '{message.name}': ~{before} -> ~{after} tokens.")
+    return compacted
+
+def trim_history(messages: List[BaseMessage], max_tokens: int) -> List[BaseMessage]:
+    """
+    Keeps leading system messages and as many of the most recent whole turns (a human
+    message and everything after it) as fit in max_tokens. The latest turn is always kept,
+    so tool calls are never separated from their results.
+    """
+    if max_tokens <= 0:
+        return messages
+    total = sum(message_tokens(m) for m in messages)
+    if total <= max_tokens:
+        return messages
+
+    head = 0
+    while head < len(messages) and isinstance(messages[head], SystemMessage):
+        head += 1
+    turn_starts = [i for i in range(head, len(messages)) if isinstance(messages[i], HumanMessage)]
+    if not turn_starts:
+        return messages
+
+    budget = max_tokens - sum(message_tokens(m) for m in messages[:head])
+    keep_from = turn_starts[-1]
+    used = sum(message_tokens(m) for m in messages[keep_from:])
+    for start in reversed(turn_starts[:-1]):
+        turn_tokens = sum(message_tokens(m) for m in messages[start:keep_from])
+        if used + turn_tokens > budget:
+            break
+        used += turn_tokens
+        keep_from = start
+
+    if keep_from == head:
+        return messages
+    trimmed = messages[:head] + messages[keep_from:]
+    compaction_stats.history_trims += 1
+    compaction_stats.history_tokens_dropped += total - sum(message_tokens(m) for m in trimmed)
+    return trimmed
+
+def add_messages_bounded(left: List[BaseMessage], right: Any) -> List[BaseMessage]:
+    """
+    add_messages reducer that trims the history to CHAT_HISTORY_MAX_TOKENS (0 disables)
+    so prompts stay bounded as conversations grow.
+    """
+    merged = add_messages(left, right)
+    return trim_history(merged, int(os.getenv("CHAT_HISTORY_MAX_TOKENS", "8000")))
@@ -0,0 +1,503 @@
+import os
+import re
+import time
+import heapq
+import asyncio
+import logging
+from bisect import bisect_left, bisect_right, insort
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from langchain_core.tools import StructuredTool
+from credentialwatch_agent.mcp_client import mcp_client, parse_tool_result
+from credentialwatch_agent.result_cache import INVALIDATES
+from credentialwatch_agent import metrics
+
+logger = logging.getLogger("expiry_index")
+
+# Writes that can change which credentials expire when.
+_WRITES = frozenset(name for name, stale in INVALIDATES.items() if "list_expiring_credentials" in stale)
+
+# (expiry date ordinal, row id): index entries sort by expiry date, then arrival.
+Entry = Tuple[int, int]
+
+def index_enabled() -> bool:
+    return os.getenv("EXPIRY_INDEX_ENABLED", "true").lower() in ("1", "true", "yes")
+
+def matches_specialty(record: Dict[str, Any], specialty: str) -> bool:
+    """True if every word of `specialty` stems a word of the record's specialty or taxonomy code."""
+    # Stems, so "cardiology" matches "Cardiovascular Disease" and "orthopedics" "Orthopaedic Surgery".
+    text = f"{record.get('primary_specialty') or ''} {record.get('primary_taxonomy') or ''} {record.get('taxonomy') or ''}".lower()
+    words = re.findall(r"[a-z0-9]+", text)
+    stems = [w[:6] for w in re.findall(r"[a-z]+", specialty.lower()) if len(w) >= 3]
+    if not stems:
+        return specialty.strip().lower() in words
+    return all(any(word.startswith(stem) for word in words) for stem in stems)
+
+def _taxonomy(row: Dict[str, Any]) -> Optional[str]:
+    return row.get("primary_taxonomy") or row.get("taxonomy")
+
+def _state(row: Dict[str, Any]) -> Optional[str]:
+    state = row.get("state") or (row.get("primary_address") or {}).get("state")
+    return state.upper() if isinstance(state, str) else None
+
+def _row_key(row: Dict[str, Any]) -> Any:
+    credential_id = row.get("credential_id")
+    return credential_id if credential_id is not None else (row.get("provider_id"), row.get("credential"))
+
+def _expiry_ordinal(row: Dict[str, Any], today: int) -> Optional[int]:
+    expiry = row.get("expiry_date")
+    if expiry:
+        try:
+            return date.fromisoformat(str(expiry)[:10]).toordinal()
+        except ValueError:
+            pass
+    days = row.get("days_remaining")
+    return today + int(days) if isinstance(days, (int, float)) else None
+
+class ExpiryIndex:
+    """
+    In-process copy of the credentials expiring within a horizon, kept sorted by expiry
+    date with secondary indexes on taxonomy, state and credential type, so "expiring in
+    N days" questions with any of those filters are answered by binary search instead of
+    a list_expiring_credentials round trip.
+
+    The index is hydrated from cred_db's list_expiring_credentials (paged by cursor when
+    the tool supports it) for the widest window asked for so far, up to
+    EXPIRY_INDEX_HORIZON_DAYS; warm() loads the whole horizon up front. When the tool
+    takes an updated_since sync cursor, the index is kept current by fetching only the
+    credentials updated since the last refresh; without one it is re-hydrated instead.
+    Servers may leave credentials that moved out of the window out of those updates, so
+    the index is also re-hydrated every EXPIRY_INDEX_FULL_SYNC_SECONDS. It refreshes
+    before answering once it is older than EXPIRY_INDEX_MAX_AGE_SECONDS, after a
+    credential write through mcp_client, and on a new day. query(fresh=True), for
+    sweeps, first re-fetches the whole window and drops the credentials the server no
+    longer returns in it. Queries it cannot
+    answer (a window beyond the horizon, a filter on a field the server does not
+    return, a failed refresh) return None, and callers ask the server instead.
+    """
+
+    def __init__(self, enabled: Optional[bool] = None, horizon_days: Optional[int] = None, max_age: Optional[float] = None, page_size: Optional[int] = None, full_sync_interval: Optional[float] = None):
+        if enabled is None:
+            enabled = index_enabled()
+        if horizon_days is None:
+            horizon_days = int(os.getenv("EXPIRY_INDEX_HORIZON_DAYS", "365"))
+        if max_age is None:
+            max_age = float(os.getenv("EXPIRY_INDEX_MAX_AGE_SECONDS", "60"))
+        if page_size is None:
+            page_size = int(os.getenv("EXPIRY_INDEX_PAGE_SIZE", "5000"))
+        if full_sync_interval is None:
+            full_sync_interval = float(os.getenv("EXPIRY_INDEX_FULL_SYNC_SECONDS", "900"))
+        self.enabled = enabled
+        self.horizon_days = horizon_days
+        self.max_age = max_age
+        self.page_size = page_size
+        self.full_sync_interval = full_sync_interval
+
+        self._entries: List[Entry] = []
+        self._rows: Dict[int, Dict[str, Any]] = {}
+        self._entry_of: Dict[Any, Entry] = {}
+        self._by_taxonomy: Dict[str, List[Entry]] = {}
+        self._by_state: Dict[str, List[Entry]] = {}
+        self._by_credential: Dict[str, List[Entry]] = {}
+        # Taxonomy code -> specialty text, for matching "cardiology" to 207RC0000X.
+        self._specialties: Dict[str, str] = {}
+        self._next_id = 0
+
+        # Window currently loaded: credentials expiring from _day through _day + _horizon.
+        self._day: Optional[int] = None
+        self._horizon = 0
+        self._sync_cursor: Optional[str] = None
+        self._refreshed_at = 0.0
+        self._hydrated_at = 0.0
+        self._failed_at = float("-inf")
+        self._dirty = False
+        self._refresh_task: Optional[asyncio.Task] = None
+
+        self.hydrations = 0
+        self.refreshes = 0
+        self.updates_applied = 0
+        self.resyncs = 0
+        self.evicted = 0
+        self.refresh_errors = 0
+        self.queries = 0
+        self.fallbacks = 0
+        self.query_seconds = 0.0
+        self.last_hydrate_ms = 0.0
+        self.last_refresh_ms = 0.0
+
+    def on_tool_call(self, tool_name: str, seconds: float, ok: bool):
+        """mcp_client call listener: a credential write makes the next query refresh first."""
+        if tool_name in _WRITES:
+            self._dirty = True
+
+    def _needs_hydrate(self, window_days: int, today: int) -> bool:
+        return (
+            self._day != today
+            or window_days > self._horizon
+            or time.monotonic() - self._hydrated_at > self.full_sync_interval
+        )
+
+    def _needs_refresh(self, window_days: int) -> bool:
+        return (
+            self._needs_hydrate(window_days, date.today().toordinal())
+            or self._dirty
+            or time.monotonic() - self._refreshed_at > self.max_age
+        )
+
+    async def refresh(self, window_days: int = 0, fresh: bool = False):
+        """
+        Brings the index up to date, covering at least window_days. Concurrent callers share
+        one refresh; fresh=True always re-fetches the window, after any refresh in flight.
+        """
+        while self._refresh_task is not None and not self._refresh_task.done():
+            await asyncio.shield(self._refresh_task)
+        if not fresh and not self._needs_refresh(window_days):
+            return
+        self._refresh_task = asyncio.ensure_future(self._refresh(window_days, fresh))
+        await asyncio.shield(self._refresh_task)
+
+    async def _refresh(self, window_days: int, fresh: bool = False):
+        today = date.today().toordinal()
+        started = time.perf_counter()
+        incremental = not self._needs_hydrate(window_days, today)
+        if incremental and fresh:
+            # Only the window is brought up to date, so a pending write or age still refreshes the rest.
+            evicted = await self._resync(window_days)
+            self.last_refresh_ms = (time.perf_counter() - started) * 1000
+            self.resyncs += 1
+            logger.info(f"Re-fetched the {window_days}-day window of the expiry index in {self.last_refresh_ms:.1f} ms ({evicted} credentials dropped).")
+            return
+        self._dirty = False
+        try:
+            if incremental and self._sync_cursor is not None:
+                changed = await self._fetch_updates()
+                self.last_refresh_ms = (time.perf_counter() - started) * 1000
+                self.refreshes += 1
+                logger.info(f"Applied {changed} credential updates to the expiry index in {self.last_refresh_ms:.1f} ms.")
+            else:
+                await self._hydrate(max(window_days, self._horizon if self._day == today else 0), today)
+                self.last_hydrate_ms = (time.perf_counter() - started) * 1000
+                self.hydrations += 1
+                logger.info(f"Hydrated the expiry index with {len(self._entries)} credentials expiring within {self._horizon} days in {self.last_hydrate_ms:.0f} ms.")
+        except BaseException:
+            self._dirty = True
+            raise
+        self._refreshed_at = time.monotonic()
+
+    @staticmethod
+    def _schema() -> Dict[str, Any]:
+        return (mcp_client.get_tool_schema("cred_db", "list_expiring_credentials") or {}).get("properties", {})
+
+    async def _fetch_window(self, window_days: int, schema: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """All credentials expiring within window_days, and the sync cursor from before the first page."""
+        supports_cursor = "cursor" in schema and "limit" in schema
+        arguments: Dict[str, Any] = {"window_days": window_days}
+        if supports_cursor:
+            arguments["limit"] = self.page_size
+
+        rows: List[Dict[str, Any]] = []
+        sync_cursor = None
+        while True:
+            result = parse_tool_result(await mcp_client.call_tool("cred_db", "list_expiring_credentials", arguments))
+            if not isinstance(result, dict) or "error" in result:
+                raise RuntimeError(f"list_expiring_credentials returned no credentials: {str(result)[:200]}")
+            rows.extend(row for row in result.get("expiring", []) if isinstance(row, dict))
+            # The cursor from before the first page: updates made while paging are fetched again.
+            if sync_cursor is None:
+                sync_cursor = result.get("sync_cursor")
+            if not (supports_cursor and result.get("next_cursor")):
+                break
+            arguments["cursor"] = result["next_cursor"]
+        return rows, sync_cursor
+
+    async def _hydrate(self, horizon: int, today: int):
+        schema = self._schema()
+        rows, sync_cursor = await self._fetch_window(horizon, schema)
+        self._clear()
+        keyed = []
+        for row in rows:
+            expiry = _expiry_ordinal(row, today)
+            if expiry is not None:
+                keyed.append(((expiry, self._next_id), row))
+                self._next_id += 1
+        keyed.sort(key=lambda item: item[0])
+        for entry, row in keyed:
+            self._rows[entry[1]] = row
+            self._entry_of[_row_key(row)] = entry
+            self._entries.append(entry)
+            for index, key in self._secondary_keys(row):
+                index.setdefault(key, []).append(entry)
+        self._day = today
+        self._horizon = horizon
+        self._sync_cursor = sync_cursor if "updated_since" in schema else None
+        self._hydrated_at = time.monotonic()
+
+    async def _resync(self, window_days: int) -> int:
+        """
+        Replaces the credentials expiring within window_days with the server's current list,
+        dropping those it no longer returns (e.g. renewed past the horizon). The sync cursor
+        is kept: updates outside the window still have to be fetched. Returns the number dropped.
+        """
+        rows, _ = await self._fetch_window(window_days, self._schema())
+        fetched = {_row_key(row) for row in rows}
+        end = self._day + window_days
+        missing = [key for key, entry in self._entry_of.items() if entry[0] <= end and key not in fetched]
+        for key in missing:
+            self._drop(key)
+        for row in rows:
+            self._apply(row)
+        self.evicted += len(missing)
+        return len(missing)
+
+    async def _fetch_updates(self) -> int:
+        result = parse_tool_result(await mcp_client.call_tool(
+            "cred_db", "list_expiring_credentials", {"window_days": self._horizon, "updated_since": self._sync_cursor}
+        ))
+        if not isinstance(result, dict) or "error" in result or not result.get("sync_cursor"):
+            raise RuntimeError(f"list_expiring_credentials returned no updates: {str(result)[:200]}")
+        rows = [row for row in result.get("expiring", []) if isinstance(row, dict)]
+        for row in rows:
+            self._apply(row)
+        self._sync_cursor = result["sync_cursor"]
+        self.updates_applied += len(rows)
+        return len(rows)
+
+    def _drop(self, key: Any):
+        old = self._entry_of.pop(key, None)
+        if old is not None:
+            self._remove(self._entries, old)
+            for index, index_key in self._secondary_keys(self._rows.pop(old[1])):
+                self._remove(index.get(index_key, []), old)
+
+    def _apply(self, row: Dict[str, Any]):
+        """Moves an updated credential to its new expiry date, or drops it if it left the horizon."""
+        key = _row_key(row)
+        old = self._entry_of.get(key)
+        if old is not None and self._rows[old[1]] == row:
+            return
+        self._drop(key)
+        expiry = _expiry_ordinal(row, self._day)
+        if expiry is None or not self._day <= expiry <= self._day + self._horizon:
+            return
+        entry = (expiry, self._next_id)
+        self._next_id += 1
+        self._rows[entry[1]] = row
+        self._entry_of[key] = entry
+        insort(self._entries, entry)
+        for index, index_key in self._secondary_keys(row):
+            insort(index.setdefault(index_key, []), entry)
+
+    @staticmethod
+    def _remove(entries: List[Entry], entry: Entry):
+        position = bisect_left(entries, entry)
+        if position < len(entries) and entries[position] == entry:
+            del entries[position]
+
+    def _secondary_keys(self, row: Dict[str, Any]) -> Iterable[Tuple[Dict[str, List[Entry]], str]]:
+        taxonomy = _taxonomy(row)
+        if taxonomy:
+            if row.get("primary_specialty"):
+                self._specialties.setdefault(taxonomy, row["primary_specialty"])
+            yield self._by_taxonomy, taxonomy
+        state = _state(row)
+        if state:
+            yield self._by_state, state
+        if row.get("credential"):
+            yield self._by_credential, str(row["credential"])
+
+    def _clear(self):
+        self._entries = []
+        self._rows = {}
+        self._entry_of = {}
+        self._by_taxonomy = {}
+        self._by_state = {}
+        self._by_credential = {}
+        self._specialties = {}
+
+    def _filter_keys(self, taxonomy: Optional[str], state: Optional[str], credential: Optional[str]) -> List[Tuple[Dict[str, List[Entry]], List[str]]]:
+        """The secondary index and matching keys for each filter given."""
+        filters = []
+        if taxonomy:
+            wanted = taxonomy.strip().lower()
+            keys = [
+                code for code in self._by_taxonomy
+                if code.lower() == wanted or matches_specialty({"primary_taxonomy": code, "primary_specialty": self._specialties.get(code)}, taxonomy)
+            ]
+            filters.append((self._by_taxonomy, keys))
+        if state:
+            filters.append((self._by_state, [state.strip().upper()]))
+        if credential:
+            wanted = credential.strip().lower()
+            filters.append((self._by_credential, [name for name in self._by_credential if wanted in name.lower()]))
+        return filters
+
+    async def query(
+        self,
+        window_days: int = 90,
+        taxonomy: Optional[str] = None,
+        state: Optional[str] = None,
+        credential: Optional[str] = None,
+        limit: Optional[int] = None,
+        fresh: bool = False,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Credentials expiring within window_days, soonest first, optionally filtered by
+        taxonomy code or specialty, 2-letter state and credential type (any part of its
+        name). Returns a list_expiring_credentials-shaped result, or None if the index
+        cannot answer. Rows are shared with the index and must not be modified.
+        fresh=True re-fetches the window from the server first, for callers (sweeps) that
+        act on the answer and cannot use a copy up to max_age old.
+        """
+        if not self.enabled or window_days < 0 or window_days > max(self.horizon_days, self._horizon):
+            self.fallbacks += 1
+            return None
+        if time.monotonic() - self._failed_at < self.max_age:
+            # A refresh failed recently; don't make every caller wait for the next one to fail.
+            self.fallbacks += 1
+            return None
+        try:
+            await self.refresh(window_days, fresh=fresh)
+        except Exception as e:
+            logger.warning(f"Expiry index refresh failed ({type(e).__name__}: {e}); asking cred_db instead.")
+            self.refresh_errors += 1
+            self._failed_at = time.monotonic()
+            self.fallbacks += 1
+            return None
+        if (taxonomy and not self._by_taxonomy) or (state and not self._by_state):
+            # The server does not return this field; an empty answer would be wrong.
+            self.fallbacks += 1
+            return None
+
+        started = time.perf_counter()
+        lo = (self._day, -1)
+        hi = (self._day + window_days, self._next_id)
+        filters = self._filter_keys(taxonomy, state, credential)
+        if filters:
+            # Walk the window of the most selective filter's lists (one per matching key,
+            # merged back into expiry order) and check the other filters on each row.
+            spans = [
+                [(index[key], bisect_left(index[key], lo), bisect_right(index[key], hi)) for key in keys if key in index]
+                for index, keys in filters
+            ]
+            narrowest = min(spans, key=lambda lists: sum(end - start for _, start, end in lists))
+            rows = (self._rows[entry[1]] for entry in heapq.merge(*(entries[start:end] for entries, start, end in narrowest)))
+            matched = [row for row in rows if self._matches(row, filters)] if len(filters) > 1 else list(rows)
+        else:
+            matched = [self._rows[entry[1]] for entry in self._entries[bisect_left(self._entries, lo):bisect_right(self._entries, hi)]]
+
+        total = len(matched)
+        if limit is not None:
+            matched = matched[:max(0, limit)]
+        elapsed = time.perf_counter() - started
+        self.queries += 1
+        self.query_seconds += elapsed
+        return {"expiring": matched, "total": total, "offset": 0, "has_more": total > len(matched), "next_cursor": None}
+
+    def recognizes(self, taxonomy: Optional[str] = None, credential: Optional[str] = None) -> Optional[bool]:
+        """
+        Whether the loaded credentials include a taxonomy (code or specialty) and credential
+        type matching the filters given; None if the index holds no data to tell.
+        """
+        if not self._entries:
+            return None
+        for index, keys in self._filter_keys(taxonomy, None, credential):
+            if not index:
+                return None
+            if not keys:
+                return False
+        return True
+
+    def _matches(self, row: Dict[str, Any], filters: List[Tuple[Dict[str, List[Entry]], List[str]]]) -> bool:
+        for index, keys in filters:
+            if index is self._by_taxonomy:
+                value = _taxonomy(row)
+            elif index is self._by_state:
+                value = _state(row)
+            else:
+                value = row.get("credential")
+            if value not in keys:
+                return False
+        return True
+
+    def warm(self):
+        """Hydrates the index in the background, so the first question does not wait for it."""
+        if not self.enabled or (self._refresh_task is not None and not self._refresh_task.done()):
+            return
+
+        async def hydrate():
+            try:
+                await self.refresh(self.horizon_days)
+            except Exception as e:
+                self.refresh_errors += 1
+                self._failed_at = time.monotonic()
+                logger.warning(f"Expiry index warm-up failed ({type(e).__name__}: {e}).")
+
+        asyncio.ensure_future(hydrate())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "credentials": len(self._entries),
+            "horizon_days": self._horizon,
+            "incremental": self._sync_cursor is not None,
+            "age_seconds": round(time.monotonic() - self._refreshed_at, 1) if self._refreshed_at else None,
+            "hydrations": self.hydrations,
+            "refreshes": self.refreshes,
+            "updates_applied": self.updates_applied,
+            "resyncs": self.resyncs,
+            "evicted": self.evicted,
+            "refresh_errors": self.refresh_errors,
+            "queries": self.queries,
+            "fallbacks": self.fallbacks,
+            "avg_query_ms": round(self.query_seconds / self.queries * 1000, 3) if self.queries else 0.0,
+            "last_hydrate_ms": round(self.last_hydrate_ms, 1),
+            "last_refresh_ms": round(self.last_refresh_ms, 1),
+        }
+
+def _count_by(rows: List[Dict[str, Any]], field: str) -> Dict[str, int]:
+    counts: Dict[str, int] = {}
+    for row in rows:
+        value = str(row.get(field))
+        counts[value] = counts.get(value, 0) + 1
+    return counts
+
+def expiry_index_tool(index: "ExpiryIndex") -> StructuredTool:
+    """The index as a local tool for the chat agent, answered without a cred_db round trip."""
+
+    async def query_expiring_credentials(
+        window_days: int = 90,
+        taxonomy: Optional[str] = None,
+        state: Optional[str] = None,
+        credential: Optional[str] = None,
+        limit: int = 25,
+    ) -> Dict[str, Any]:
+        result = await index.query(window_days, taxonomy=taxonomy, state=state, credential=credential)
+        if result is None:
+            if taxonomy or state or credential:
+                return {"error": "The local expiry index cannot answer this filter right now; use list_expiring_credentials and get_provider_snapshot instead."}
+            result = parse_tool_result(await mcp_client.call_tool("cred_db", "list_expiring_credentials", {"window_days": window_days}))
+            if not isinstance(result, dict) or "error" in result:
+                return result
+        rows = result.get("expiring", [])
+        return {
+            "total": len(rows),
+            "by_credential_type": _count_by(rows, "credential"),
+            "expiring": rows[:max(0, limit)],
+        }
+
+    return StructuredTool.from_function(
+        coroutine=query_expiring_credentials,
+        name="query_expiring_credentials",
+        description=(
+            "Credentials expiring within window_days (soonest first) from a local index, answered instantly. "
+            "Optional filters: taxonomy (code or specialty, e.g. 'cardiology'), state (2-letter code) and "
+            "credential (type, e.g. 'DEA' or 'license'). Returns the total, counts by credential type and up to "
+            "`limit` rows. Prefer it over list_expiring_credentials for counts and filtered lists."
+        ),
+    )
+
+# Global instance, shared by sweeps and conversations
+expiry_index = ExpiryIndex()
+mcp_client.add_call_listener(expiry_index.on_tool_call)
+
+metrics.registry.add_collector(lambda: metrics.stats_gauges("credentialwatch_expiry_index", "Local credential expiry index", expiry_index.stats()))
@@ -0,0 +1,226 @@
+import os
+import time
+import bisect
+import asyncio
+import logging
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterator, List, Optional, Tuple, TypeVar
+from credentialwatch_agent.result_cache import INVALIDATES
+from credentialwatch_agent import metrics
+
+logger = logging.getLogger("hedging")
+
+T = TypeVar("T")
+
+# Idempotent read tools, for which a duplicate request is harmless. Anything else, and
+# in particular every write tool (log_alert, add_or_update_credential, ...), is never hedged.
+HEDGEABLE_TOOLS = frozenset({
+    "search_providers",
+    "get_provider_by_npi",
+    "get_provider_snapshot",
+    "list_expiring_credentials",
+    "get_open_alerts",
+    "summarize_alerts",
+}) - frozenset(INVALIDATES)
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("mcp_call_deadline", default=None)
+
+@contextmanager
+def call_deadline(seconds: Optional[float]) -> Iterator[None]:
+    """
+    MCP calls made in this block, including tasks it starts, must finish within `seconds`.
+    Nested deadlines keep the earlier one. None leaves the current deadline unchanged.
+    """
+    if seconds is None:
+        yield
+        return
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+def remaining_time() -> Optional[float]:
+    """Seconds left before the current call deadline, or None without one."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+class LatencyWindow:
+    """The latest latencies of one tool, kept sorted for percentiles."""
+
+    __slots__ = ("_recent", "_sorted")
+
+    def __init__(self, size: int):
+        self._recent: Deque[float] = deque(maxlen=max(1, size))
+        self._sorted: List[float] = []
+
+    def add(self, seconds: float):
+        if len(self._recent) == self._recent.maxlen:
+            del self._sorted[bisect.bisect_left(self._sorted, self._recent[0])]
+        self._recent.append(seconds)
+        bisect.insort(self._sorted, seconds)
+
+    def __len__(self) -> int:
+        return len(self._recent)
+
+    def percentile(self, q: float) -> float:
+        """Nearest-rank percentile (q in 0-100), 0.0 if empty."""
+        if not self._sorted:
+            return 0.0
+        rank = max(1, min(len(self._sorted), round(q / 100 * len(self._sorted) + 0.5)))
+        return self._sorted[rank - 1]
+
+class Hedger:
+    """
+    Hedged requests for idempotent read tools: if a call has not answered by the tool's
+    observed p95 latency, a second identical request is sent and whichever answers first
+    is used; the other is cancelled.
+
+    Hedges are paid from a per-server budget that earns MCP_HEDGE_BUDGET of a hedge per
+    call (up to MCP_HEDGE_BURST saved), so hedging adds at most that fraction of extra
+    load, even when a server is slow for everyone. No hedge is sent without at least
+    MCP_HEDGE_MIN_SAMPLES latencies for the tool, or when the call deadline would pass
+    before a typical (p50) response could arrive.
+    """
+
+    def __init__(
+        self,
+        enabled: Optional[bool] = None,
+        budget: Optional[float] = None,
+        burst: Optional[float] = None,
+        percentile: Optional[float] = None,
+        min_samples: Optional[int] = None,
+        min_delay: Optional[float] = None,
+        window: Optional[int] = None,
+    ):
+        if enabled is None:
+            enabled = os.getenv("MCP_HEDGE_ENABLED", "true").lower() in ("1", "true", "yes")
+        if budget is None:
+            budget = float(os.getenv("MCP_HEDGE_BUDGET", "0.05"))
+        if burst is None:
+            burst = float(os.getenv("MCP_HEDGE_BURST", "5"))
+        if percentile is None:
+            percentile = float(os.getenv("MCP_HEDGE_PERCENTILE", "95"))
+        if min_samples is None:
+            min_samples = int(os.getenv("MCP_HEDGE_MIN_SAMPLES", "20"))
+        if min_delay is None:
+            min_delay = float(os.getenv("MCP_HEDGE_MIN_DELAY_MS", "50")) / 1000
+        if window is None:
+            window = int(os.getenv("MCP_HEDGE_WINDOW", "200"))
+        self.enabled = enabled
+        self.budget = budget
+        self.burst = burst
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.window = window
+
+        self._latencies: Dict[Tuple[str, str], LatencyWindow] = {}
+        self._tokens: Dict[str, float] = {}
+
+        self.calls = 0
+        self.hedges = 0
+        self.wins = 0
+        self.losses = 0
+        self.skipped_budget = 0
+        self.skipped_deadline = 0
+
+    def can_hedge(self, tool_name: str) -> bool:
+        return self.enabled and tool_name in HEDGEABLE_TOOLS
+
+    def record(self, server_name: str, tool_name: str, seconds: float):
+        """Adds the latency of one request (from when it was sent) to the tool's window."""
+        if tool_name not in HEDGEABLE_TOOLS:
+            return
+        key = (server_name, tool_name)
+        latencies = self._latencies.get(key)
+        if latencies is None:
+            latencies = self._latencies[key] = LatencyWindow(self.window)
+        latencies.add(seconds)
+
+    def hedge_delay(self, server_name: str, tool_name: str) -> Optional[float]:
+        """How long to wait for a call before hedging it, or None if there are too few samples."""
+        latencies = self._latencies.get((server_name, tool_name))
+        if latencies is None or len(latencies) < self.min_samples:
+            return None
+        return max(self.min_delay, latencies.percentile(self.percentile))
+
+    def _spend(self, server_name: str) -> bool:
+        if self._tokens.get(server_name, 0.0) < 1:
+            return False
+        self._tokens[server_name] -= 1
+        return True
+
+    async def run(self, server_name: str, tool_name: str, attempt: Callable[[], Awaitable[T]]) -> T:
+        """Runs attempt(), hedging it with a second attempt() if it is slow and the budget allows."""
+        self.calls += 1
+        self._tokens[server_name] = min(self.burst, self._tokens.get(server_name, 0.0) + self.budget)
+        delay = self.hedge_delay(server_name, tool_name)
+        if delay is None:
+            return await attempt()
+
+        started = time.perf_counter()
+        primary = asyncio.ensure_future(attempt())
+        hedge: Optional[asyncio.Future] = None
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done:
+                return primary.result()
+
+            remaining = remaining_time()
+            if remaining is not None and remaining < self._latencies[(server_name, tool_name)].percentile(50):
+                self.skipped_deadline += 1
+                metrics.mcp_hedges.inc(server=server_name, tool=tool_name, outcome="skipped_deadline")
+                return await primary
+            if not self._spend(server_name):
+                self.skipped_budget += 1
+                metrics.mcp_hedges.inc(server=server_name, tool=tool_name, outcome="skipped_budget")
+                return await primary
+
+            self.hedges += 1
+            logger.info(f"Hedging '{tool_name}' on '{server_name}' after {delay * 1000:.0f} ms.")
+            hedge = asyncio.ensure_future(attempt())
+            pending = {primary, hedge}
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                # A failed (or cancelled) attempt only decides the call if the other one failed too.
+                winner = next((f for f in done if not f.cancelled() and f.exception() is None), None)
+                if winner is not None or not pending:
+                    break
+            if winner is hedge:
+                self.wins += 1
+                metrics.mcp_hedges.inc(server=server_name, tool=tool_name, outcome="won")
+                # The primary's latency is at least this long; without it the window only sees fast answers.
+                self.record(server_name, tool_name, time.perf_counter() - started)
+            else:
+                self.losses += 1
+                metrics.mcp_hedges.inc(server=server_name, tool=tool_name, outcome="lost")
+            return (winner or primary).result()
+        finally:
+            for future in (primary, hedge):
+                if future is not None and not future.done():
+                    future.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        decided = self.wins + self.losses
+        return {
+            "enabled": self.enabled,
+            "budget": self.budget,
+            "calls": self.calls,
+            "hedges": self.hedges,
+            "hedge_rate": round(self.hedges / self.calls, 4) if self.calls else 0.0,
+            "wins": self.wins,
+            "losses": self.losses,
+            "win_rate": round(self.wins / decided, 3) if decided else 0.0,
+            "skipped_budget": self.skipped_budget,
+            "skipped_deadline": self.skipped_deadline,
+            "delays_ms": {
+                f"{server}/{tool}": round(delay * 1000, 1)
+                for (server, tool) in sorted(self._latencies)
+                if (delay := self.hedge_delay(server, tool)) is not None
+            },
+        }
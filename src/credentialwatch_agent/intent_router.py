@@ -0,0 +1,289 @@
+import os
+import re
+import time
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+from credentialwatch_agent.mcp_client import mcp_client, parse_tool_result
+from credentialwatch_agent.expiry_index import expiry_index, matches_specialty
+from credentialwatch_agent import metrics
+
+logger = logging.getLogger("intent_router")
+
+# Rows shown in a routed table; the agent is not involved, so this only bounds the UI.
+INTENT_ROUTER_MAX_ROWS = int(os.getenv("INTENT_ROUTER_MAX_ROWS", "25"))
+# A specialty filter looks up each provider's snapshot; above this many providers in the
+# window the router is not confident it can answer cheaply and hands over to the agent.
+INTENT_ROUTER_MAX_LOOKUPS = int(os.getenv("INTENT_ROUTER_MAX_LOOKUPS", "40"))
+
+def router_enabled() -> bool:
+    return os.getenv("INTENT_ROUTER_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Credential types a question may name; the match is passed on as a credential filter.
+_CREDENTIAL_TYPES = r"""
+    credentials?|licen[cs]es?|dea(?:\s+registrations?)?|(?:board\s+|bls\s+)?certifications?
+    |malpractice(?:\s+insurance)?|(?:hospital\s+)?privileges
+"""
+
+# Templates are anchored on the whole (normalized) question: anything beyond the template,
+# e.g. "... and create an alert", falls through to the agent.
+_EXPIRING = re.compile(
+    r"""
+    ^(?:(?:can|could)\s+you\s+)?(?:please\s+)?
+    (?:who|which(?:\s+(?:providers|clinicians|doctors|(?P<credential_lead>""" + _CREDENTIAL_TYPES + r""")))?|list|show(?:\s+me)?|find|get)\s+
+    (?:all\s+)?(?:the\s+)?(?:providers\s+|clinicians\s+|doctors\s+)?
+    (?:(?:in|from)\s+(?P<specialty>[a-z][a-z &-]*?)\s+)?
+    (?:(?:has|have|with|whose)\s+)?(?:any\s+)?(?:(?P<credential>""" + _CREDENTIAL_TYPES + r""")\s+)?
+    (?:that\s+)?(?:are\s+|is\s+|will\s+)?
+    (?:expiring|expire|expires|lapsing|due\s+to\s+expire)\s+
+    (?:in\s+the\s+|within\s+the\s+|over\s+the\s+|within\s+|in\s+)?(?:next\s+|coming\s+)?
+    (?P<count>\d{1,4})\s+(?P<unit>days?|weeks?|months?)
+    (?:\s+(?:in|for|among)\s+(?P<specialty_after>[a-z][a-z &-]*?))?$
+    """,
+    re.VERBOSE,
+)
+_SNAPSHOT = re.compile(
+    r"""
+    ^(?:(?:can|could)\s+you\s+)?(?:please\s+)?
+    (?:(?:show|get|give|display|pull\s+up|fetch|look\s+up|what\s+is|what's)\s+)?(?:me\s+)?(?:the\s+)?
+    (?:provider\s+|credential\s+|credentialing\s+)?
+    (?:snapshot|details|profile|credentials|status|summary)\s+(?:for|of)\s+
+    (?:provider\s+|the\s+provider\s+(?:with\s+)?)?(?:npi\s*(?:\#|number|no)?\s*)?(?P<npi>\d{10})$
+    """,
+    re.VERBOSE,
+)
+_UNIT_DAYS = {"day": 1, "week": 7, "month": 30}
+# Words that make a captured "specialty" a qualifier the template cannot apply ("in the last year").
+_QUALIFIERS = re.compile(r"\b(?:last|past|next|this|year|years|month|months|week|weeks|days?|ago|since|before|after|not|without|except|expired)\b")
+
+def credential_filter(term: Optional[str]) -> Optional[str]:
+    """The credential type filter for a term matched by _CREDENTIAL_TYPES; None for credentials in general."""
+    if not term or term.startswith("credential"):
+        return None
+    term = re.sub(r"\s+", " ", term)
+    if term.startswith("licen"):
+        return "license"
+    if term.startswith("dea"):
+        return "dea"
+    if term.startswith("malpractice"):
+        return "malpractice"
+    if term.endswith("privileges"):
+        return "privileges"
+    return term.rstrip("s")
+
+def normalize(message: str) -> str:
+    text = message.strip().lower()
+    text = re.sub(r"[?.!]+$", "", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+def match_intent(message: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """Returns (intent, tool arguments) for a templated question, or None if it does not match one exactly."""
+    text = normalize(message)
+    match = _SNAPSHOT.match(text)
+    if match:
+        return "provider_snapshot", {"npi": match.group("npi")}
+    match = _EXPIRING.match(text)
+    if match:
+        window_days = int(match.group("count")) * _UNIT_DAYS[match.group("unit").rstrip("s")]
+        if not 0 < window_days <= 3650:
+            return None
+        specialty = (match.group("specialty") or match.group("specialty_after") or "").strip() or None
+        if specialty in ("the system", "our network", "the database"):
+            specialty = None
+        if specialty and _QUALIFIERS.search(specialty):
+            return None
+        credential = credential_filter(match.group("credential") or match.group("credential_lead"))
+        return "expiring_credentials", {"window_days": window_days, "specialty": specialty, "credential": credential}
+    return None
+
+class RouterStats:
+    """Routed vs. agent turns, and the agent latency the routed turns did not spend."""
+
+    def __init__(self):
+        self.routed = 0
+        self.fallbacks = 0
+        self.routed_seconds = 0.0
+        self.saved_seconds = 0.0
+        # Moving average of agent turn latency, the baseline a routed turn is compared with.
+        self.agent_turn_seconds: Optional[float] = None
+
+    def record_agent_turn(self, seconds: float):
+        if self.agent_turn_seconds is None:
+            self.agent_turn_seconds = seconds
+        else:
+            self.agent_turn_seconds += 0.2 * (seconds - self.agent_turn_seconds)
+
+    def as_dict(self) -> Dict[str, Any]:
+        total = self.routed + self.fallbacks
+        return {
+            "routed": self.routed,
+            "fallbacks": self.fallbacks,
+            "hit_rate": round(self.routed / total, 3) if total else 0.0,
+            "avg_routed_ms": round(self.routed_seconds / self.routed * 1000, 1) if self.routed else 0.0,
+            "avg_agent_turn_ms": round(self.agent_turn_seconds * 1000, 1) if self.agent_turn_seconds is not None else None,
+            "saved_seconds": round(self.saved_seconds, 3),
+        }
+
+router_stats = RouterStats()
+
+class NotConfident(Exception):
+    """The question matched a template but cannot be answered reliably without the agent."""
+
+def _rows(result: Any, key: str) -> List[Dict[str, Any]]:
+    if isinstance(result, dict):
+        if "error" in result:
+            raise NotConfident(str(result["error"]))
+        result = result.get(key, [])
+    if not isinstance(result, list):
+        raise NotConfident(f"Unexpected {key} result shape: {type(result).__name__}")
+    return [row for row in result if isinstance(row, dict)]
+
+def _cell(value: Any) -> str:
+    if value is None or value == "":
+        return "—"
+    return str(value).replace("|", "\\|")
+
+def _table(headers: List[str], rows: List[List[Any]]) -> str:
+    lines = ["| " + " | ".join(headers) + " |", "|" + "---|" * len(headers)]
+    lines.extend("| " + " | ".join(_cell(v) for v in row) + " |" for row in rows)
+    return "\n".join(lines)
+
+def _credential_matches(row: Dict[str, Any], credential: Optional[str]) -> bool:
+    return not credential or credential in str(row.get("credential") or "").lower()
+
+async def _expiring_credentials(window_days: int, specialty: Optional[str], credential: Optional[str] = None) -> str:
+    # The expiry index filters by specialty and credential type itself, so it needs no snapshot lookups.
+    indexed = await expiry_index.query(window_days, taxonomy=specialty, credential=credential, limit=INTENT_ROUTER_MAX_ROWS)
+    if indexed is not None:
+        if (specialty or credential) and not expiry_index.recognizes(specialty, credential):
+            # "the last year" is not a specialty: an empty answer for it would be wrong.
+            raise NotConfident(f"Specialty '{specialty}' or credential type '{credential}' is not in the index")
+        rows, total = indexed["expiring"], indexed["total"]
+    else:
+        rows, total = await _list_expiring(window_days, filtered=bool(specialty or credential))
+        if credential:
+            matched = [row for row in rows if _credential_matches(row, credential)]
+            if rows and not matched:
+                raise NotConfident(f"No credential type in the window matches '{credential}'")
+            rows = matched
+            total = len(rows)
+
+    if specialty and indexed is None:
+        provider_ids = list(dict.fromkeys(row.get("provider_id") for row in rows if row.get("provider_id") is not None))
+        if len(provider_ids) > INTENT_ROUTER_MAX_LOOKUPS:
+            raise NotConfident(f"{len(provider_ids)} providers are too many to filter by specialty")
+        snapshots = await asyncio.gather(*(
+            mcp_client.call_tool("cred_db", "get_provider_snapshot", {"provider_id": provider_id}) for provider_id in provider_ids
+        ))
+        snapshots = [parse_tool_result(snapshot) for snapshot in snapshots]
+        keep = {pid for pid, snapshot in zip(provider_ids, snapshots) if isinstance(snapshot, dict) and matches_specialty(snapshot, specialty)}
+        if provider_ids and not keep:
+            # Either nobody in the specialty is expiring or it is not a specialty at all; the agent can tell.
+            raise NotConfident(f"No provider in the window matches specialty '{specialty}'")
+        rows = [row for row in rows if row.get("provider_id") in keep]
+        total = len(rows)
+
+    kind = "credential" if not credential else f"{credential.upper() if len(credential) <= 3 else credential} credential"
+    scope = f" in {specialty.title()}" if specialty else ""
+    if not rows:
+        return f"No {kind}s{scope} expire in the next {window_days} days."
+    shown = rows[:INTENT_ROUTER_MAX_ROWS]
+    if total is None:
+        count = f"At least {len(rows)} {kind}s"
+    else:
+        count = f"{total} {kind}{'s' if total != 1 else ''}"
+    heading = f"**{count}{scope} expire{'s' if total == 1 else ''} in the next {window_days} days**"
+    if total is None or total > len(shown):
+        heading += f" (soonest {len(shown)} shown)"
+    table = _table(
+        ["Provider", "NPI", "Credential", "Expires", "Days left"],
+        [[r.get("name"), r.get("npi"), r.get("credential"), r.get("expiry_date"), r.get("days_remaining")] for r in shown],
+    )
+    return f"{heading}\n\n{table}"
+
+async def _list_expiring(window_days: int, filtered: bool) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    """
+    Rows from list_expiring_credentials and the total in the window, or None if the server
+    did not say and the rows may be cut off. A filtered question needs every row in the window.
+    """
+    schema = (mcp_client.get_tool_schema("cred_db", "list_expiring_credentials") or {}).get("properties", {})
+    arguments: Dict[str, Any] = {"window_days": window_days}
+    limit = INTENT_ROUTER_MAX_LOOKUPS * 4 if filtered else INTENT_ROUTER_MAX_ROWS
+    if "limit" in schema:
+        arguments["limit"] = limit
+    parsed = parse_tool_result(await mcp_client.call_tool("cred_db", "list_expiring_credentials", arguments))
+    rows = _rows(parsed, "expiring")
+    total = parsed.get("total") if isinstance(parsed, dict) else None
+    if total is None and ("limit" not in arguments or len(rows) < limit):
+        # Nothing was cut off, so the rows are the whole window.
+        total = len(rows)
+    has_more = isinstance(parsed, dict) and parsed.get("has_more")
+    if filtered and (has_more or total is None or total > len(rows)):
+        raise NotConfident(f"{total if total is not None else f'at least {len(rows)}'} credentials in the window are too many to filter")
+    return rows, total
+
+async def _provider_snapshot(npi: str) -> str:
+    snapshot = parse_tool_result(await mcp_client.call_tool("cred_db", "get_provider_snapshot", {"npi": npi}))
+    if not isinstance(snapshot, dict) or "error" in snapshot:
+        raise NotConfident(f"No usable snapshot for NPI {npi}")
+    name = snapshot.get("name") or snapshot.get("full_name") or f"NPI {npi}"
+    address = snapshot.get("primary_address") or {}
+    details = [f"NPI {snapshot.get('npi') or npi}"]
+    if snapshot.get("primary_specialty"):
+        details.append(snapshot["primary_specialty"])
+    if address.get("city"):
+        details.append(f"{address['city'].title()}, {address.get('state', '')}".strip(", "))
+    heading = f"**{name}** ({', '.join(details)}). Status: {snapshot.get('status', 'unknown')}."
+    credentials = sorted(
+        (c for c in snapshot.get("credentials") or [] if isinstance(c, dict)),
+        key=lambda c: c.get("days_remaining", 0),
+    )
+    if not credentials:
+        return f"{heading}\n\nNo credentials on file."
+    table = _table(
+        ["Credential", "Number", "Issuing authority", "Expires", "Days left"],
+        [[c.get("credential"), c.get("number"), c.get("issuing_authority"), c.get("expiry_date"), c.get("days_remaining")] for c in credentials],
+    )
+    return f"{heading}\n\n{table}"
+
+async def route(message: str) -> Optional[str]:
+    """
+    Answers a templated credential question directly with cred_db tools, without the LLM.
+    Returns the answer, or None to hand the question to the agent.
+    """
+    if not router_enabled():
+        return None
+    matched = match_intent(message)
+    if matched is None:
+        router_stats.fallbacks += 1
+        metrics.intent_router_turns.inc(intent="none", outcome="fallback")
+        return None
+
+    intent, args = matched
+    started = time.perf_counter()
+    try:
+        if intent == "provider_snapshot":
+            answer = await _provider_snapshot(**args)
+        else:
+            answer = await _expiring_credentials(**args)
+    except NotConfident as e:
+        logger.info(f"Intent {intent} not answered directly ({e}); using the agent.")
+        router_stats.fallbacks += 1
+        metrics.intent_router_turns.inc(intent=intent, outcome="not_confident")
+        return None
+    except Exception as e:
+        logger.warning(f"Intent {intent} failed ({type(e).__name__}: {e}); using the agent.")
+        router_stats.fallbacks += 1
+        metrics.intent_router_turns.inc(intent=intent, outcome="error")
+        return None
+
+    elapsed = time.perf_counter() - started
+    router_stats.routed += 1
+    router_stats.routed_seconds += elapsed
+    if router_stats.agent_turn_seconds is not None:
+        saved = max(0.0, router_stats.agent_turn_seconds - elapsed)
+        router_stats.saved_seconds += saved
+        metrics.intent_router_saved_seconds.inc(saved)
+    metrics.intent_router_turns.inc(intent=intent, outcome="routed")
+    logger.info(f"Answered {intent} {args} directly in {elapsed * 1000:.0f} ms.")
+    return answer
@@ -0,0 +1,216 @@
+import os
+import json
+import random
+import asyncio
+import logging
+import functools
+from typing import Any, Callable, Dict, List, Optional
+from mcp.server.fastmcp import FastMCP
+from credentialwatch_agent.local_servers.synthetic import AlertStore, SyntheticDataset, parse_date
+
+logger = logging.getLogger("local_servers")
+
+DEFAULT_PORTS = {"npi": 8001, "cred_db": 8002, "alert": 8003}
+
+class FaultProfile:
+    """
+    Latency and failures injected into every tool call of one server.
+    Each call waits latency_ms plus an exponentially distributed extra with mean
+    jitter_ms (a long-tailed delay like a real network hop), then fails with
+    probability error_rate.
+    """
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0, seed: Optional[int] = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self.calls = 0
+        self.injected_errors = 0
+
+    @classmethod
+    def from_env(cls, server_name: str, latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0, seed: Optional[int] = None) -> "FaultProfile":
+        """Per-server overrides: LOCAL_MCP_<SERVER>_LATENCY_MS, _JITTER_MS and _ERROR_RATE."""
+        prefix = f"LOCAL_MCP_{server_name.upper()}_"
+        return cls(
+            latency_ms=float(os.getenv(prefix + "LATENCY_MS", latency_ms)),
+            jitter_ms=float(os.getenv(prefix + "JITTER_MS", jitter_ms)),
+            error_rate=float(os.getenv(prefix + "ERROR_RATE", error_rate)),
+            seed=seed,
+        )
+
+    async def apply(self, tool_name: str):
+        self.calls += 1
+        delay_ms = self.latency_ms
+        if self.jitter_ms > 0:
+            delay_ms += self._rng.expovariate(1.0 / self.jitter_ms)
+        if delay_ms > 0:
+            await asyncio.sleep(delay_ms / 1000)
+        if self.error_rate > 0 and self._rng.random() < self.error_rate:
+            self.injected_errors += 1
+            raise RuntimeError(f"Injected failure in '{tool_name}'.")
+
+def _add_tool(server: FastMCP, faults: FaultProfile, name: str, fn: Callable[..., Any]):
+    """Registers fn as a tool returning one JSON text block, behind the server's fault profile."""
+
+    @functools.wraps(fn)
+    async def tool(*args, **kwargs) -> str:
+        await faults.apply(name)
+        return json.dumps(fn(*args, **kwargs), default=str)
+
+    server.tool(name=name, structured_output=False)(tool)
+
+def _provider_or_error(dataset: SyntheticDataset, provider_id: Optional[int], npi: Optional[str]) -> int:
+    if npi:
+        provider = dataset.provider_index(npi)
+    elif provider_id is not None:
+        provider = int(provider_id) - 1
+        provider = provider if 0 <= provider < dataset.num_providers else None
+    else:
+        raise ValueError("Pass provider_id or npi.")
+    if provider is None:
+        raise ValueError(f"Provider not found (provider_id={provider_id}, npi={npi}).")
+    return provider
+
+def build_npi_server(dataset: SyntheticDataset, faults: FaultProfile) -> FastMCP:
+    server = FastMCP("npi_mcp", streamable_http_path="/")
+
+    def search_providers_tool(query: str, state: Optional[str] = None, taxonomy: Optional[str] = None, limit: int = 10) -> List[Dict[str, Any]]:
+        """Search providers by name, optionally filtered by 2-letter state code and taxonomy code or specialty."""
+        return dataset.search_providers(query, state=state, taxonomy=taxonomy, limit=limit)
+
+    def get_provider_by_npi_tool(npi: str) -> Dict[str, Any]:
+        """Look up a single provider by 10-digit NPI."""
+        provider = dataset.provider_index(npi)
+        if provider is None:
+            return {"error": f"No provider found for NPI {npi}."}
+        return dataset.provider_record(provider)
+
+    def run_diagnostics() -> Dict[str, Any]:
+        """Report dataset size and injected fault settings."""
+        return {"status": "ok", "dataset": dataset.stats(), "calls": faults.calls, "injected_errors": faults.injected_errors}
+
+    for fn in (search_providers_tool, get_provider_by_npi_tool, run_diagnostics):
+        _add_tool(server, faults, f"npi_mcp_{fn.__name__}", fn)
+    return server
+
+def build_cred_db_server(dataset: SyntheticDataset, faults: FaultProfile) -> FastMCP:
+    server = FastMCP("cred_db_mcp", streamable_http_path="/")
+
+    def sync_provider_from_npi(npi: str) -> Dict[str, Any]:
+        """Sync a provider's public NPI data into the credential database."""
+        return {"synced": True, **dataset.provider_record(_provider_or_error(dataset, None, npi))}
+
+    def add_or_update_credential(credential: str, expiry_date: str, provider_id: Optional[int] = None, npi: Optional[str] = None) -> Dict[str, Any]:
+        """Add a credential to a provider, or update its expiry date (YYYY-MM-DD) if the provider already holds it."""
+        provider = _provider_or_error(dataset, provider_id, npi)
+        return dataset.upsert_credential(provider, credential, parse_date(expiry_date))
+
+    def list_expiring_credentials(
+        window_days: int = 90,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        cursor: Optional[str] = None,
+        include_expired: bool = False,
+        updated_since: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        List credentials expiring within window_days, soonest first.
+        Page with limit plus offset, or pass the next_cursor of the previous page as cursor.
+        Pass the sync_cursor of an earlier result as updated_since to get only the credentials
+        updated since then (any expiry date).
+        """
+        return dataset.list_expiring(
+            window_days, limit=limit, offset=offset, cursor=cursor, include_expired=include_expired, updated_since=updated_since,
+        )
+
+    def get_provider_snapshot(provider_id: Optional[int] = None, npi: Optional[str] = None) -> Dict[str, Any]:
+        """Provider details with all credentials and their expiry dates."""
+        return dataset.provider_snapshot(_provider_or_error(dataset, provider_id, npi))
+
+    for fn in (sync_provider_from_npi, add_or_update_credential, list_expiring_credentials, get_provider_snapshot):
+        _add_tool(server, faults, f"cred_db_mcp_{fn.__name__}", fn)
+    return server
+
+def build_alert_server(store: AlertStore, faults: FaultProfile) -> FastMCP:
+    server = FastMCP("alert_mcp", streamable_http_path="/")
+
+    def log_alert(provider_id: int, severity: str, message: str, credential_id: Optional[int] = None) -> Dict[str, Any]:
+        """Log an alert for a provider's credential."""
+        alert = store.log({"provider_id": provider_id, "credential_id": credential_id, "severity": severity, "message": message})
+        return {"success": True, "alert_id": alert["alert_id"]}
+
+    def log_alerts(alerts: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Log many alerts in one call. Each alert has provider_id, credential_id, severity and message."""
+        ids = [store.log(alert)["alert_id"] for alert in alerts]
+        return {"success": True, "count": len(ids), "alert_ids": ids}
+
+    def get_open_alerts(provider_id: Optional[int] = None, severity: Optional[str] = None, limit: int = 100) -> Dict[str, Any]:
+        """List unresolved alerts, newest first, optionally for one provider or severity."""
+        return {"alerts": store.open_alerts(provider_id=provider_id, severity=severity, limit=limit)}
+
+    def mark_alert_resolved(alert_id: int, resolution_note: Optional[str] = None) -> Dict[str, Any]:
+        """Mark an alert as resolved."""
+        alert = store.resolve(alert_id, resolution_note)
+        if alert is None:
+            return {"success": False, "error": f"Alert {alert_id} not found."}
+        return {"success": True, "alert": alert}
+
+    def summarize_alerts() -> Dict[str, Any]:
+        """Counts of all and open alerts, with open alerts by severity."""
+        return store.summary()
+
+    for fn in (log_alert, log_alerts, get_open_alerts, mark_alert_resolved, summarize_alerts):
+        _add_tool(server, faults, f"alert_mcp_{fn.__name__}", fn)
+    return server
+
+def http_app(server: FastMCP):
+    """
+    Both HTTP transports, laid out like a Gradio MCP endpoint: streamable HTTP at /,
+    SSE at /sse (with its messages under /messages/).
+    """
+    from starlette.applications import Starlette
+
+    streamable = server.streamable_http_app()
+    sse = server.sse_app()
+    return Starlette(routes=[*sse.routes, *streamable.routes], lifespan=streamable.router.lifespan_context)
+
+def _builders(dataset: SyntheticDataset) -> Dict[str, Callable[[FaultProfile], FastMCP]]:
+    return {
+        "npi": lambda faults: build_npi_server(dataset, faults),
+        "cred_db": lambda faults: build_cred_db_server(dataset, faults),
+        "alert": lambda faults: build_alert_server(AlertStore(), faults),
+    }
+
+async def serve(
+    dataset: SyntheticDataset,
+    host: str = "127.0.0.1",
+    ports: Optional[Dict[str, int]] = None,
+    latency_ms: float = 0.0,
+    jitter_ms: float = 0.0,
+    error_rate: float = 0.0,
+    log_level: str = "warning",
+):
+    """Serves the npi, cred_db and alert MCP servers over SSE and streamable HTTP until cancelled."""
+    import uvicorn
+
+    ports = {**DEFAULT_PORTS, **(ports or {})}
+    uvicorn_servers = []
+    for offset, (name, build) in enumerate(_builders(dataset).items()):
+        faults = FaultProfile.from_env(name, latency_ms, jitter_ms, error_rate, seed=dataset.seed + offset)
+        config = uvicorn.Config(http_app(build(faults)), host=host, port=ports[name], log_level=log_level)
+        uvicorn_servers.append(uvicorn.Server(config))
+        logger.info(
+            f"{name}_mcp on http://{host}:{ports[name]}/sse and http://{host}:{ports[name]}/ "
+            f"(latency {faults.latency_ms:g} ms + ~{faults.jitter_ms:g} ms, error rate {faults.error_rate:g})"
+        )
+    await asyncio.gather(*(server.serve() for server in uvicorn_servers))
+
+async def serve_stdio(dataset: SyntheticDataset, server_name: str, latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0):
+    """Serves one of the MCP servers over stdin/stdout, e.g. as a subprocess of the agent."""
+    builders = _builders(dataset)
+    if server_name not in builders:
+        raise ValueError(f"Unknown server '{server_name}' (expected one of {', '.join(builders)}).")
+    offset = list(builders).index(server_name)
+    faults = FaultProfile.from_env(server_name, latency_ms, jitter_ms, error_rate, seed=dataset.seed + offset)
+    await builders[server_name](faults).run_stdio_async()
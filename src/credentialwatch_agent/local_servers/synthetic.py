@@ -0,0 +1,436 @@
+import time
+import random
+import itertools
+import logging
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger("local_servers")
+
+FIRST_NAMES = (
+    "JAMES", "MARY", "ROBERT", "PATRICIA", "JOHN", "JENNIFER", "MICHAEL", "LINDA", "DAVID", "ELIZABETH",
+    "WILLIAM", "BARBARA", "RICHARD", "SUSAN", "JOSEPH", "JESSICA", "THOMAS", "SARAH", "CHARLES", "KAREN",
+    "CHRISTOPHER", "LISA", "DANIEL", "NANCY", "MATTHEW", "BETTY", "ANTHONY", "SANDRA", "MARK", "ASHLEY",
+    "PRIYA", "WEI", "FATIMA", "CARLOS", "AISHA", "HIROSHI", "OLGA", "KWAME", "SOFIA", "RAVI",
+)
+LAST_NAMES = (
+    "SMITH", "JOHNSON", "WILLIAMS", "BROWN", "JONES", "GARCIA", "MILLER", "DAVIS", "RODRIGUEZ", "MARTINEZ",
+    "HERNANDEZ", "LOPEZ", "GONZALEZ", "WILSON", "ANDERSON", "THOMAS", "TAYLOR", "MOORE", "JACKSON", "MARTIN",
+    "LEE", "PEREZ", "THOMPSON", "WHITE", "HARRIS", "SANCHEZ", "CLARK", "RAMIREZ", "LEWIS", "ROBINSON",
+    "WALKER", "YOUNG", "ALLEN", "KING", "WRIGHT", "SCOTT", "TORRES", "NGUYEN", "HILL", "FLORES",
+    "PATEL", "CHEN", "KIM", "OKAFOR", "IVANOVA", "TANAKA", "MENSAH", "ROSSI", "SHAH", "COHEN",
+)
+SPECIALTIES = (
+    ("207RC0000X", "Cardiovascular Disease"),
+    ("207R00000X", "Internal Medicine"),
+    ("207Q00000X", "Family Medicine"),
+    ("208000000X", "Pediatrics"),
+    ("207X00000X", "Orthopaedic Surgery"),
+    ("2084P0800X", "Psychiatry"),
+    ("207V00000X", "Obstetrics & Gynecology"),
+    ("207P00000X", "Emergency Medicine"),
+    ("2085R0202X", "Diagnostic Radiology"),
+    ("207N00000X", "Dermatology"),
+    ("363L00000X", "Nurse Practitioner"),
+    ("363A00000X", "Physician Assistant"),
+    ("164W00000X", "Licensed Practical Nurse"),
+    ("1223G0001X", "Dentist, General Practice"),
+    ("101Y00000X", "Counselor"),
+)
+LOCATIONS = (
+    ("OMAHA", "NE", "68144"), ("TAMPA", "FL", "33610"), ("LAKE OSWEGO", "OR", "97035"),
+    ("MILWAUKEE", "WI", "53211"), ("PITTSBURGH", "PA", "15212"), ("MODESTO", "CA", "95350"),
+    ("SAN ANTONIO", "TX", "78216"), ("TULSA", "OK", "74104"), ("BERKELEY", "CA", "94704"),
+    ("BOSTON", "MA", "02115"), ("DENVER", "CO", "80203"), ("ATLANTA", "GA", "30303"),
+    ("SEATTLE", "WA", "98104"), ("CHICAGO", "IL", "60611"), ("PHOENIX", "AZ", "85004"),
+    ("NASHVILLE", "TN", "37203"), ("COLUMBUS", "OH", "43215"), ("RALEIGH", "NC", "27601"),
+    ("MINNEAPOLIS", "MN", "55401"), ("ALBANY", "NY", "12207"),
+)
+# (credential name, renewal cycle in days, issuing authority, number prefix)
+CREDENTIAL_TYPES = (
+    ("State Medical License", 730, "State Medical Board", "ML"),
+    ("DEA Registration", 1095, "Drug Enforcement Administration", "DEA"),
+    ("Board Certification", 3650, "American Board of Medical Specialties", "BC"),
+    ("BLS Certification", 730, "American Heart Association", "BLS"),
+    ("Malpractice Insurance", 365, "Professional Liability Carrier", "MPI"),
+    ("Hospital Privileges", 730, "Medical Staff Office", "HP"),
+)
+# Share of each renewal cycle that is already past expiry (lapsed, not yet renewed).
+EXPIRED_SHARE = 0.05
+
+NPI_BASE = 100000000
+
+def npi_check_digit(body: str) -> int:
+    """Luhn check digit for a 9-digit NPI body (with the 80840 card-issuer prefix)."""
+    total = 0
+    for position, char in enumerate(reversed("80840" + body)):
+        digit = int(char)
+        if position % 2 == 0:
+            digit *= 2
+            if digit > 9:
+                digit -= 9
+        total += digit
+    return (10 - total % 10) % 10
+
+class SyntheticDataset:
+    """
+    Seeded, reproducible providers and credentials for the local MCP servers.
+
+    Rows are stored column-wise in compact arrays and turned into dicts only when
+    returned, so a million providers fit in memory. Credentials are kept sorted by
+    expiry date, so expiry-window queries and cursor paging are binary searches.
+    Every credential update is logged, so clients can fetch just the changes since a
+    sync cursor.
+    Expiry dates are spread over each credential type's renewal cycle, with a small
+    share already lapsed, which gives a realistic steady trickle of expiring items.
+    """
+
+    def __init__(self, providers: int = 1000, credentials_per_provider: float = 2.5, seed: int = 42, today: Optional[date] = None):
+        self.seed = seed
+        self.num_providers = providers
+        self.today = today or date.today()
+
+        started = time.perf_counter()
+        rng = random.Random(seed)
+        today_ordinal = self.today.toordinal()
+        max_per_provider = max(1, min(len(CREDENTIAL_TYPES), round(2 * credentials_per_provider - 1)))
+
+        self.first_name = array("H")
+        self.last_name = array("H")
+        self.specialty = array("B")
+        self.location = array("B")
+        self.cred_start = array("I")
+        self.cred_provider = array("I")
+        self.cred_type = array("B")
+        self.cred_expiry = array("i")
+
+        # Hot loop for up to millions of rows: bound methods and precomputed type orders.
+        random_ = rng.random
+        type_orders = list(itertools.permutations(range(len(CREDENTIAL_TYPES))))
+        cycles = [t[1] for t in CREDENTIAL_TYPES]
+        n_first, n_last, n_specialties, n_locations = len(FIRST_NAMES), len(LAST_NAMES), len(SPECIALTIES), len(LOCATIONS)
+        n_orders = len(type_orders)
+        add_first, add_last = self.first_name.append, self.last_name.append
+        add_specialty, add_location, add_start = self.specialty.append, self.location.append, self.cred_start.append
+        add_provider, add_type, add_expiry = self.cred_provider.append, self.cred_type.append, self.cred_expiry.append
+        span = 1.0 + EXPIRED_SHARE
+
+        for provider in range(providers):
+            add_first(int(random_() * n_first))
+            add_last(int(random_() * n_last))
+            add_specialty(int(random_() * n_specialties))
+            add_location(int(random_() * n_locations))
+            add_start(len(self.cred_provider))
+            count = 1 + int(random_() * max_per_provider)
+            for type_index in type_orders[int(random_() * n_orders)][:count]:
+                add_provider(provider)
+                add_type(type_index)
+                add_expiry(today_ordinal + int((random_() * span - EXPIRED_SHARE) * cycles[type_index]))
+        self.cred_start.append(len(self.cred_provider))
+
+        # Credentials added after generation, by provider index.
+        self._extra_credentials: Dict[int, List[int]] = {}
+        # Credential indexes in update order; a sync cursor is a position in this log.
+        self._changes = array("I")
+        self._by_first: Optional[Dict[int, array]] = None
+        self._by_last: Optional[Dict[int, array]] = None
+        self._order = array("I")
+        self._order_expiry = array("i")
+        self._order_dirty = True
+        self._sort_credentials()
+        logger.info(
+            f"Generated {providers} providers and {len(self.cred_provider)} credentials "
+            f"(seed {seed}) in {time.perf_counter() - started:.2f}s."
+        )
+
+    @property
+    def num_credentials(self) -> int:
+        return len(self.cred_provider)
+
+    # --- Providers ---
+
+    def npi(self, provider: int) -> str:
+        body = str(NPI_BASE + provider)
+        return body + str(npi_check_digit(body))
+
+    def provider_index(self, npi: Any) -> Optional[int]:
+        """Returns the provider index for an NPI, or None if it is not in the dataset."""
+        text = str(npi).strip()
+        if len(text) != 10 or not text.isdigit() or npi_check_digit(text[:9]) != int(text[9]):
+            return None
+        provider = int(text[:9]) - NPI_BASE
+        return provider if 0 <= provider < self.num_providers else None
+
+    def full_name(self, provider: int) -> str:
+        return f"{FIRST_NAMES[self.first_name[provider]]} {LAST_NAMES[self.last_name[provider]]}"
+
+    def provider_record(self, provider: int) -> Dict[str, Any]:
+        taxonomy, specialty = SPECIALTIES[self.specialty[provider]]
+        city, state, postal_code = LOCATIONS[self.location[provider]]
+        return {
+            "provider_id": provider + 1,
+            "npi": self.npi(provider),
+            "full_name": self.full_name(provider),
+            "enumeration_type": "NPI-1",
+            "primary_taxonomy": taxonomy,
+            "primary_specialty": specialty,
+            "primary_address": {
+                "address_1": f"{100 + provider % 9900} MAIN ST",
+                "address_2": None,
+                "city": city,
+                "state": state,
+                "postal_code": postal_code,
+                "country_code": "US",
+                "telephone_number": f"555-{provider // 10000 % 1000:03d}-{provider % 10000:04d}",
+            },
+        }
+
+    def search_providers(self, query: str, state: Optional[str] = None, taxonomy: Optional[str] = None, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Finds providers whose first or last name starts with any query word,
+        optionally filtered by state code and taxonomy code or specialty text.
+        """
+        if self._by_first is None:
+            self._by_first = self._group(self.first_name)
+            self._by_last = self._group(self.last_name)
+
+        words = [w for w in query.upper().replace(",", " ").split() if w.lower() not in ("dr", "dr.")]
+        state = state.upper() if state else None
+        taxonomy = taxonomy.lower() if taxonomy else None
+        seen = set()
+        results = []
+        for provider in self._name_candidates(words):
+            if provider in seen:
+                continue
+            seen.add(provider)
+            if state and LOCATIONS[self.location[provider]][1] != state:
+                continue
+            if taxonomy:
+                code, specialty = SPECIALTIES[self.specialty[provider]]
+                if taxonomy != code.lower() and taxonomy not in specialty.lower():
+                    continue
+            results.append(self.provider_record(provider))
+            if len(results) >= limit:
+                break
+        return results
+
+    def _name_candidates(self, words: List[str]) -> Iterator[int]:
+        for word in words:
+            for pool, by_index in ((LAST_NAMES, self._by_last), (FIRST_NAMES, self._by_first)):
+                for index, name in enumerate(pool):
+                    if name.startswith(word):
+                        yield from by_index.get(index, ())
+
+    @staticmethod
+    def _group(column: array) -> Dict[int, array]:
+        groups: Dict[int, array] = {}
+        for provider, value in enumerate(column):
+            groups.setdefault(value, array("I")).append(provider)
+        return groups
+
+    # --- Credentials ---
+
+    def credential_indexes(self, provider: int) -> List[int]:
+        indexes = list(range(self.cred_start[provider], self.cred_start[provider + 1]))
+        return indexes + self._extra_credentials.get(provider, [])
+
+    def credential_record(self, credential: int) -> Dict[str, Any]:
+        provider = self.cred_provider[credential]
+        name, _, authority, prefix = CREDENTIAL_TYPES[self.cred_type[credential]]
+        taxonomy, specialty = SPECIALTIES[self.specialty[provider]]
+        expiry_ordinal = self.cred_expiry[credential]
+        return {
+            "credential_id": credential + 1,
+            "provider_id": provider + 1,
+            "npi": self.npi(provider),
+            "name": self.full_name(provider),
+            "primary_taxonomy": taxonomy,
+            "primary_specialty": specialty,
+            "state": LOCATIONS[self.location[provider]][1],
+            "credential": name,
+            "issuing_authority": authority,
+            "number": f"{prefix}-{credential + 1:08d}",
+            "expiry_date": date.fromordinal(expiry_ordinal).isoformat(),
+            "days_remaining": expiry_ordinal - date.today().toordinal(),
+        }
+
+    def provider_snapshot(self, provider: int) -> Dict[str, Any]:
+        credentials = [self.credential_record(c) for c in self.credential_indexes(provider)]
+        lapsed = any(c["days_remaining"] < 0 for c in credentials)
+        return {
+            **self.provider_record(provider),
+            "name": self.full_name(provider),
+            "status": "Lapsed" if lapsed else "Active",
+            "credentials": credentials,
+        }
+
+    def upsert_credential(self, provider: int, credential: str, expiry_date: date) -> Dict[str, Any]:
+        """Sets the expiry of a provider's credential of this type, adding the credential if it has none."""
+        type_index = next((i for i, t in enumerate(CREDENTIAL_TYPES) if t[0].lower() == credential.lower()), None)
+        if type_index is None:
+            raise ValueError(f"Unknown credential type '{credential}'. Expected one of: {', '.join(t[0] for t in CREDENTIAL_TYPES)}.")
+        existing = next((c for c in self.credential_indexes(provider) if self.cred_type[c] == type_index), None)
+        if existing is None:
+            existing = len(self.cred_provider)
+            self.cred_provider.append(provider)
+            self.cred_type.append(type_index)
+            self.cred_expiry.append(expiry_date.toordinal())
+            self._extra_credentials.setdefault(provider, []).append(existing)
+        else:
+            self.cred_expiry[existing] = expiry_date.toordinal()
+        self._changes.append(existing)
+        self._order_dirty = True
+        return self.credential_record(existing)
+
+    def _sort_credentials(self):
+        # sorted() is stable, so equal expiry dates keep index order, as the (expiry, index) cursor expects.
+        expiry = self.cred_expiry
+        self._order = array("I", sorted(range(len(expiry)), key=expiry.__getitem__))
+        self._order_expiry = array("i", sorted(expiry))
+        self._order_dirty = False
+
+    def list_expiring(
+        self,
+        window_days: int = 90,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        cursor: Optional[str] = None,
+        include_expired: bool = False,
+        updated_since: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Credentials expiring within window_days, soonest first.
+        Pages with limit plus either offset or the opaque next_cursor of the previous page.
+        With updated_since (the sync_cursor of an earlier result), returns instead every
+        credential updated since then, whatever its expiry date, in one page.
+        """
+        if updated_since is not None:
+            return self._list_updated(updated_since)
+        sync_cursor = str(len(self._changes))
+        if self._order_dirty:
+            self._sort_credentials()
+        today_ordinal = date.today().toordinal()
+        lo = 0 if include_expired else bisect_left(self._order_expiry, today_ordinal)
+        hi = bisect_right(self._order_expiry, today_ordinal + window_days)
+
+        if cursor:
+            after = _decode_cursor(cursor)
+            expiry = self.cred_expiry
+            start = bisect_right(self._order, after, lo, hi, key=lambda c: (expiry[c], c))
+        else:
+            start = min(hi, lo + max(0, offset))
+        end = hi if limit is None else min(hi, start + max(0, limit))
+
+        page = self._order[start:end]
+        next_cursor = None
+        if end < hi and len(page):
+            last = page[-1]
+            next_cursor = f"{self.cred_expiry[last]}:{last}"
+        return {
+            "expiring": [self.credential_record(c) for c in page],
+            "total": hi - lo,
+            "offset": start - lo,
+            "has_more": end < hi,
+            "next_cursor": next_cursor,
+            "sync_cursor": sync_cursor,
+        }
+
+    def _list_updated(self, updated_since: str) -> Dict[str, Any]:
+        try:
+            start = int(updated_since)
+        except ValueError:
+            raise ValueError(f"Invalid sync cursor '{updated_since}'.")
+        expiry = self.cred_expiry
+        changed = sorted(set(self._changes[max(0, start):]), key=lambda c: (expiry[c], c))
+        return {
+            "expiring": [self.credential_record(c) for c in changed],
+            "total": len(changed),
+            "offset": 0,
+            "has_more": False,
+            "next_cursor": None,
+            "sync_cursor": str(len(self._changes)),
+        }
+
+    def window_for(self, items: int) -> int:
+        """Smallest window_days for which list_expiring returns at least `items` credentials (if there are that many)."""
+        if self._order_dirty:
+            self._sort_credentials()
+        today_ordinal = date.today().toordinal()
+        lo = bisect_left(self._order_expiry, today_ordinal)
+        position = min(len(self._order_expiry), lo + max(1, items)) - 1
+        return max(0, self._order_expiry[position] - today_ordinal) if position >= lo else 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "seed": self.seed,
+            "providers": self.num_providers,
+            "credentials": self.num_credentials,
+            "today": self.today.isoformat(),
+        }
+
+def _decode_cursor(cursor: str) -> Tuple[int, int]:
+    try:
+        expiry, credential = cursor.split(":")
+        return int(expiry), int(credential)
+    except ValueError:
+        raise ValueError(f"Invalid cursor '{cursor}'.")
+
+def parse_date(value: str) -> date:
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid date '{value}', expected YYYY-MM-DD.")
+
+class AlertStore:
+    """In-memory alerts for the local alert server."""
+
+    def __init__(self):
+        self._alerts: Dict[int, Dict[str, Any]] = {}
+        self._next_id = 1
+
+    def log(self, alert: Dict[str, Any]) -> Dict[str, Any]:
+        record = {
+            "alert_id": self._next_id,
+            "provider_id": alert.get("provider_id"),
+            "credential_id": alert.get("credential_id"),
+            "severity": alert.get("severity", "medium"),
+            "message": alert.get("message", ""),
+            "created_at": time.time(),
+            "resolved": False,
+            "resolution_note": None,
+        }
+        self._alerts[self._next_id] = record
+        self._next_id += 1
+        return record
+
+    def open_alerts(self, provider_id: Optional[int] = None, severity: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        results = []
+        for alert in reversed(self._alerts.values()):
+            if alert["resolved"]:
+                continue
+            if provider_id is not None and str(alert["provider_id"]) != str(provider_id):
+                continue
+            if severity and alert["severity"] != severity:
+                continue
+            results.append(alert)
+            if len(results) >= limit:
+                break
+        return results
+
+    def resolve(self, alert_id: int, resolution_note: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        alert = self._alerts.get(int(alert_id))
+        if alert is not None:
+            alert["resolved"] = True
+            alert["resolution_note"] = resolution_note
+        return alert
+
+    def summary(self) -> Dict[str, Any]:
+        by_severity: Dict[str, int] = {}
+        open_count = 0
+        for alert in self._alerts.values():
+            if not alert["resolved"]:
+                open_count += 1
+                by_severity[alert["severity"]] = by_severity.get(alert["severity"], 0) + 1
+        return {"total": len(self._alerts), "open": open_count, "open_by_severity": by_severity}
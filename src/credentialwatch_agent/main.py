@@ -1,61 +1,194 @@
 import asyncio
 import os
+import time
 import logging
-from typing import Dict, Any, List
+from contextlib import asynccontextmanager
+from typing import Dict, Any, List, Optional, AsyncIterator
 import gradio as gr
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from dotenv import load_dotenv
 load_dotenv(".env.local")
 load_dotenv()
 
-from langchain_core.messages import HumanMessage, AIMessage
+from langchain_core.messages import HumanMessage, AIMessage, AIMessageChunk
 
 import uuid
-from langgraph.checkpoint.memory import InMemorySaver
 
 # Configure logging for main
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger("credentialwatch_agent")
 
-# In-memory checkpointer to preserve tool call context within a session
-checkpointer = InMemorySaver()
-
 from credentialwatch_agent.mcp_client import mcp_client
-from credentialwatch_agent.agents.expiry_sweep import expiry_sweep_graph
-from credentialwatch_agent.agents.interactive_query import get_interactive_query_graph
+from credentialwatch_agent.expiry_index import expiry_index
+from credentialwatch_agent.agents.expiry_sweep import build_expiry_sweep_graph, supports_paging, SWEEP_MAX_CHECKPOINTS
+from credentialwatch_agent.sweep_runs import open_sweep_checkpointer, new_run_id, get_run_state, list_incomplete_runs, compact_run, sweep_lock
+from credentialwatch_agent.sweep_partitions import sweep_workers, sweep_partition_by
+from credentialwatch_agent.agents.interactive_query import get_interactive_query_graph, graph_registry_stats
+from credentialwatch_agent.checkpointer import create_chat_checkpointer, checkpointer_stats
+from credentialwatch_agent.compaction import compaction_stats
+from credentialwatch_agent.tool_executor import tool_executor
+from credentialwatch_agent import metrics
+from credentialwatch_agent.tracing import span
+from credentialwatch_agent.rate_limiter import rate_limits, request_context
+from credentialwatch_agent import intent_router
+from credentialwatch_agent.answer_cache import answer_cache, AnswerKey
+
+# Checkpointer preserving tool call context within a session (CHAT_CHECKPOINTER selects
+# the memory or sqlite backend). Created on first use, inside the running event loop.
+_checkpointer = None
+
+def get_checkpointer():
+    """Returns the shared, bounded conversation checkpointer."""
+    global _checkpointer
+    if _checkpointer is None:
+        _checkpointer = create_chat_checkpointer()
+    return _checkpointer
 
-async def run_expiry_sweep(window_days: int = 90) -> Dict[str, Any]:
+async def run_expiry_sweep(
+    window_days: int = 90,
+    streaming: Optional[bool] = None,
+    full: bool = False,
+    resume: Optional[str] = None,
+    workers: Optional[int] = None,
+    partition_by: Optional[str] = None,
+) -> Dict[str, Any]:
     """
     Runs the expiry sweep workflow.
+    With streaming=True (default from SWEEP_STREAMING), credentials are paged and
+    alerted as they arrive instead of being loaded into state all at once.
+    With full=True, every expiring credential is alerted, ignoring the alert ledger.
+    With workers > 0 (default from SWEEP_WORKERS), the fetched credentials are split into
+    partitions (partition_by: provider, expiry or credential_type) that are alerted in
+    that many worker processes; this takes precedence over streaming.
+
+    Only one sweep per window runs at a time; a second one raises SweepInProgressError.
+
+    Every run is checkpointed under a run id. Pass resume=<run_id> to continue an
+    incomplete run from its last checkpoint (see list_incomplete_sweeps).
     """
-    logger.info(f"Starting expiry sweep for {window_days} days...")
     await mcp_client.connect()
-    print(f"Starting expiry sweep for {window_days} days...")
-    # Initialize state
-    initial_state = {
-        "providers": [], 
-        "alerts_created": 0, 
-        "errors": [], 
-        "summary": "",
-        "window_days": window_days
-    }
-    
-    # Run the graph
-    # Note: The graph expects to fetch data itself, so initial state can be minimal.
-    # We might want to pass window_days if the graph supported dynamic config in state,
-    # but for now the graph hardcodes 90 or uses tool defaults. 
-    # To make it dynamic, we'd need to update the graph to read from state.
-    # For this hackathon, we'll assume the graph handles it or we pass it via a modified state if needed.
-    # The current implementation of fetch_expiring_credentials uses a hardcoded 90 or tool default.
-    
-    logger.info("Invoking expiry_sweep_graph...")
-    final_state = await expiry_sweep_graph.ainvoke(initial_state)
+
+    async with open_sweep_checkpointer() as saver:
+        if resume:
+            run_id = resume
+            state = await get_run_state(saver, run_id)
+            if state is None:
+                raise ValueError(f"Unknown sweep run '{run_id}'.")
+            streaming = state.get("streaming", False)
+            window_days = state.get("window_days", window_days)
+            workers = state.get("workers", 0)
+            # Input None continues from the last checkpoint; a finished run just returns its state.
+            graph_input = None
+            logger.info(f"Resuming expiry sweep {run_id} (processed {state.get('alerts_cursor', 0)} items so far)...")
+        else:
+            run_id = new_run_id()
+            if streaming is None:
+                streaming = os.getenv("SWEEP_STREAMING", "false").lower() in ("1", "true", "yes")
+            if workers is None:
+                workers = sweep_workers()
+            if workers > 0:
+                streaming = False
+            if streaming and not supports_paging():
+                # Streaming would fetch the whole list on every step; one fetch and chunked alerts is cheaper.
+                logger.info("list_expiring_credentials does not page; running the sweep unstreamed.")
+                streaming = False
+            # Initialize state
+            graph_input = {
+                "expiring": {},
+                "alerts_created": 0, 
+                "errors": [], 
+                "summary": "",
+                "window_days": window_days,
+                "alerts_elapsed_seconds": 0.0,
+                "items_scanned": 0,
+                "pages_fetched": 0,
+                "full_sweep": full,
+                "alerts_skipped": 0,
+                "alerts_cursor": 0,
+                "page_position": {},
+                "streaming": streaming,
+                "workers": workers,
+                "partition_by": partition_by or sweep_partition_by(),
+                "partitions": 0,
+                "severity_counts": {},
+                "credential_type_counts": {}
+            }
+            logger.info(f"Starting expiry sweep {run_id} for {window_days} days...")
+        print(f"Starting expiry sweep for {window_days} days...")
+
+        graph = build_expiry_sweep_graph(checkpointer=saver, streaming=streaming, partitioned=workers > 0)
+        config = {
+            "configurable": {"thread_id": run_id},
+            "recursion_limit": SWEEP_MAX_CHECKPOINTS + 10,
+        }
+        logger.info(f"Invoking expiry_sweep_graph (streaming={streaming}, workers={workers})...")
+        started = time.perf_counter()
+        try:
+            async with sweep_lock(window_days, run_id):
+                with request_context("batch", run_id), span("sweep.run", run_id=run_id, window_days=window_days, streaming=streaming, workers=workers, resumed=bool(resume)):
+                    final_state = await graph.ainvoke(graph_input, config=config)
+        except BaseException:
+            metrics.sweep_runs.inc(outcome="failed")
+            raise
+        await compact_run(saver, run_id)
     logger.info("Expiry sweep graph completed.")
+    _record_sweep_metrics(final_state, time.perf_counter() - started)
     return {
+        "run_id": run_id,
         "summary": final_state.get("summary"),
+        "items_scanned": final_state.get("items_scanned", 0),
         "alerts_created": final_state.get("alerts_created"),
+        "alerts_skipped": final_state.get("alerts_skipped", 0),
+        "by_severity": final_state.get("severity_counts", {}),
+        "by_credential_type": final_state.get("credential_type_counts", {}),
         "errors": final_state.get("errors")
     }
 
+def _record_sweep_metrics(state: Dict[str, Any], elapsed: float):
+    metrics.sweep_runs.inc(outcome="completed")
+    metrics.sweep_last_items.set(state.get("items_scanned", 0))
+    metrics.sweep_last_alerts.set(state.get("alerts_created", 0))
+    metrics.sweep_last_skipped.set(state.get("alerts_skipped", 0))
+    metrics.sweep_last_errors.set(len(state.get("errors") or []))
+    metrics.sweep_last_duration.set(elapsed)
+    metrics.sweep_last_completed.set(time.time())
+
+async def list_incomplete_sweeps() -> List[Dict[str, Any]]:
+    """
+    Lists checkpointed sweep runs that stopped before finishing, newest first.
+    """
+    async with open_sweep_checkpointer() as saver:
+        return await list_incomplete_runs(saver)
+
+async def run_sweep_from_ui(full: bool = False) -> Dict[str, Any]:
+    """
+    Runs the expiry sweep from the UI, optionally as a full (non-incremental) sweep.
+    """
+    return await run_expiry_sweep(full=full)
+
+async def _answer_directly(message: str, thread_id: str, cache_key: Optional[AnswerKey]) -> Optional[str]:
+    """
+    Answers a question without the LLM: from the answer cache, or through the intent
+    router for templated questions. The turn is added to the thread's checkpointed
+    history as an agent reply, so follow-up questions to the agent see it.
+    Returns None to use the agent.
+    """
+    started = time.perf_counter()
+    mode = "cached"
+    answer = answer_cache.get(cache_key) if cache_key else None
+    if answer is None:
+        mode = "routed"
+        with span("chat.route", thread_id=thread_id):
+            answer = await intent_router.route(message)
+    if answer is None:
+        return None
+    graph = get_interactive_query_graph(checkpointer=get_checkpointer())
+    config = {"configurable": {"thread_id": thread_id}}
+    await graph.aupdate_state(config, {"messages": [HumanMessage(content=message), AIMessage(content=answer)]}, as_node="agent")
+    metrics.chat_turn_seconds.observe(time.perf_counter() - started, mode=mode)
+    return answer
+
 async def run_chat_turn(message: str, history: List[List[str]], thread_id: str) -> str:
     """
     Runs a turn of the interactive query agent.
@@ -63,35 +196,103 @@ async def run_chat_turn(message: str, history: List[List[str]], thread_id: str)
     """
     logger.info(f"Starting chat turn with message: {message} (thread_id: {thread_id})")
     await mcp_client.connect()
+
+    cache_key = answer_cache.key(message)
+    answer = await _answer_directly(message, thread_id, cache_key)
+    if answer is not None:
+        return answer
+    generations = answer_cache.generations()
     
     # Only pass the new message - checkpointer handles full history including tool calls
     initial_state = {"messages": [HumanMessage(content=message)]}
     
-    # Run the graph with checkpointer
+    # Run the graph with checkpointer (compiled once per tool-set version)
     logger.info("Invoking interactive_query_graph...")
-    interactive_query_graph = get_interactive_query_graph(checkpointer=checkpointer)
+    started = time.perf_counter()
+    interactive_query_graph = get_interactive_query_graph(checkpointer=get_checkpointer())
+    logger.info(f"Interactive query graph ready in {(time.perf_counter() - started) * 1000:.2f} ms.")
     
     config = {"configurable": {"thread_id": thread_id}}
-    final_state = await interactive_query_graph.ainvoke(initial_state, config=config)
+    with span("chat.turn", thread_id=thread_id, mode="invoke"):
+        final_state = await interactive_query_graph.ainvoke(initial_state, config=config)
+    metrics.chat_turn_seconds.observe(time.perf_counter() - started, mode="invoke")
+    intent_router.router_stats.record_agent_turn(time.perf_counter() - started)
     logger.info("Interactive query graph completed.")
+    if cache_key:
+        answer_cache.put(cache_key, generations, final_state["messages"])
     
     # Extract the last message
     last_message = final_state["messages"][-1]
     return last_message.content
 
-# --- Gradio UI ---
-
-async def start_app():
-    """Initializes the app and connects to MCP servers."""
-    print("Connecting to MCP servers...")
-    logger.info("Initializing app and connecting to MCP servers...")
+async def stream_chat_turn(message: str, history: List[List[str]], thread_id: str) -> AsyncIterator[str]:
+    """
+    Streaming variant of run_chat_turn for the chat UI.
+    Yields the response so far as model tokens and tool calls arrive; the thread's
+    checkpointed state is the same as with run_chat_turn.
+    """
+    logger.info(f"Starting streaming chat turn with message: {message} (thread_id: {thread_id})")
     await mcp_client.connect()
 
-async def stop_app():
-    """Closes connections."""
-    print("Closing MCP connections...")
-    logger.info("Stopping app and closing MCP connections...")
-    await mcp_client.close()
+    cache_key = answer_cache.key(message)
+    answer = await _answer_directly(message, thread_id, cache_key)
+    if answer is not None:
+        yield answer
+        return
+    generations = answer_cache.generations()
+
+    initial_state = {"messages": [HumanMessage(content=message)]}
+    interactive_query_graph = get_interactive_query_graph(checkpointer=get_checkpointer())
+    config = {"configurable": {"thread_id": thread_id}}
+
+    started = time.perf_counter()
+    first_token_at = None
+    parts: List[str] = []
+    async for chunk, metadata in interactive_query_graph.astream(initial_state, config=config, stream_mode="messages"):
+        if metadata.get("langgraph_node") != "agent" or not isinstance(chunk, AIMessageChunk):
+            continue
+        updated = False
+        for tool_call in chunk.tool_call_chunks or []:
+            if tool_call.get("name"):
+                parts.append(f"\n\n_Calling tool `{tool_call['name']}`…_\n\n")
+                updated = True
+        if isinstance(chunk.content, str) and chunk.content:
+            parts.append(chunk.content)
+            updated = True
+        if updated:
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+                logger.info(f"Time to first token: {(first_token_at - started) * 1000:.0f} ms.")
+            yield "".join(parts).strip()
+
+    metrics.chat_turn_seconds.observe(time.perf_counter() - started, mode="stream")
+    intent_router.router_stats.record_agent_turn(time.perf_counter() - started)
+    if cache_key:
+        state = await interactive_query_graph.aget_state(config)
+        answer_cache.put(cache_key, generations, state.values.get("messages", []))
+    logger.info(f"Streaming chat turn completed in {(time.perf_counter() - started) * 1000:.0f} ms.")
+
+async def get_runtime_stats() -> Dict[str, Any]:
+    """
+    Returns cache, graph registry, compaction and conversation checkpointer statistics.
+    """
+    return {
+        "mcp_startup": mcp_client.startup_stats(),
+        "mcp_servers": mcp_client.server_stats(),
+        "mcp_http_pool": mcp_client.http_pool_stats(),
+        "mcp_hedging": mcp_client.hedge_stats(),
+        "tool_result_cache": mcp_client.cache_stats(),
+        "expiry_index": expiry_index.stats(),
+        "graph_registry": graph_registry_stats(),
+        "compaction": compaction_stats.as_dict(),
+        "tool_executor": tool_executor.stats(),
+        "rate_limits": rate_limits.stats(),
+        "intent_router": intent_router.router_stats.as_dict(),
+        "answer_cache": answer_cache.stats(),
+        "checkpointer": await checkpointer_stats(get_checkpointer()),
+    }
+
+# --- Gradio UI ---
 
 with gr.Blocks(title="CredentialWatch") as demo:
     gr.Markdown("# CredentialWatch Agent System")
@@ -100,30 +301,55 @@ with gr.Blocks(title="CredentialWatch") as demo:
         gr.Markdown("Ask questions about provider credentials, e.g., 'Who has expiring licenses?'")
         thread_id_state = gr.State(lambda: str(uuid.uuid4()))
         chat_interface = gr.ChatInterface(
-            fn=run_chat_turn,
+            fn=stream_chat_turn,
             additional_inputs=[thread_id_state]
         )
 
     with gr.Tab("Expiry Sweep"):
         gr.Markdown("Run a batch sweep to check for expiring credentials and create alerts.")
         with gr.Row():
+            full_sweep_checkbox = gr.Checkbox(label="Full sweep (ignore alert ledger)", value=False)
             sweep_btn = gr.Button("Run Sweep", variant="primary")
         
         sweep_output = gr.JSON(label="Sweep Results")
         
-        sweep_btn.click(fn=run_expiry_sweep, inputs=[], outputs=[sweep_output])
+        sweep_btn.click(fn=run_sweep_from_ui, inputs=[full_sweep_checkbox], outputs=[sweep_output])
+
+    with gr.Tab("Stats"):
+        gr.Markdown("Runtime statistics for caches and conversation memory.")
+        stats_btn = gr.Button("Refresh")
+        stats_output = gr.JSON(label="Stats")
+        stats_btn.click(fn=get_runtime_stats, inputs=[], outputs=[stats_output])
+
+def create_app(**gradio_kwargs):
+    """
+    Returns a FastAPI app serving the Gradio UI (and its MCP server) at / and
+    Prometheus metrics at /metrics. Startup warms the expiry index; shutdown closes
+    the MCP connections.
+    """
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        # Warming the expiry index connects to the MCP servers in the background; calls
+        # connect lazily anyway, so startup does not wait for (or fail on) the servers.
+        expiry_index.warm()
+        yield
+        logger.info("Stopping app and closing MCP connections...")
+        await mcp_client.close()
+
+    app = FastAPI(lifespan=lifespan)
+
+    @app.get("/metrics", include_in_schema=False)
+    def metrics_endpoint():
+        return PlainTextResponse(metrics.render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+    return gr.mount_gradio_app(app, demo, path="/", mcp_server=True, **gradio_kwargs)
 
-# Startup/Shutdown hooks
-# Gradio doesn't have native async startup hooks easily exposed in Blocks without mounting to FastAPI.
-# But we can run the connect logic when the script starts if we run it via `uv run`.
-# For a proper app, we'd use lifespan events in FastAPI.
-# Here, we will just connect globally on import or first use if possible, 
-# or use a startup event if we were using `gr.mount_gradio_app`.
-# For simplicity in this script, we'll rely on the global mcp_client.connect() being called 
-# or we can wrap the demo launch.
+def launch_app(host: str = "0.0.0.0", port: int = 7860, **gradio_kwargs):
+    """Serves create_app() with uvicorn."""
+    import uvicorn
+    uvicorn.run(create_app(**gradio_kwargs), host=host, port=port)
 
 if __name__ == "__main__":
-    # Launch the demo. 
-    # Note: We rely on lazy connection in run_chat_turn/run_expiry_sweep to connect mcp_client.
-    # This avoids creating a conflicting event loop before Gradio starts.
-    demo.launch(server_name="0.0.0.0", server_port=7860, mcp_server=True)
+    # Launch the demo (mounted next to /metrics). MCP servers are connected by create_app's
+    # lifespan, inside uvicorn's event loop, rather than before Gradio starts.
+    launch_app()
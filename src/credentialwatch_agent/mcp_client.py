@@ -1,8 +1,40 @@
 import os
+import json
+import time
 import asyncio
 import logging
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Set
+from langchain_core.tools import StructuredTool
 from langchain_mcp_adapters.client import MultiServerMCPClient
+from credentialwatch_agent.tool_index import ToolIndex, canonical_name
+from credentialwatch_agent.result_cache import ResultCache
+from credentialwatch_agent import metrics
+from credentialwatch_agent.tracing import span
+from credentialwatch_agent.cassette import CassettePlayer, CassetteRecorder, cassette_mode
+from credentialwatch_agent.rate_limiter import rate_limits
+from credentialwatch_agent.hedging import Hedger, call_deadline, remaining_time
+from credentialwatch_agent.tool_manifest import build_manifest, load_manifest, manifest_enabled, manifest_tools, save_manifest, tools_etag
+from credentialwatch_agent.transports import HttpPool, connection_candidates, server_transport
+from credentialwatch_agent.server_sessions import ServerSession, ServerUnavailableError, SessionClosedError, describe_error, is_server_failure, mock_fallback_servers, mock_servers
+
+def parse_tool_result(result: Any) -> Any:
+    """
+    Unwraps a tool result into plain Python data.
+    MCP tools return a list of content blocks; a single JSON text payload is decoded.
+    Anything else is returned unchanged.
+    """
+    if isinstance(result, list) and result and all(isinstance(b, dict) and b.get("type") == "text" for b in result):
+        text = "".join(b.get("text", "") for b in result)
+        try:
+            return json.loads(text)
+        except ValueError:
+            return result
+    if isinstance(result, str):
+        try:
+            return json.loads(result)
+        except ValueError:
+            return result
+    return result
 
 class MCPClient:
     """
@@ -17,17 +49,61 @@ class MCPClient:
         
         self._client: Optional[MultiServerMCPClient] = None
         self._tools: Dict[str, Any] = {} # Cache tools
+        self._index = ToolIndex()
+        self._routed_tools: List[Any] = []
+        # Bumped whenever the set of loaded tools changes, so compiled graphs can be rebuilt.
+        self.tools_version = 0
+        self._cache = ResultCache()
+        # Hedged requests for slow idempotent reads, within a budget of extra load.
+        self._hedger = Hedger()
+        # Called as listener(tool_name, seconds, ok) after every call_tool, e.g. by benchmarks.
+        self._call_listeners: List[Callable[[str, float, bool], None]] = []
         self._mock_mode = False
         self._connected = False
+        # MCP_CASSETTE_MODE=record captures server traffic; replay serves it without servers.
+        self.cassette_mode = cassette_mode()
+        self._recorder: Optional[CassetteRecorder] = CassetteRecorder() if self.cassette_mode == "record" else None
+        self._player: Optional[CassettePlayer] = None
         self._connect_lock = asyncio.Lock()
+        # Tools can start from the manifest saved by the last run (MCP_MANIFEST_CACHE) and
+        # are revalidated against the servers in the background.
+        self._manifest_etag: Optional[str] = None
+        self._revalidate_task: Optional[asyncio.Task] = None
+        # One lazily opened session (with health and circuit breaker) per remote server,
+        # and the tools each server serves.
+        self._sessions: Dict[str, ServerSession] = {}
+        self._server_tools: Dict[str, List[Any]] = {}
+        self._load_tasks: Dict[str, asyncio.Task] = {}
+        # Configured transport and URL per server, and the connection pool of the HTTP transports.
+        self._servers: Dict[str, Dict[str, Any]] = {}
+        self._http_pool: Optional[HttpPool] = None
+        # MCP_MOCK_SERVERS are always mocked; MCP_MOCK_FALLBACK servers are mocked while unavailable.
+        self._mock_servers: Set[str] = set()
+        self._fallback_servers: Set[str] = set()
+        # Cold-start timings, from client creation to the first successful tool call.
+        self._created_at = time.perf_counter()
+        self._startup: Dict[str, Any] = {"tools_source": None, "connect_ms": None, "first_call_ms": None, "revalidation": None}
         
         # Configure logger
         self.logger = logging.getLogger("mcp_client")
 
     async def connect(self):
-        """Establishes connections to all MCP servers."""
+        """
+        Prepares connections to the MCP servers. Each server gets its own session, opened
+        on first use; tools come from the cached manifest where possible, otherwise each
+        server's tool list is loaded on its own, waiting at most MCP_CONNECT_WAIT_SECONDS.
+        Servers still missing tools are retried in the background on later calls.
+        """
         async with self._connect_lock:
             if self._connected:
+                self._retry_missing_servers()
+                return
+
+            if self.cassette_mode == "replay":
+                self._player = CassettePlayer()
+                self.use_tools(self._player.tools())
+                self._startup["tools_source"] = "replay"
+                self.logger.info(f"Replaying MCP traffic from {self._player.path} ({len(self._tools)} tools).")
                 return
 
             # Check if running on HF Spaces and using default localhost URLs
@@ -37,127 +113,352 @@ class MCPClient:
             def is_localhost(url):
                 return "localhost" in url or "127.0.0.1" in url
 
-            # Normalize URLs for SSE
-            def normalize_sse_url(url):
-                if url.endswith("/"):
-                    url = url[:-1]
-                if not url.endswith("/sse"):
-                    url += "/sse"
-                return url
-
-            npi_url = normalize_sse_url(self.npi_url)
-            cred_db_url = normalize_sse_url(self.cred_db_url)
-            alert_url = normalize_sse_url(self.alert_url)
-
-            if is_hf and (is_localhost(npi_url) or is_localhost(cred_db_url) or is_localhost(alert_url)):
-                self.logger.info("Detected Hugging Face Spaces environment with localhost URLs.")
-                self.logger.info("Skipping actual MCP connections and defaulting to mock data.")
+            # What each server is configured with (transport and URL); the connections actually
+            # used come from transports.connection_candidates, negotiated on first use.
+            urls = {"npi": self.npi_url, "cred_db": self.cred_db_url, "alert": self.alert_url}
+            servers = {name: {"transport": server_transport(name), "url": url} for name, url in urls.items()}
+
+            all_servers = frozenset(servers)
+            self._mock_servers = set(mock_servers(all_servers))
+            self._fallback_servers = set(mock_fallback_servers(all_servers))
+            if is_hf:
+                localhost = {name for name, server in servers.items() if server["transport"] != "stdio" and is_localhost(server["url"])}
+                if localhost:
+                    self.logger.info(f"Detected Hugging Face Spaces environment with localhost URLs for: {', '.join(sorted(localhost))}.")
+                    self._mock_servers |= localhost
+            if self._mock_servers:
+                self.logger.info(f"Answering {', '.join(sorted(self._mock_servers))} with mock data.")
+            remote = {name: server for name, server in servers.items() if name not in self._mock_servers}
+            if not remote:
                 self._mock_mode = True
                 self._connected = True
+                self._startup["tools_source"] = "mock"
                 return
 
-            self.logger.info("Initializing MultiServerMCPClient...")
-            
-            servers = {
-                "npi": {
-                    "transport": "sse",
-                    "url": npi_url,
-                },
-                "cred_db": {
-                    "transport": "sse",
-                    "url": cred_db_url,
-                },
-                "alert": {
-                    "transport": "sse",
-                    "url": alert_url,
-                }
-            }
-            
             # Add auth headers if needed
-            if os.getenv("HF_TOKEN"):
-                headers = {"Authorization": f"Bearer {os.getenv('HF_TOKEN')}"}
-                for server in servers.values():
-                    server["headers"] = headers
+            headers = {"Authorization": f"Bearer {os.getenv('HF_TOKEN')}"} if os.getenv("HF_TOKEN") else None
+            if any(server["transport"] != "stdio" for server in remote.values()):
+                self._http_pool = HttpPool()
+            candidates = {
+                name: connection_candidates(name, server["url"], server["transport"], headers, self._http_pool and self._http_pool.client_factory)
+                for name, server in remote.items()
+            }
 
-            try:
-                self._client = MultiServerMCPClient(servers)
-                # Pre-fetch tools to verify connection and cache them
-                tools_list = await self._client.get_tools()
-                self._tools = {tool.name: tool for tool in tools_list}
-                self.logger.info(f"Successfully connected. Loaded {len(self._tools)} tools.")
-                self._connected = True
-            except Exception as e:
-                self.logger.error(f"Failed to initialize MCP client: {e}", exc_info=True)
-                # If initialization fails, we might want to fallback to mock mode or just fail
-                # For now, let's allow retry or fail gracefully
-                pass
+            self.logger.info("Initializing MultiServerMCPClient...")
+            started = time.perf_counter()
+            self._servers = remote
+            self._client = MultiServerMCPClient({name: options[0] for name, options in candidates.items()})
+            self._sessions = {name: ServerSession(name, self._client, candidates[name]) for name in remote}
+
+            manifest = load_manifest(remote) if manifest_enabled() else None
+            cached = manifest_tools(manifest, self._client.connections) if manifest else {}
+            if cached:
+                # Serve the cached tool lists now; those servers are contacted on first use.
+                self._server_tools.update(cached)
+                self._set_tools(self._all_server_tools())
+                self._manifest_etag = manifest["etag"]
+                self.logger.info(f"Loaded {len(self._tools)} tools of {', '.join(sorted(cached))} from the cached manifest ({manifest['etag']}).")
+                self._revalidate_task = asyncio.create_task(self._revalidate_manifest(list(cached)))
+
+            missing = [name for name in remote if name not in cached]
+            if missing:
+                loads = [self._start_load(name) for name in missing]
+                await asyncio.wait(loads, timeout=float(os.getenv("MCP_CONNECT_WAIT_SECONDS", "10")))
+                pending = [name for name in missing if name not in self._server_tools]
+                if pending:
+                    self.logger.warning(f"No tools yet from {', '.join(pending)}; continuing without them and retrying in the background.")
+
+            self._connected = True
+            self._record_startup("manifest" if not missing else "servers" if not cached else "manifest+servers", started)
+            self.logger.info(f"MCP client ready with {len(self._tools)} tools.")
+
+    def _all_server_tools(self) -> List[Any]:
+        return [tool for name in sorted(self._server_tools) for tool in self._server_tools[name]]
+
+    def _start_load(self, server_name: str) -> asyncio.Task:
+        """Loads one server's tools in a background task (at most one per server)."""
+        task = self._load_tasks.get(server_name)
+        if task is None or task.done():
+            task = self._load_tasks[server_name] = asyncio.create_task(self._load_server(server_name))
+        return task
+
+    def _retry_missing_servers(self):
+        for name, session in self._sessions.items():
+            if name not in self._server_tools and session.breaker.retry_in() == 0:
+                self._start_load(name)
+
+    async def _load_server(self, server_name: str, reload: bool = False) -> bool:
+        """
+        Loads (or with reload=True, re-lists) one server's tools, merges them into the tool
+        set and saves the manifest. Returns False if the server could not be reached.
+        """
+        session = self._sessions[server_name]
+        try:
+            tools_list = await session.load_tools(reload=reload)
+        except ServerUnavailableError:
+            return False
+        except Exception as e:
+            self.logger.warning(f"Could not load tools from MCP server '{server_name}': {describe_error(e)}")
+            return False
+        previous = self._server_tools.get(server_name)
+        changed = previous is not None and tools_etag(server_name, previous) != tools_etag(server_name, tools_list)
+        self._server_tools[server_name] = tools_list
+        self._set_tools(self._all_server_tools(), changed=changed)
+        manifest = build_manifest(self._servers, self._server_tools)
+        self._manifest_etag = manifest["etag"]
+        if manifest_enabled():
+            save_manifest(manifest)
+        self._startup.setdefault("servers", {})[server_name] = "changed" if changed else "loaded"
+        return True
+
+    async def _revalidate_manifest(self, server_names: List[str]):
+        """Reloads the cached servers' tools and replaces the ones that changed."""
+        started = time.perf_counter()
+        cached_etag = self._manifest_etag
+        results = await asyncio.gather(*(self._load_server(name) for name in server_names))
+        if not all(results):
+            self._startup["revalidation"] = "failed" if not any(results) else "partial"
+        else:
+            self._startup["revalidation"] = "changed" if self._manifest_etag != cached_etag else "unchanged"
+        self._startup["revalidate_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        if self._startup["revalidation"] == "changed":
+            self.logger.info(f"Tool manifest changed ({cached_etag} -> {self._manifest_etag}); loaded {len(self._tools)} tools.")
+
+    def _record_startup(self, source: str, started: float):
+        self._startup["tools_source"] = source
+        self._startup["connect_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+    def use_tools(self, tools_list: List[Any]):
+        """Uses already loaded tools (e.g. from in-process servers) instead of connecting."""
+        self._set_tools(tools_list)
+        self._mock_mode = False
+        self._connected = True
 
     async def close(self):
         """Closes all connections."""
         # MultiServerMCPClient might not have an explicit close, but we can clear it
+        for task in (self._revalidate_task, *self._load_tasks.values()):
+            if task and not task.done():
+                task.cancel()
+        self._revalidate_task = None
+        self._load_tasks = {}
+        await asyncio.gather(*(session.close() for session in self._sessions.values()))
+        self._sessions = {}
+        self._server_tools = {}
         self._client = None
+        if self._http_pool:
+            await self._http_pool.aclose()
+            self._http_pool = None
+        if self._recorder:
+            self._recorder.close()
         self._connected = False
         self.logger.info("MCP connections closed.")
 
-    async def call_tool(self, server_name: str, tool_name: str, arguments: Dict[str, Any]) -> Any:
-        """Calls a tool. server_name is mostly for compatibility/mocking, as tools are flattened."""
+    async def call_tool(self, server_name: str, tool_name: str, arguments: Dict[str, Any], timeout: Optional[float] = None) -> Any:
+        """
+        Calls a tool. server_name scopes short-name resolution and mocking.
+        Read-only tools are served from the result cache; write tools invalidate it.
+        The call fails with TimeoutError after `timeout` seconds or at the deadline of an
+        enclosing hedging.call_deadline block, whichever comes first.
+        """
+        name = canonical_name(tool_name)
+        started = time.perf_counter()
+        ok = False
+        try:
+            with span("mcp.call_tool", server=server_name, tool=name), call_deadline(timeout):
+                remaining = remaining_time()
+                if remaining is None:
+                    result = await self._call_tool_cached(server_name, tool_name, name, arguments)
+                else:
+                    result = await asyncio.wait_for(self._call_tool_cached(server_name, tool_name, name, arguments), max(0.0, remaining))
+            ok = True
+            if self._startup["first_call_ms"] is None:
+                self._startup["first_call_ms"] = round((time.perf_counter() - self._created_at) * 1000, 1)
+                self.logger.info(
+                    f"Cold start: first usable request after {self._startup['first_call_ms']:.0f} ms "
+                    f"(tools from {self._startup['tools_source'] or 'in-process servers'})."
+                )
+            return result
+        finally:
+            elapsed = time.perf_counter() - started
+            for listener in self._call_listeners:
+                listener(name, elapsed, ok)
+
+    async def _call_tool_cached(self, server_name: str, tool_name: str, name: str, arguments: Dict[str, Any]) -> Any:
+        if self._cache.is_cacheable(name):
+            return await self._cache.get_or_call(
+                name, arguments, lambda: self._call_tool_uncached(server_name, tool_name, arguments)
+            )
+        try:
+            return await self._call_tool_uncached(server_name, tool_name, arguments)
+        finally:
+            self._cache.invalidate_for_write(name)
+
+    def invalidate_for_write(self, tool_name: str) -> int:
+        """Drops cached results made stale by a write made through another client (e.g. a sweep worker)."""
+        return self._cache.invalidate_for_write(canonical_name(tool_name))
+
+    def add_call_listener(self, listener: Callable[[str, float, bool], None]):
+        """Registers listener(tool_name, seconds, ok), called after every call_tool."""
+        self._call_listeners.append(listener)
+
+    def remove_call_listener(self, listener: Callable[[str, float, bool], None]):
+        if listener in self._call_listeners:
+            self._call_listeners.remove(listener)
+
+    async def _call_tool_uncached(self, server_name: str, tool_name: str, arguments: Dict[str, Any]) -> Any:
         if not self._connected:
             await self.connect()
             
-        if self._mock_mode:
-             return self._get_mock_response(server_name, tool_name, arguments)
+        if self._mock_mode or server_name in self._mock_servers:
+            return self._mock_response(server_name, tool_name, arguments)
 
-        # In MultiServerMCPClient, tools are flattened. 
-        tool = self._tools.get(tool_name)
-        
-        # Fuzzy match if exact match fails
-        if not tool:
-            # Try to find a tool that contains the tool_name
-            # We prioritize matches that end with the tool_name or tool_name_tool
-            for name, t in self._tools.items():
-                if name == tool_name:
-                    tool = t
-                    break
-                if name.endswith(f"_{tool_name}") or name.endswith(f"_{tool_name}_tool") or name == f"{tool_name}_tool":
-                    tool = t
-                    break
-                # Fallback: check if tool_name is in the name (less safe but helpful)
-                if tool_name in name:
-                    tool = t
-                    # Keep searching for a better match (suffix)
-                    continue
+        # In MultiServerMCPClient, tools are flattened; the index maps short names to them.
+        tool = self._index.resolve(server_name, tool_name)
             
-        if not tool:
-            # Try to refresh tools
-            if self._client:
-                try:
-                    tools_list = await self._client.get_tools()
-                    self._tools = {t.name: t for t in tools_list}
-                    tool = self._tools.get(tool_name)
-                    # Retry fuzzy match after refresh
-                    if not tool:
-                        for name, t in self._tools.items():
-                            if name.endswith(f"_{tool_name}") or name.endswith(f"_{tool_name}_tool") or name == f"{tool_name}_tool":
-                                tool = t
-                                break
-                            if tool_name in name:
-                                tool = t
-                except Exception as e:
-                     self.logger.error(f"Error refreshing tools: {e}")
+        if not tool and server_name in self._sessions and server_name not in self._server_tools:
+            # The server has not been reached yet: load its tools now (fails fast while its breaker is open).
+            if not await self._load_server(server_name):
+                breaker = self._sessions[server_name].breaker
+                error = ServerUnavailableError(server_name, breaker.retry_in(), breaker.last_error)
+                if server_name in self._fallback_servers:
+                    self.logger.warning(f"{error}; using mock data.")
+                    return self._mock_response(server_name, tool_name, arguments)
+                raise error
+            tool = self._index.resolve(server_name, tool_name)
+
+        if not tool and not self._index.is_recent_miss(server_name, tool_name):
+            # Refresh the tool list in case the server gained this tool since it was loaded.
+            if server_name in self._sessions:
+                loaded = await self._load_server(server_name, reload=True)
+                tool = self._index.resolve(server_name, tool_name)
+                metrics.mcp_tool_refreshes.inc(outcome="ok" if loaded else "error")
+            if not tool:
+                self._index.record_miss(server_name, tool_name)
+                metrics.mcp_tool_misses.inc(server=server_name)
         
         if not tool:
-            self.logger.warning(f"Tool '{tool_name}' not found in loaded tools. Using mock if available.")
-            return self._get_mock_response(server_name, tool_name, arguments)
+            raise LookupError(f"Tool '{tool_name}' is not available from MCP server '{server_name}'.")
+
+        labels = {"server": self._index.server_of(tool.name) or server_name, "tool": canonical_name(tool.name)}
+        session = self._sessions.get(labels["server"])
+        started = time.perf_counter()
+        outcome = "error"
+
+        attempts = 0
+
+        async def invoke():
+            # Timed from when the rate limiter lets the (first) request through.
+            nonlocal started, attempts
+            target = tool
+            generation = None
+            if session is not None:
+                # The server's own session: opened on first use, fails fast while its breaker is open.
+                target = await session.tool(tool.name)
+                generation = session.generation
+            sent = time.perf_counter()
+            if not attempts:
+                started = sent
+            attempts += 1
+            try:
+                result = await target.ainvoke(arguments)
+            except Exception as e:
+                if session is not None:
+                    session.record_failure(e, generation)
+                raise
+            if session is not None:
+                session.record_success()
+            self._hedger.record(labels["server"], labels["tool"], time.perf_counter() - sent)
+            return result
+
+        async def limited():
+            return await rate_limits.call(labels["server"], invoke)
 
         try:
             self.logger.info(f"Calling tool '{tool_name}' with args: {arguments}")
-            # LangChain tools are callable or have .invoke
-            result = await tool.ainvoke(arguments)
+            # LangChain tools are callable or have .invoke; replayed cassettes are not rate limited.
+            if self._player:
+                result = await invoke()
+            elif self._hedger.can_hedge(labels["tool"]):
+                # Idempotent reads only; a hedge is a second rate-limited request.
+                result = await self._hedger.run(labels["server"], labels["tool"], limited)
+            else:
+                result = await limited()
+            outcome = "ok"
             self.logger.info(f"Tool '{tool_name}' returned successfully.")
+            if self._recorder:
+                self._recorder.record_call(labels["server"], tool.name, arguments, started, time.perf_counter() - started, result=result)
             return result
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        except SessionClosedError as e:
+            # Aborted by another call's failure resetting the session; not a second failure.
+            outcome = "cancelled"
+            self.logger.warning(f"Tool '{tool_name}': {e}")
+            raise
+        except ServerUnavailableError as e:
+            outcome = "unavailable"
+            if labels["server"] in self._fallback_servers:
+                self.logger.warning(f"{e}; using mock data.")
+                return self._mock_response(labels["server"], tool_name, arguments)
+            raise
         except Exception as e:
-            self.logger.error(f"Error calling tool '{tool_name}': {e}", exc_info=True)
+            self.logger.error(f"Error calling tool '{tool_name}': {e}", exc_info=is_server_failure(e))
+            if self._recorder:
+                self._recorder.record_call(labels["server"], tool.name, arguments, started, time.perf_counter() - started, error=e)
             raise
+        finally:
+            metrics.mcp_request_seconds.observe(time.perf_counter() - started, **labels)
+            metrics.mcp_requests.inc(outcome=outcome, **labels)
+
+    def _mock_response(self, server_name: str, tool_name: str, arguments: Dict[str, Any]) -> Any:
+        metrics.mcp_mock_responses.inc(server=server_name, tool=canonical_name(tool_name))
+        return self._get_mock_response(server_name, canonical_name(tool_name), arguments)
+
+    def _set_tools(self, tools_list: List[Any], changed: bool = False):
+        """
+        Replaces the loaded tools and rebuilds the name resolution index.
+        changed=True bumps tools_version even if the names are the same (e.g. new schemas).
+        """
+        if changed or sorted(t.name for t in tools_list) != sorted(self._tools):
+            self.tools_version += 1
+        self._tools = {t.name: t for t in tools_list}
+        self._index.build(tools_list)
+        self._routed_tools = [self._route_tool(t) for t in tools_list]
+        if self._recorder:
+            self._recorder.record_tools(tools_list)
+
+    def _route_tool(self, tool: Any) -> StructuredTool:
+        """Wraps a loaded tool so agent calls go through call_tool (and its cache)."""
+        server_name = self._index.server_of(tool.name)
+
+        async def _call(**arguments: Any) -> Any:
+            return await self.call_tool(server_name, tool.name, arguments)
+
+        return StructuredTool(
+            name=tool.name,
+            description=tool.description,
+            args_schema=tool.args_schema,
+            coroutine=_call,
+            metadata=tool.metadata,
+        )
+
+    def has_tool(self, server_name: str, tool_name: str) -> bool:
+        """Returns True if a tool is loaded for this name. Always False for mocked servers."""
+        if self._mock_mode or server_name in self._mock_servers:
+            return False
+        return self._index.resolve(server_name, tool_name) is not None
+
+    def get_tool_schema(self, server_name: str, tool_name: str) -> Optional[Dict[str, Any]]:
+        """Returns the JSON schema of a tool's arguments, or None if unknown (or mocked)."""
+        if self._mock_mode or server_name in self._mock_servers:
+            return None
+        tool = self._index.resolve(server_name, tool_name)
+        schema = getattr(tool, "args_schema", None) if tool else None
+        if schema is None or isinstance(schema, dict):
+            return schema
+        return schema.model_json_schema()
 
     def _get_mock_response(self, server_name: str, tool_name: str, arguments: Dict[str, Any]) -> Any:
         """Returns mock data when MCP server is unavailable."""
@@ -182,8 +483,63 @@ class MCPClient:
         return {"error": "Mock data not found for this tool"}
 
     def get_tools(self) -> List[Any]:
-        """Returns the list of available tools."""
-        return list(self._tools.values())
+        """Returns the list of available tools, routed through call_tool."""
+        return list(self._routed_tools)
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Returns hit/miss counters for the tool result cache."""
+        return self._cache.stats()
+
+    def tool_stats(self) -> Dict[str, Any]:
+        """Returns the number of loaded tools and the tool-set version."""
+        return {"loaded": len(self._index), "version": self.tools_version, "mock_mode": self._mock_mode}
+
+    def startup_stats(self) -> Dict[str, Any]:
+        """
+        Where the tools came from (manifest, servers, replay, mock), how long connecting took,
+        and the time from client creation to the first successful tool call.
+        """
+        return {**self._startup, "manifest_etag": self._manifest_etag}
+
+    def server_stats(self) -> Dict[str, Any]:
+        """Per-server session, health and circuit breaker state; mocked servers are listed as such."""
+        stats: Dict[str, Any] = {name: {"mocked": True} for name in sorted(self._mock_servers)}
+        for name, session in sorted(self._sessions.items()):
+            stats[name] = {"tools": len(self._server_tools.get(name, ())), "mock_fallback": name in self._fallback_servers, **session.stats()}
+        return stats
+
+    def hedge_stats(self) -> Dict[str, Any]:
+        """Hedged read requests: how many were sent, won and lost, and the current hedge delays."""
+        return self._hedger.stats()
+
+    def http_pool_stats(self) -> Optional[Dict[str, Any]]:
+        """The shared HTTP connection pool of the sse and streamable_http transports, if any."""
+        return self._http_pool.stats() if self._http_pool else None
+
+    def cassette_stats(self) -> Optional[Dict[str, Any]]:
+        """Returns record/replay counters, or None when no cassette is in use."""
+        if self._player:
+            return {"mode": "replay", **self._player.stats()}
+        if self._recorder:
+            return {"mode": "record", "path": self._recorder.path, "records": self._recorder.records}
+        return None
 
 # Global instance
 mcp_client = MCPClient()
+
+def _server_gauges():
+    up = metrics.Gauge("credentialwatch_mcp_server_up", "1 if the server's session is open and its circuit breaker closed.", ("server",))
+    breaker = metrics.Gauge("credentialwatch_mcp_breaker_open", "1 while the server's circuit breaker is open or half-open.", ("server",))
+    for name, session in mcp_client._sessions.items():
+        up.set(1 if session.is_open and session.breaker.state == "closed" else 0, server=name)
+        breaker.set(0 if session.breaker.state == "closed" else 1, server=name)
+    return [up, breaker]
+
+metrics.registry.add_collector(lambda: [
+    *metrics.stats_gauges("credentialwatch_mcp_cache", "Tool result cache", mcp_client.cache_stats()),
+    *metrics.stats_gauges("credentialwatch_mcp_tools", "Loaded MCP tools", mcp_client.tool_stats()),
+    *metrics.stats_gauges("credentialwatch_mcp_startup", "MCP client cold start", mcp_client.startup_stats()),
+    *metrics.stats_gauges("credentialwatch_mcp_http_pool", "Shared MCP HTTP connection pool", mcp_client.http_pool_stats() or {}),
+    *metrics.stats_gauges("credentialwatch_mcp_hedging", "Hedged MCP read requests", mcp_client.hedge_stats()),
+    *_server_gauges(),
+])
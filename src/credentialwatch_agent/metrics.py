@@ -0,0 +1,246 @@
+import abc
+import math
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, from cache hits to slow Space cold starts.
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelValues = Tuple[str, ...]
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class _Metric(abc.ABC):
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {tuple(labels)}.")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    @abc.abstractmethod
+    def samples(self) -> Iterable[Tuple[str, str, float]]:
+        """Yields (sample name, rendered labels, value) for every series."""
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(f"{name}{labels} {_format_value(value)}" for name, labels, value in self.samples())
+        return lines
+
+class Counter(_Metric):
+    """Monotonic count, e.g. calls or errors."""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        super().__init__(name, documentation, label_names)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self):
+        for key, value in sorted(self._values.items()):
+            yield f"{self.name}_total", _format_labels(self.label_names, key), value
+
+class Gauge(_Metric):
+    """Value that goes up and down, e.g. the size of the last sweep."""
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        super().__init__(name, documentation, label_names)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels: Any):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self):
+        for key, value in sorted(self._values.items()):
+            yield self.name, _format_labels(self.label_names, key), value
+
+class Histogram(_Metric):
+    """Distribution of observed values (seconds) in cumulative buckets."""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [bucket counts..., sum, count]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels: Any):
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def count(self, **labels: Any) -> float:
+        series = self._values.get(self._key(labels))
+        return series[-1] if series else 0.0
+
+    def samples(self):
+        for key, series in sorted(self._values.items()):
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                yield f"{self.name}_bucket", _format_labels(self.label_names, key, ("le", _format_value(bound))), cumulative
+            yield f"{self.name}_bucket", _format_labels(self.label_names, key, ("le", "+Inf")), series[-1]
+            yield f"{self.name}_sum", _format_labels(self.label_names, key), series[-2]
+            yield f"{self.name}_count", _format_labels(self.label_names, key), series[-1]
+
+class MetricsRegistry:
+    """
+    Process-wide metrics rendered in the Prometheus text exposition format.
+    Collectors are called at scrape time for values kept elsewhere (e.g. cache stats).
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Iterable[_Metric]]] = []
+
+    def _register(self, metric: _Metric) -> Any:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, label_names))
+
+    def gauge(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, label_names))
+
+    def histogram(self, name: str, documentation: str, label_names: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, label_names, buckets))
+
+    def add_collector(self, collector: Callable[[], Iterable[_Metric]]):
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            for metric in collector():
+                lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+# Global registry
+registry = MetricsRegistry()
+
+# --- MCP client ---
+mcp_request_seconds = registry.histogram(
+    "credentialwatch_mcp_request_seconds", "Latency of MCP tool requests sent to a server.", ("server", "tool")
+)
+mcp_requests = registry.counter(
+    "credentialwatch_mcp_requests", "MCP tool requests by outcome (ok, error, cancelled).", ("server", "tool", "outcome")
+)
+mcp_mock_responses = registry.counter(
+    "credentialwatch_mcp_mock_responses", "Calls answered with mock data instead of a server.", ("server", "tool")
+)
+mcp_tool_refreshes = registry.counter(
+    "credentialwatch_mcp_tool_refreshes", "Tool list refreshes triggered by unresolved tool names.", ("outcome",)
+)
+mcp_tool_misses = registry.counter(
+    "credentialwatch_mcp_tool_misses", "Tool names that could not be resolved to a loaded tool.", ("server",)
+)
+mcp_server_connects = registry.counter(
+    "credentialwatch_mcp_server_connects", "Session opens per MCP server by outcome (ok, error).", ("server", "outcome")
+)
+mcp_breaker_opens = registry.counter(
+    "credentialwatch_mcp_breaker_opens", "Times a server's circuit breaker opened after repeated failures.", ("server",)
+)
+mcp_hedges = registry.counter(
+    "credentialwatch_mcp_hedges", "Slow read calls considered for a hedged request, by outcome (won, lost, skipped_budget, skipped_deadline).", ("server", "tool", "outcome")
+)
+
+# --- Chat agent ---
+agent_tool_seconds = registry.histogram(
+    "credentialwatch_agent_tool_seconds", "Latency of tool calls made by the chat agent.", ("tool",)
+)
+agent_tool_calls = registry.counter(
+    "credentialwatch_agent_tool_calls", "Chat agent tool calls by status (success, timeout, error).", ("tool", "status")
+)
+chat_turn_seconds = registry.histogram(
+    "credentialwatch_chat_turn_seconds", "End-to-end latency of a chat turn.", ("mode",)
+)
+intent_router_turns = registry.counter(
+    "credentialwatch_intent_router_turns", "Chat turns seen by the intent router by outcome (routed, fallback, not_confident, error).", ("intent", "outcome")
+)
+intent_router_saved_seconds = registry.counter(
+    "credentialwatch_intent_router_saved_seconds", "Estimated agent latency avoided by answering turns directly."
+)
+
+# --- Rate limits ---
+rate_limit_wait_seconds = registry.histogram(
+    "credentialwatch_rate_limit_wait_seconds", "Time spent waiting for a rate limit token.", ("limiter", "priority")
+)
+rate_limit_throttled = registry.counter(
+    "credentialwatch_rate_limit_throttled", "429/503 responses that paused a rate limiter.", ("limiter",)
+)
+
+# --- Graphs ---
+graph_node_seconds = registry.histogram(
+    "credentialwatch_graph_node_seconds", "Time spent in each graph node.", ("graph", "node")
+)
+
+# --- Sweeps ---
+sweep_runs = registry.counter("credentialwatch_sweep_runs", "Expiry sweeps by outcome (completed, failed).", ("outcome",))
+sweep_last_items = registry.gauge("credentialwatch_sweep_last_items", "Expiring items scanned by the last completed sweep.")
+sweep_last_alerts = registry.gauge("credentialwatch_sweep_last_alerts_created", "Alerts created by the last completed sweep.")
+sweep_last_skipped = registry.gauge("credentialwatch_sweep_last_alerts_skipped", "Already-alerted items skipped by the last completed sweep.")
+sweep_last_errors = registry.gauge("credentialwatch_sweep_last_errors", "Errors reported by the last completed sweep.")
+sweep_last_duration = registry.gauge("credentialwatch_sweep_last_duration_seconds", "Wall-clock duration of the last completed sweep.")
+sweep_last_completed = registry.gauge("credentialwatch_sweep_last_completed_timestamp_seconds", "Unix time the last sweep completed.")
+
+def stats_gauges(prefix: str, documentation: str, stats: Dict[str, Any]) -> List[Gauge]:
+    """Turns the numeric fields of a stats dict (e.g. cache_stats()) into gauges for a collector."""
+    gauges = []
+    for key, value in stats.items():
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            continue
+        gauge = Gauge(f"{prefix}_{key}", f"{documentation} ({key}).")
+        gauge.set(value)
+        gauges.append(gauge)
+    return gauges
+
+def render_metrics() -> str:
+    return registry.render()
@@ -0,0 +1,254 @@
+import os
+import time
+import asyncio
+import logging
+import contextvars
+import email.utils
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterator, Optional, Tuple, TypeVar
+from credentialwatch_agent import metrics
+
+logger = logging.getLogger("rate_limiter")
+
+T = TypeVar("T")
+
+# Served strictly in this order: a waiting interactive request always goes before batch work.
+PRIORITIES = ("interactive", "batch")
+
+# Default request rates (per second) and bursts per limiter; override with
+# RATE_LIMIT_<NAME>_RPS / RATE_LIMIT_<NAME>_BURST, e.g. RATE_LIMIT_ALERT_RPS=5.
+DEFAULT_LIMITS: Dict[str, Tuple[float, float]] = {
+    "npi": (50.0, 100.0),
+    "cred_db": (50.0, 100.0),
+    "alert": (50.0, 100.0),
+    "llm": (5.0, 10.0),
+}
+
+_priority: contextvars.ContextVar[str] = contextvars.ContextVar("rate_limit_priority", default="interactive")
+_session: contextvars.ContextVar[str] = contextvars.ContextVar("rate_limit_session", default="default")
+
+@contextmanager
+def request_context(priority: str, session: Optional[str] = None) -> Iterator[None]:
+    """
+    Sets the priority class ("interactive" or "batch") and fairness key (e.g. the chat
+    thread id) for rate-limited calls made in this block, including tasks it starts.
+    """
+    if priority not in PRIORITIES:
+        raise ValueError(f"Unknown priority '{priority}' (expected one of {', '.join(PRIORITIES)}).")
+    priority_token = _priority.set(priority)
+    session_token = _session.set(session or _session.get())
+    try:
+        yield
+    finally:
+        _session.reset(session_token)
+        _priority.reset(priority_token)
+
+def current_priority() -> str:
+    return _priority.get()
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """
+    Returns how long to back off if error (or an exception it wraps) is a 429/503 response,
+    from its Retry-After header (seconds or HTTP date), else None.
+    """
+    seen = set()
+    stack = [error]
+    while stack:
+        exc = stack.pop()
+        if exc is None or id(exc) in seen:
+            continue
+        seen.add(id(exc))
+        response = getattr(exc, "response", None)
+        status = getattr(response, "status_code", None) or getattr(exc, "status_code", None)
+        if status in (429, 503):
+            header = getattr(response, "headers", {}).get("retry-after") if response is not None else None
+            default = float(os.getenv("RATE_LIMIT_DEFAULT_RETRY_AFTER", "1"))
+            if not header:
+                return default
+            try:
+                return max(0.0, float(header))
+            except ValueError:
+                parsed = email.utils.parsedate_to_datetime(header)
+                return max(0.0, parsed.timestamp() - time.time()) if parsed else default
+        stack.extend(getattr(exc, "exceptions", ()))
+        stack.extend((exc.__cause__, exc.__context__))
+    return None
+
+class RateLimiter:
+    """
+    Token bucket shared by everyone calling one upstream (an MCP server or the LLM).
+
+    Requests that find no token wait in per-priority queues. Within a priority, waiting
+    sessions are served round-robin, so one chat user (or one sweep) cannot hold the
+    queue. penalize() pauses the bucket after a 429 until the server's Retry-After.
+    """
+
+    def __init__(self, name: str, rate: float, burst: float):
+        self.name = name
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        # priority -> session -> waiting futures (sessions in round-robin order)
+        self._queues: Dict[str, "OrderedDict[str, Deque[asyncio.Future]]"] = {p: OrderedDict() for p in PRIORITIES}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.granted = 0
+        self.throttled = 0
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def queue_depth(self, priority: Optional[str] = None) -> int:
+        priorities = (priority,) if priority else PRIORITIES
+        return sum(len(waiters) for p in priorities for waiters in self._queues[p].values())
+
+    def _next_waiter(self) -> Optional[asyncio.Future]:
+        for priority in PRIORITIES:
+            sessions = self._queues[priority]
+            while sessions:
+                session, waiters = next(iter(sessions.items()))
+                future = waiters.popleft()
+                if waiters:
+                    sessions.move_to_end(session)
+                else:
+                    del sessions[session]
+                if not future.done():
+                    return future
+        return None
+
+    def _dispatch(self):
+        self._timer = None
+        now = time.monotonic()
+        self._refill(now)
+        while now >= self._paused_until and self._tokens >= 1 and self.queue_depth():
+            future = self._next_waiter()
+            if future is None:
+                break
+            self._tokens -= 1
+            future.set_result(None)
+        if self.queue_depth() and self._timer is None:
+            delay = max(self._paused_until - now, (1 - self._tokens) / self.rate, 0.0)
+            self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+
+    async def acquire(self, priority: Optional[str] = None, session: Optional[str] = None):
+        """Waits for a token, behind higher-priority and earlier same-session requests."""
+        priority = priority or _priority.get()
+        session = session or _session.get()
+        started = time.perf_counter()
+        now = time.monotonic()
+        self._refill(now)
+        if self.rate <= 0:
+            pass  # Unlimited
+        elif not self.queue_depth() and now >= self._paused_until and self._tokens >= 1:
+            self._tokens -= 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            waiters = self._queues[priority].setdefault(session, deque())
+            waiters.append(future)
+            if self._timer is None:
+                self._dispatch()
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    # Granted just before cancellation: hand the token back.
+                    self._tokens = min(self.burst, self._tokens + 1)
+                    if self._timer is None and self.queue_depth():
+                        self._dispatch()
+                elif future in waiters:
+                    waiters.remove(future)
+                    if not waiters and self._queues[priority].get(session) is waiters:
+                        del self._queues[priority][session]
+                raise
+        self.granted += 1
+        metrics.rate_limit_wait_seconds.observe(time.perf_counter() - started, limiter=self.name, priority=priority)
+
+    def penalize(self, seconds: float):
+        """Stops granting tokens for `seconds` (e.g. from a Retry-After header)."""
+        self.throttled += 1
+        metrics.rate_limit_throttled.inc(limiter=self.name)
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = min(self._tokens, 0.0)
+        logger.warning(f"Upstream '{self.name}' is rate limiting; pausing requests for {seconds:.1f}s.")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "granted": self.granted,
+            "throttled": self.throttled,
+            "paused_seconds": round(max(0.0, self._paused_until - time.monotonic()), 3),
+            **{f"queued_{priority}": self.queue_depth(priority) for priority in PRIORITIES},
+        }
+
+class RateLimits:
+    """
+    Registry of per-upstream limiters, configured from the environment. A process that
+    gets only part of the budget (one of several sweep workers) sets `share`.
+    """
+
+    def __init__(self, enabled: Optional[bool] = None, max_retries: Optional[int] = None, share: float = 1.0):
+        if enabled is None:
+            enabled = os.getenv("RATE_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+        if max_retries is None:
+            max_retries = int(os.getenv("RATE_LIMIT_MAX_RETRIES", "2"))
+        self.enabled = enabled
+        self.max_retries = max_retries
+        self.share = share
+        self._limiters: Dict[str, RateLimiter] = {}
+
+    def set_share(self, share: float):
+        """Scales every limit to `share` of its configured rate and burst; existing limiters are rebuilt."""
+        self.share = share
+        self._limiters = {}
+
+    def get(self, name: str) -> RateLimiter:
+        limiter = self._limiters.get(name)
+        if limiter is None:
+            rate, burst = DEFAULT_LIMITS.get(name, DEFAULT_LIMITS["npi"])
+            key = name.upper()
+            rate = float(os.getenv(f"RATE_LIMIT_{key}_RPS", rate))
+            burst = float(os.getenv(f"RATE_LIMIT_{key}_BURST", burst))
+            limiter = self._limiters[name] = RateLimiter(name, rate * self.share, burst * self.share)
+        return limiter
+
+    async def call(self, name: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Runs fn() once a token is available. If it fails with 429/503, the limiter pauses
+        for the Retry-After and the call is retried, up to max_retries times.
+        """
+        if not self.enabled:
+            return await fn()
+        limiter = self.get(name)
+        attempt = 0
+        while True:
+            await limiter.acquire()
+            try:
+                return await fn()
+            except Exception as e:
+                delay = retry_after_seconds(e)
+                if delay is None or attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                limiter.penalize(delay)
+
+    def limiters(self) -> Dict[str, RateLimiter]:
+        return dict(self._limiters)
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: limiter.stats() for name, limiter in sorted(self._limiters.items())}
+
+# Global instance, shared by chat turns and sweeps in this process
+rate_limits = RateLimits()
+
+def _collect():
+    depth = metrics.Gauge("credentialwatch_rate_limit_queue_depth", "Requests waiting for a rate limit token.", ("limiter", "priority"))
+    for name, limiter in rate_limits.limiters().items():
+        for priority in PRIORITIES:
+            depth.set(limiter.queue_depth(priority), limiter=name, priority=priority)
+    return [depth]
+
+metrics.registry.add_collector(_collect)
@@ -0,0 +1,184 @@
+import os
+import copy
+import json
+import sys
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+# Default time-to-live (seconds) for read-only tools. Tools not listed are never cached.
+# Override per tool with MCP_CACHE_TTL_<TOOL_NAME>, e.g. MCP_CACHE_TTL_SEARCH_PROVIDERS=60.
+DEFAULT_TTLS = {
+    "get_provider_by_npi": 3600.0,
+    "search_providers": 600.0,
+    "get_provider_snapshot": 120.0,
+    "get_open_alerts": 30.0,
+}
+
+# Read tools whose cached results a write tool makes stale.
+INVALIDATES = {
+    "log_alert": ("get_open_alerts",),
+    "log_alerts": ("get_open_alerts",),
+    "mark_alert_resolved": ("get_open_alerts",),
+    "add_or_update_credential": ("get_provider_snapshot", "list_expiring_credentials"),
+    "sync_provider_from_npi": ("get_provider_snapshot", "list_expiring_credentials"),
+}
+
+CacheKey = Tuple[str, str]
+
+def make_key(tool_name: str, arguments: Dict[str, Any]) -> CacheKey:
+    return tool_name, json.dumps(arguments, sort_keys=True, default=str)
+
+def estimate_size(value: Any) -> int:
+    """Approximate size of a tool result in bytes."""
+    try:
+        return len(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return sys.getsizeof(value)
+
+def _consume_exception(task: asyncio.Future):
+    # Marks a failed shared call's exception as retrieved even if every caller gave up on it.
+    if not task.cancelled():
+        task.exception()
+
+class _Entry:
+    __slots__ = ("value", "size", "expires_at")
+
+    def __init__(self, value: Any, size: int, expires_at: float):
+        self.value = value
+        self.size = size
+        self.expires_at = expires_at
+
+class ResultCache:
+    """
+    TTL + LRU cache for read-only MCP tool results.
+    Concurrent identical calls are coalesced into one in-flight request.
+    """
+
+    def __init__(
+        self,
+        ttls: Optional[Dict[str, float]] = None,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        enabled: Optional[bool] = None,
+    ):
+        if ttls is None:
+            ttls = {
+                name: float(os.getenv(f"MCP_CACHE_TTL_{name.upper()}", ttl))
+                for name, ttl in DEFAULT_TTLS.items()
+            }
+        if max_entries is None:
+            max_entries = int(os.getenv("MCP_CACHE_MAX_ENTRIES", "1024"))
+        if max_bytes is None:
+            max_bytes = int(os.getenv("MCP_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+        if enabled is None:
+            enabled = os.getenv("MCP_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+
+        self.ttls = ttls
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+
+        self._entries: "OrderedDict[CacheKey, _Entry]" = OrderedDict()
+        self._inflight: Dict[CacheKey, asyncio.Future] = {}
+        # Bumped on invalidation so results fetched before a write are not stored after it.
+        self._generations: Dict[str, int] = {}
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def is_cacheable(self, tool_name: str) -> bool:
+        return self.enabled and self.ttls.get(tool_name, 0) > 0
+
+    async def get_or_call(self, tool_name: str, arguments: Dict[str, Any], call: Callable[[], Awaitable[Any]]) -> Any:
+        """Returns a cached result, joins an identical in-flight call, or runs `call` and caches its result."""
+        key = make_key(tool_name, arguments)
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry.expires_at > time.monotonic():
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return copy.deepcopy(entry.value)
+            self._remove(key)
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            # The shared call runs as its own task, so a caller that is cancelled
+            # (e.g. by a deadline) does not cancel it for the others.
+            pending = asyncio.ensure_future(self._fetch(key, tool_name, call))
+            pending.add_done_callback(_consume_exception)
+            self._inflight[key] = pending
+        return copy.deepcopy(await asyncio.shield(pending))
+
+    async def _fetch(self, key: CacheKey, tool_name: str, call: Callable[[], Awaitable[Any]]) -> Any:
+        generation = self._generations.get(tool_name, 0)
+        try:
+            value = await call()
+        finally:
+            # An invalidation may have replaced this call with a newer one for the same key.
+            if self._inflight.get(key) is asyncio.current_task():
+                del self._inflight[key]
+        if self._generations.get(tool_name, 0) == generation:
+            self._store(key, value)
+        return value
+
+    def invalidate_for_write(self, tool_name: str) -> int:
+        """Drops cached results made stale by a write tool. Returns the number of entries removed."""
+        stale_tools = INVALIDATES.get(tool_name, ())
+        if not stale_tools:
+            return 0
+        for name in stale_tools:
+            self._generations[name] = self._generations.get(name, 0) + 1
+        # Calls already in flight may have been answered before the write: later reads start their own.
+        for key in [key for key in self._inflight if key[0] in stale_tools]:
+            del self._inflight[key]
+        stale_keys = [key for key in self._entries if key[0] in stale_tools]
+        for key in stale_keys:
+            self._remove(key)
+        self.invalidations += len(stale_keys)
+        return len(stale_keys)
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+        }
+
+    def _store(self, key: CacheKey, value: Any):
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = _Entry(value, size, time.monotonic() + self.ttls[key[0]])
+        self._bytes += size
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: CacheKey):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
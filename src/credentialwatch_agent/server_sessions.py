@@ -0,0 +1,316 @@
+import os
+import time
+import random
+import asyncio
+import logging
+from typing import Any, Dict, FrozenSet, List, Optional
+import anyio
+import httpx
+from pydantic import ValidationError
+from mcp.shared.exceptions import McpError
+from mcp.types import CONNECTION_CLOSED
+from langchain_core.tools import ToolException
+from langchain_mcp_adapters.client import MultiServerMCPClient
+from langchain_mcp_adapters.tools import load_mcp_tools
+from credentialwatch_agent import metrics
+
+logger = logging.getLogger("server_sessions")
+
+# Circuit breaker: after MCP_BREAKER_FAILURES consecutive failures a server is skipped
+# (calls fail fast) for a backoff that doubles on every failed probe, from
+# MCP_BREAKER_BACKOFF_SECONDS up to MCP_BREAKER_MAX_BACKOFF_SECONDS.
+MCP_BREAKER_FAILURES = int(os.getenv("MCP_BREAKER_FAILURES", "3"))
+MCP_BREAKER_BACKOFF_SECONDS = float(os.getenv("MCP_BREAKER_BACKOFF_SECONDS", "1"))
+MCP_BREAKER_MAX_BACKOFF_SECONDS = float(os.getenv("MCP_BREAKER_MAX_BACKOFF_SECONDS", "60"))
+MCP_CONNECT_TIMEOUT_SECONDS = float(os.getenv("MCP_CONNECT_TIMEOUT_SECONDS", "30"))
+
+def _server_set(variable: str, all_servers: FrozenSet[str]) -> FrozenSet[str]:
+    value = os.getenv(variable, "").strip().lower()
+    if value == "all":
+        return all_servers
+    return frozenset(name.strip() for name in value.split(",") if name.strip())
+
+def mock_servers(all_servers: FrozenSet[str]) -> FrozenSet[str]:
+    """Servers always answered with mock data, from MCP_MOCK_SERVERS (comma-separated or "all")."""
+    return _server_set("MCP_MOCK_SERVERS", all_servers)
+
+def mock_fallback_servers(all_servers: FrozenSet[str]) -> FrozenSet[str]:
+    """Servers whose calls fall back to mock data while the server is unavailable, from MCP_MOCK_FALLBACK."""
+    return _server_set("MCP_MOCK_FALLBACK", all_servers)
+
+class ServerUnavailableError(ConnectionError):
+    """Raised without contacting a server while its circuit breaker is open."""
+
+    def __init__(self, server_name: str, retry_in: float, last_error: Optional[str] = None):
+        self.server_name = server_name
+        self.retry_in = retry_in
+        detail = f": {last_error}" if last_error else ""
+        super().__init__(f"MCP server '{server_name}' is unavailable (retrying in {retry_in:.1f}s){detail}")
+
+class SessionClosedError(ConnectionError):
+    """A call aborted because its session was closed after another call on it failed."""
+
+    def __init__(self, server_name: str, error: BaseException):
+        self.server_name = server_name
+        super().__init__(f"Call to MCP server '{server_name}' aborted when its session was reset ({describe_error(error)})")
+
+# Error codes the MCP transports use when the connection itself is gone.
+_CLOSED_CODES = frozenset({CONNECTION_CLOSED, 32600})
+
+def is_server_failure(error: BaseException) -> bool:
+    """False for errors about the call itself (bad arguments, tool errors), which say nothing about server health."""
+    return not isinstance(error, (ToolException, ValidationError))
+
+def is_connection_failure(error: BaseException) -> bool:
+    """
+    True if the error means the session's connection is unusable (closed stream, network
+    or transport error), as opposed to a failed or slow call on a working connection.
+    """
+    if isinstance(error, BaseExceptionGroup):
+        return any(is_connection_failure(e) for e in error.exceptions)
+    if isinstance(error, McpError):
+        return error.error.code in _CLOSED_CODES
+    if isinstance(error, TimeoutError):
+        return False
+    return isinstance(error, (
+        OSError, EOFError, httpx.TransportError,
+        anyio.ClosedResourceError, anyio.BrokenResourceError, anyio.EndOfStream,
+    ))
+
+def describe_error(error: BaseException) -> str:
+    """"Type: message" of the first underlying error; transports wrap them in exception groups."""
+    while isinstance(error, BaseExceptionGroup) and error.exceptions:
+        error = error.exceptions[0]
+    return f"{type(error).__name__}: {error}"
+
+class CircuitBreaker:
+    """
+    Health of one server: closed (healthy), open (calls fail fast until the backoff ends),
+    or half-open (one probe call is let through; its outcome closes or reopens the breaker).
+    """
+
+    def __init__(self, name: str, failures: Optional[int] = None, backoff: Optional[float] = None, max_backoff: Optional[float] = None):
+        self.name = name
+        self.failure_threshold = max(1, failures if failures is not None else MCP_BREAKER_FAILURES)
+        self.backoff = backoff if backoff is not None else MCP_BREAKER_BACKOFF_SECONDS
+        self.max_backoff = max_backoff if max_backoff is not None else MCP_BREAKER_MAX_BACKOFF_SECONDS
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self._opens = 0
+        self._open_until = 0.0
+        self._probing = False
+        self.last_error: Optional[str] = None
+        self.failures = 0
+        self.successes = 0
+        self.rejected = 0
+
+    def retry_in(self) -> float:
+        return max(0.0, self._open_until - time.monotonic()) if self.state == "open" else 0.0
+
+    def allow(self) -> bool:
+        """True if a call may go to the server now; while half-open, only to the first caller."""
+        if self.state == "closed":
+            return True
+        if self.state == "open" and time.monotonic() >= self._open_until:
+            self.state = "half_open"
+            self._probing = False
+        if self.state == "half_open" and not self._probing:
+            self._probing = True
+            return True
+        self.rejected += 1
+        return False
+
+    def check(self):
+        """Raises ServerUnavailableError unless allow()."""
+        if not self.allow():
+            raise ServerUnavailableError(self.name, self.retry_in() or self.backoff, self.last_error)
+
+    def record_success(self):
+        if self.state != "closed":
+            logger.info(f"MCP server '{self.name}' is healthy again.")
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self._opens = 0
+        self._probing = False
+        self.successes += 1
+
+    def record_failure(self, error: BaseException):
+        self.failures += 1
+        self.consecutive_failures += 1
+        self.last_error = describe_error(error)
+        self._probing = False
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            delay = min(self.max_backoff, self.backoff * (2 ** self._opens))
+            delay *= random.uniform(0.8, 1.2)
+            self._opens += 1
+            self._open_until = time.monotonic() + delay
+            if self.state != "open":
+                metrics.mcp_breaker_opens.inc(server=self.name)
+            self.state = "open"
+            logger.warning(f"MCP server '{self.name}' failing ({self.last_error}); skipping it for {delay:.1f}s.")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "retry_in_seconds": round(self.retry_in(), 1),
+            "failures": self.failures,
+            "successes": self.successes,
+            "rejected": self.rejected,
+            "last_error": self.last_error,
+        }
+
+class ServerSession:
+    """
+    A persistent MCP session to one server, opened on first use and reopened after it fails.
+
+    The transport's task groups must be entered and exited by the same task, so a
+    background task owns the session for its lifetime; calls from any task use it.
+    Each server has its own session, lock and breaker, so a slow or failing server
+    never delays calls to the others. With several candidate connections (transports),
+    the first that connects is used from then on.
+    """
+
+    def __init__(self, name: str, client: MultiServerMCPClient, candidates: Optional[List[Dict[str, Any]]] = None, breaker: Optional[CircuitBreaker] = None):
+        self.name = name
+        self._client = client
+        # Connections to try in order until one works (transport negotiation); the one that
+        # connects is kept for reconnects.
+        self._candidates = candidates or [client.connections[name]]
+        self.transport: Optional[str] = None
+        self.breaker = breaker or CircuitBreaker(name)
+        self._session: Any = None
+        self._tools: Dict[str, Any] = {}
+        self._owner: Optional[asyncio.Task] = None
+        self._closing: Optional[asyncio.Event] = None
+        self._lock = asyncio.Lock()
+        # Bumped on every reset, so a call can tell whether its session was closed under it.
+        self.generation = 0
+        self.connects = 0
+        self.last_connect_ms: Optional[float] = None
+
+    @property
+    def is_open(self) -> bool:
+        return self._session is not None and self._owner is not None and not self._owner.done()
+
+    async def _own(self, ready: asyncio.Future, closing: asyncio.Event):
+        try:
+            async with self._client.session(self.name) as session:
+                self._session = session
+                ready.set_result(session)
+                await closing.wait()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+            else:
+                logger.warning(f"Session to MCP server '{self.name}' closed: {type(e).__name__}: {e}")
+        finally:
+            # A session that was replaced after a failure must not clear its successor.
+            if self._owner is asyncio.current_task():
+                self._session = None
+                self._tools = {}
+
+    async def _open(self):
+        if self.is_open:
+            return
+        self.breaker.check()
+        started = time.perf_counter()
+        candidates = [c for c in self._candidates if self.transport in (None, c["transport"])]
+        for index, connection in enumerate(candidates):
+            try:
+                await self._connect(connection)
+                break
+            except Exception as e:
+                if index + 1 < len(candidates):
+                    logger.info(f"MCP server '{self.name}' did not connect over {connection['transport']} ({describe_error(e)}); trying {candidates[index + 1]['transport']}.")
+                    continue
+                self.breaker.record_failure(e)
+                metrics.mcp_server_connects.inc(server=self.name, outcome="error")
+                raise
+        self.transport = connection["transport"]
+        self.connects += 1
+        self.last_connect_ms = round((time.perf_counter() - started) * 1000, 1)
+        self.breaker.record_success()
+        metrics.mcp_server_connects.inc(server=self.name, outcome="ok")
+        logger.info(f"Connected to MCP server '{self.name}' over {self.transport} in {self.last_connect_ms:.0f} ms ({len(self._tools)} tools).")
+
+    async def _connect(self, connection: Dict[str, Any]):
+        self._client.connections[self.name] = connection
+        ready = asyncio.get_running_loop().create_future()
+        self._closing = asyncio.Event()
+        self._owner = asyncio.create_task(self._own(ready, self._closing))
+        try:
+            await asyncio.wait_for(asyncio.shield(ready), MCP_CONNECT_TIMEOUT_SECONDS)
+            self._tools = {tool.name: tool for tool in await load_mcp_tools(self._session, server_name=self.name)}
+        except (Exception, asyncio.CancelledError):
+            self._abandon()
+            raise
+
+    async def load_tools(self, reload: bool = False) -> List[Any]:
+        """Opens the session if needed and returns the server's tools, bound to this session."""
+        async with self._lock:
+            if reload and self.is_open:
+                self._tools = {tool.name: tool for tool in await load_mcp_tools(self._session, server_name=self.name)}
+            await self._open()
+            return list(self._tools.values())
+
+    async def tool(self, tool_name: str) -> Any:
+        """The session-bound tool to invoke; raises ServerUnavailableError while the breaker is open."""
+        if not self.is_open:
+            async with self._lock:
+                await self._open()
+        elif self.breaker.state != "closed":
+            self.breaker.check()
+        tool = self._tools.get(tool_name)
+        if tool is None:
+            raise ToolException(f"Tool '{tool_name}' is not served by MCP server '{self.name}'.")
+        return tool
+
+    def record_success(self):
+        self.breaker.record_success()
+
+    def record_failure(self, error: BaseException, generation: Optional[int] = None):
+        """
+        Counts a failed call against the server; a connection failure also drops the
+        session, so the next call reconnects. Other calls in flight on that session are
+        aborted by the reset: pass the generation a call started on, and its failure
+        raises SessionClosedError instead of counting against the server again.
+        """
+        if generation is not None and generation != self.generation:
+            raise SessionClosedError(self.name, error) from error
+        if not is_server_failure(error):
+            return
+        self.breaker.record_failure(error)
+        if is_connection_failure(error):
+            self.reset()
+
+    def _abandon(self):
+        # A connect that failed or timed out may still be stuck in the transport.
+        self.reset()
+        if self._owner is not None and not self._owner.done():
+            self._owner.cancel()
+
+    def reset(self):
+        if self._closing is not None:
+            self._closing.set()
+        self.generation += 1
+        self._session = None
+        self._tools = {}
+
+    async def close(self):
+        self.reset()
+        owner, self._owner = self._owner, None
+        if owner is not None and not owner.done():
+            try:
+                await asyncio.wait_for(owner, 5)
+            except (asyncio.TimeoutError, Exception):
+                owner.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "connected": self.is_open,
+            "transport": self.transport,
+            "connects": self.connects,
+            "last_connect_ms": self.last_connect_ms,
+            **self.breaker.stats(),
+        }
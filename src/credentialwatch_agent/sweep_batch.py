@@ -0,0 +1,164 @@
+import os
+import sys
+import bisect
+import logging
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+
+logger = logging.getLogger("sweep_batch")
+
+SEVERITIES = ("critical", "high", "medium", "low")
+
+# Days remaining assumed for rows that report none (or a non-numeric value).
+DEFAULT_DAYS_REMAINING = 90
+
+def severity_thresholds() -> Tuple[int, int, int]:
+    """
+    Upper bounds (days remaining, inclusive) for critical, high and medium alerts,
+    from SWEEP_SEVERITY_THRESHOLDS (default "30,60,90"); anything later is low.
+    """
+    values = tuple(int(v) for v in os.getenv("SWEEP_SEVERITY_THRESHOLDS", "30,60,90").split(","))
+    if len(values) != 3 or list(values) != sorted(values):
+        raise ValueError(f"SWEEP_SEVERITY_THRESHOLDS must be three ascending day counts, got {values}.")
+    return values
+
+SEVERITY_THRESHOLDS = severity_thresholds()
+
+def classify_severity(days: int, thresholds: Sequence[int] = SEVERITY_THRESHOLDS) -> str:
+    """Severity of a single item; use classify_severities for many."""
+    return SEVERITIES[bisect.bisect_left(thresholds, days)]
+
+def classify_severities(days_remaining: np.ndarray, thresholds: Sequence[int] = SEVERITY_THRESHOLDS) -> np.ndarray:
+    """Severity codes (indexes into SEVERITIES) for a whole array of days remaining."""
+    return np.searchsorted(np.asarray(thresholds), days_remaining, side="left").astype(np.uint8)
+
+class ExpiringBatch:
+    """
+    Expiring credentials in columns: ids, provider names and expiry dates as lists,
+    credential types interned into a small vocabulary with int16 codes, and days remaining
+    as an int32 array. Built once from list_expiring_credentials rows; other row fields
+    are dropped. A missing or non-numeric days_remaining counts as DEFAULT_DAYS_REMAINING.
+
+    Kept in graph state as to_state() (plain lists and numpy arrays, which the
+    checkpointer serializes natively) and rebuilt with from_state().
+    """
+
+    __slots__ = ("provider_ids", "credential_ids", "names", "expiry_dates", "types", "type_codes", "days_remaining")
+
+    def __init__(self, provider_ids: List[Any], credential_ids: List[Any], names: List[Any], expiry_dates: List[Optional[str]], types: List[str], type_codes: np.ndarray, days_remaining: np.ndarray):
+        self.provider_ids = provider_ids
+        self.credential_ids = credential_ids
+        self.names = names
+        self.expiry_dates = expiry_dates
+        self.types = types
+        self.type_codes = type_codes
+        self.days_remaining = days_remaining
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Dict[str, Any]]) -> "ExpiringBatch":
+        vocabulary: Dict[str, int] = {}
+        codes = np.empty(len(rows), dtype=np.int16)
+        days = np.empty(len(rows), dtype=np.int32)
+        provider_ids = []
+        credential_ids = []
+        names = []
+        expiry_dates = []
+        defaulted = 0
+        for i, row in enumerate(rows):
+            provider_ids.append(row.get("provider_id"))
+            credential_ids.append(row.get("credential_id"))
+            names.append(row.get("name"))
+            expiry_dates.append(row.get("expiry_date"))
+            credential = sys.intern(str(row.get("credential")))
+            code = vocabulary.get(credential)
+            if code is None:
+                code = vocabulary[credential] = len(vocabulary)
+            codes[i] = code
+            try:
+                days[i] = int(row["days_remaining"])
+            except (KeyError, TypeError, ValueError, OverflowError):
+                days[i] = DEFAULT_DAYS_REMAINING
+                defaulted += 1
+        if defaulted:
+            logger.warning(f"{defaulted} expiring credentials had no usable days_remaining; assumed {DEFAULT_DAYS_REMAINING}.")
+        return cls(provider_ids, credential_ids, names, expiry_dates, list(vocabulary), codes, days)
+
+    @classmethod
+    def empty(cls) -> "ExpiringBatch":
+        return cls([], [], [], [], [], np.empty(0, dtype=np.int16), np.empty(0, dtype=np.int32))
+
+    @classmethod
+    def from_state(cls, state: Optional[Dict[str, Any]]) -> "ExpiringBatch":
+        if not state:
+            return cls.empty()
+        # Checkpoints written before expiry dates were kept have none.
+        expiry_dates = state.get("expiry_dates") or [None] * len(state["provider_ids"])
+        return cls(
+            state["provider_ids"], state["credential_ids"], state["names"], expiry_dates, state["types"],
+            np.asarray(state["type_codes"], dtype=np.int16), np.asarray(state["days_remaining"], dtype=np.int32),
+        )
+
+    def to_state(self) -> Dict[str, Any]:
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    def __len__(self) -> int:
+        return len(self.days_remaining)
+
+    def slice(self, start: int, end: int) -> "ExpiringBatch":
+        return ExpiringBatch(
+            self.provider_ids[start:end], self.credential_ids[start:end], self.names[start:end],
+            self.expiry_dates[start:end], self.types, self.type_codes[start:end], self.days_remaining[start:end],
+        )
+
+    def take(self, indices: np.ndarray) -> "ExpiringBatch":
+        """Rows at the given positions, in that order."""
+        return ExpiringBatch(
+            [self.provider_ids[i] for i in indices], [self.credential_ids[i] for i in indices],
+            [self.names[i] for i in indices], [self.expiry_dates[i] for i in indices], self.types, self.type_codes[indices], self.days_remaining[indices],
+        )
+
+    def credential(self, i: int) -> str:
+        return self.types[self.type_codes[i]]
+
+    def row(self, i: int) -> Dict[str, Any]:
+        return {
+            "provider_id": self.provider_ids[i],
+            "credential_id": self.credential_ids[i],
+            "name": self.names[i],
+            "credential": self.credential(i),
+            "expiry_date": self.expiry_dates[i],
+            "days_remaining": int(self.days_remaining[i]),
+        }
+
+    def rows(self) -> Iterator[Dict[str, Any]]:
+        types = self.types
+        for provider_id, credential_id, name, expiry_date, code, days in zip(
+            self.provider_ids, self.credential_ids, self.names, self.expiry_dates, self.type_codes.tolist(), self.days_remaining.tolist()
+        ):
+            yield {
+                "provider_id": provider_id, "credential_id": credential_id, "name": name,
+                "credential": types[code], "expiry_date": expiry_date, "days_remaining": days,
+            }
+
+    def severities(self, thresholds: Sequence[int] = SEVERITY_THRESHOLDS) -> np.ndarray:
+        return classify_severities(self.days_remaining, thresholds)
+
+    def counts(self, severities: Optional[np.ndarray] = None) -> Dict[str, Dict[str, int]]:
+        """Item counts by severity and by credential type, from one bincount over both."""
+        if severities is None:
+            severities = self.severities()
+        width = max(1, len(self.types))
+        joint = np.bincount(severities.astype(np.int64) * width + self.type_codes, minlength=len(SEVERITIES) * width)
+        joint = joint.reshape(len(SEVERITIES), width)
+        by_severity = joint.sum(axis=1)
+        by_type = joint.sum(axis=0)
+        return {
+            "by_severity": {severity: int(by_severity[code]) for code, severity in enumerate(SEVERITIES) if by_severity[code]},
+            "by_credential_type": {self.types[code]: int(by_type[code]) for code in range(len(self.types)) if by_type[code]},
+        }
+
+def merge_counts(total: Dict[str, int], counts: Dict[str, int]) -> Dict[str, int]:
+    merged = dict(total)
+    for key, value in counts.items():
+        merged[key] = merged.get(key, 0) + value
+    return merged
@@ -0,0 +1,176 @@
+import os
+import zlib
+import time
+import asyncio
+import logging
+import multiprocessing
+import multiprocessing.util
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+import numpy as np
+from credentialwatch_agent.sweep_batch import ExpiringBatch
+
+logger = logging.getLogger("sweep_partitions")
+
+PARTITION_STRATEGIES = ("provider", "expiry", "credential_type")
+
+# Partition sizing: aim for SWEEP_PARTITIONS_PER_WORKER partitions per worker so a slow
+# partition does not hold up the run, within [SWEEP_PARTITION_MIN_ITEMS, SWEEP_PARTITION_MAX_ITEMS].
+SWEEP_PARTITIONS_PER_WORKER = int(os.getenv("SWEEP_PARTITIONS_PER_WORKER", "2"))
+SWEEP_PARTITION_MIN_ITEMS = int(os.getenv("SWEEP_PARTITION_MIN_ITEMS", "500"))
+SWEEP_PARTITION_MAX_ITEMS = int(os.getenv("SWEEP_PARTITION_MAX_ITEMS", "20000"))
+
+def sweep_workers() -> int:
+    """Worker processes for partitioned sweeps from SWEEP_WORKERS: 0 (default) disables, "auto" uses the CPU count."""
+    value = os.getenv("SWEEP_WORKERS", "0").lower()
+    if value == "auto":
+        return os.cpu_count() or 1
+    return max(0, int(value))
+
+def sweep_partition_by() -> str:
+    return os.getenv("SWEEP_PARTITION_BY", "provider")
+
+def partition_count(total: int, workers: int) -> int:
+    """Number of partitions for `total` fetched items spread over `workers` processes."""
+    if total <= 0:
+        return 0
+    size = -(-total // max(1, workers * SWEEP_PARTITIONS_PER_WORKER))
+    size = min(max(size, SWEEP_PARTITION_MIN_ITEMS), max(SWEEP_PARTITION_MAX_ITEMS, SWEEP_PARTITION_MIN_ITEMS))
+    return -(-total // size)
+
+def partition_items(batch: ExpiringBatch, count: int, by: str = "provider") -> List[ExpiringBatch]:
+    """
+    Splits a batch of expiring items into at most `count` non-empty partitions.
+
+    provider: provider_id hash ranges, so all credentials of a provider are alerted by one worker.
+    expiry: contiguous days_remaining buckets of equal size, most urgent first.
+    credential_type: whole credential types packed into partitions (largest first);
+    a type larger than one partition is split.
+    """
+    if by not in PARTITION_STRATEGIES:
+        raise ValueError(f"Unknown partition strategy '{by}' (expected one of {', '.join(PARTITION_STRATEGIES)}).")
+    if not len(batch) or count <= 1:
+        return [batch] if len(batch) else []
+
+    if by == "provider":
+        # crc32 is stable across processes, unlike hash() on strings.
+        hashes = np.fromiter((zlib.crc32(str(pid).encode()) for pid in batch.provider_ids), dtype=np.uint64, count=len(batch))
+        assignment = (hashes * count) >> 32
+        groups = [np.flatnonzero(assignment == p) for p in range(count)]
+    elif by == "expiry":
+        ordered = np.argsort(batch.days_remaining, kind="stable")
+        size = -(-len(batch) // count)
+        groups = [ordered[i:i + size] for i in range(0, len(batch), size)]
+    else:
+        size = -(-len(batch) // count)
+        chunks = []
+        for code in range(len(batch.types)):
+            rows = np.flatnonzero(batch.type_codes == code)
+            chunks.extend(rows[i:i + size] for i in range(0, len(rows), size))
+        packed: List[List[np.ndarray]] = [[] for _ in range(count)]
+        sizes = [0] * count
+        # Largest chunk first into the currently smallest partition.
+        for chunk in sorted(chunks, key=len, reverse=True):
+            target = sizes.index(min(sizes))
+            packed[target].append(chunk)
+            sizes[target] += len(chunk)
+        groups = [np.concatenate(parts) if parts else np.empty(0, dtype=np.intp) for parts in packed]
+    return [batch.take(rows) for rows in groups if len(rows)]
+
+# --- Worker processes ---
+# Each worker imports the package afresh (spawn), so it has its own MCPClient and alert
+# ledger connection. It connects once and keeps one event loop for all partitions it runs,
+# closing the client when the process exits. Its rate limits are its share of the
+# configured ones, so the workers together stay within each server's budget.
+
+_worker_loop: Optional[asyncio.AbstractEventLoop] = None
+
+# Write tools workers call (_alert_items sends log_alerts, or log_alert per item).
+WORKER_WRITE_TOOLS = ("log_alert", "log_alerts")
+
+def _init_worker(workers: int = 1):
+    global _worker_loop
+    from credentialwatch_agent.mcp_client import mcp_client
+    from credentialwatch_agent.rate_limiter import rate_limits
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    rate_limits.set_share(1 / max(1, workers))
+    _worker_loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(_worker_loop)
+    _worker_loop.run_until_complete(mcp_client.connect())
+    # Pool workers exit through multiprocessing, which runs its finalizers but not atexit.
+    multiprocessing.util.Finalize(None, _close_worker, exitpriority=10)
+
+def _close_worker():
+    from credentialwatch_agent.mcp_client import mcp_client
+
+    _worker_loop.run_until_complete(mcp_client.close())
+    _worker_loop.close()
+
+async def alert_partition(items: ExpiringBatch, full: bool = False) -> Dict[str, Any]:
+    """Alerts one partition with this process's MCP client and returns its aggregates."""
+    from credentialwatch_agent.mcp_client import mcp_client
+    from credentialwatch_agent.agents.expiry_sweep import ALERT_CONCURRENCY, _alert_items
+    from credentialwatch_agent.rate_limiter import request_context
+
+    started = time.perf_counter()
+    semaphore = asyncio.Semaphore(max(1, ALERT_CONCURRENCY))
+    # A no-op once _init_worker has connected; also lets a partition run in-process.
+    await mcp_client.connect()
+    with request_context("batch", f"sweep-worker-{os.getpid()}"):
+        created, errors, skipped = await _alert_items(items, semaphore, full)
+    return {
+        "items": len(items),
+        "alerts_created": created,
+        "alerts_skipped": skipped,
+        "errors": errors,
+        "elapsed_seconds": time.perf_counter() - started,
+        "pid": os.getpid(),
+    }
+
+def _run_partition(items: ExpiringBatch, full: bool) -> Dict[str, Any]:
+    return _worker_loop.run_until_complete(alert_partition(items, full))
+
+def _invalidate_worker_writes():
+    # The workers' write calls went through their own clients, so this process's call
+    # listeners never saw them.
+    from credentialwatch_agent.mcp_client import mcp_client
+    from credentialwatch_agent.answer_cache import answer_cache
+
+    for tool_name in WORKER_WRITE_TOOLS:
+        mcp_client.invalidate_for_write(tool_name)
+        answer_cache.invalidate_for_write(tool_name)
+
+async def run_partitions(partitions: List[ExpiringBatch], workers: int, full: bool = False) -> List[Dict[str, Any]]:
+    """
+    Alerts partitions across a pool of `workers` processes and returns one result per
+    partition, in partition order. A partition whose worker fails is reported as an error.
+    Caches in this process that the workers' alerts made stale are invalidated.
+    """
+    if not partitions:
+        return []
+    workers = max(1, min(workers, len(partitions)))
+    loop = asyncio.get_running_loop()
+    logger.info(f"Alerting {len(partitions)} partitions on {workers} worker processes...")
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"), initializer=_init_worker, initargs=(workers,))
+    try:
+        futures = [loop.run_in_executor(pool, _run_partition, partition, full) for partition in partitions]
+        results = await asyncio.gather(*futures, return_exceptions=True)
+    finally:
+        # Waiting for the workers to exit blocks, so it runs off the event loop.
+        await asyncio.to_thread(pool.shutdown, wait=True, cancel_futures=True)
+        _invalidate_worker_writes()
+
+    merged = []
+    for index, (partition, result) in enumerate(zip(partitions, results)):
+        if isinstance(result, BaseException):
+            result = {
+                "items": len(partition),
+                "alerts_created": 0,
+                "alerts_skipped": 0,
+                "errors": [f"Partition {index} ({len(partition)} items) failed: {type(result).__name__}: {result}"],
+                "elapsed_seconds": 0.0,
+                "pid": None,
+            }
+        merged.append(result)
+    return merged
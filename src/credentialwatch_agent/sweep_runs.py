@@ -0,0 +1,162 @@
+import os
+import time
+import uuid
+import socket
+import asyncio
+import sqlite3
+import logging
+from datetime import datetime, timezone
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+logger = logging.getLogger("sweep_runs")
+
+def sweep_checkpoint_path() -> str:
+    return os.getenv("SWEEP_CHECKPOINT_PATH", "sweep_checkpoints.db")
+
+def new_run_id() -> str:
+    """Returns a sortable, unique sweep run id, e.g. "sweep-20251202T195825-1a2b3c4d"."""
+    return f"sweep-{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+
+@asynccontextmanager
+async def open_sweep_checkpointer(path: Optional[str] = None) -> AsyncIterator[AsyncSqliteSaver]:
+    """Opens the durable SQLite checkpointer that sweep runs are recorded in."""
+    path = path or sweep_checkpoint_path()
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    async with AsyncSqliteSaver.from_conn_string(path) as saver:
+        await saver.setup()
+        yield saver
+
+async def get_run_state(saver: AsyncSqliteSaver, run_id: str) -> Optional[Dict[str, Any]]:
+    """Returns the latest checkpointed sweep state for a run, or None if the run is unknown."""
+    checkpoint_tuple = await saver.aget_tuple({"configurable": {"thread_id": run_id}})
+    if checkpoint_tuple is None:
+        return None
+    return dict(checkpoint_tuple.checkpoint.get("channel_values", {}))
+
+def is_complete(state: Dict[str, Any]) -> bool:
+    # summarize_sweep is the last node and always sets a summary.
+    return bool(state.get("summary"))
+
+async def list_incomplete_runs(saver: AsyncSqliteSaver) -> List[Dict[str, Any]]:
+    """Lists runs whose last checkpoint is before the summary, newest first."""
+    async with saver.lock, saver.conn.execute("SELECT DISTINCT thread_id FROM checkpoints") as cursor:
+        run_ids = [row[0] async for row in cursor]
+
+    runs = []
+    for run_id in sorted(run_ids, reverse=True):
+        state = await get_run_state(saver, run_id)
+        if state is None or is_complete(state):
+            continue
+        expiring = state.get("expiring") or {}
+        runs.append({
+            "run_id": run_id,
+            "window_days": state.get("window_days"),
+            "streaming": state.get("streaming", False),
+            "full_sweep": state.get("full_sweep", False),
+            "items_fetched": len(expiring.get("days_remaining", [])),
+            "items_processed": state.get("alerts_cursor", 0),
+            "alerts_created": state.get("alerts_created", 0),
+        })
+    return runs
+
+async def compact_run(saver: AsyncSqliteSaver, run_id: str):
+    """Drops all but the latest checkpoint of a finished run to keep the database small."""
+    checkpoint_tuple = await saver.aget_tuple({"configurable": {"thread_id": run_id}})
+    if checkpoint_tuple is None:
+        return
+    latest_id = checkpoint_tuple.config["configurable"]["checkpoint_id"]
+    async with saver.lock:
+        await saver.conn.execute(
+            "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_id != ?", (run_id, latest_id)
+        )
+        await saver.conn.execute(
+            "DELETE FROM writes WHERE thread_id = ? AND checkpoint_id != ?", (run_id, latest_id)
+        )
+        await saver.conn.commit()
+    logger.info(f"Compacted checkpoints for sweep run {run_id}.")
+
+class SweepInProgressError(RuntimeError):
+    """Raised when another sweep over the same window holds the sweep lock."""
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def _acquire_sweep_lock(window_days: int, run_id: str, path: str, ttl_seconds: float) -> sqlite3.Connection:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    host = socket.gethostname()
+
+    # Opened in a worker thread and closed in another one by sweep_lock.
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+    try:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS sweep_locks (
+                window_days INTEGER PRIMARY KEY,
+                run_id TEXT NOT NULL,
+                host TEXT NOT NULL,
+                pid INTEGER NOT NULL,
+                acquired_at REAL NOT NULL
+            )
+            """
+        )
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT run_id, host, pid, acquired_at FROM sweep_locks WHERE window_days = ?", (window_days,)
+            ).fetchone()
+            if row is not None:
+                holder, holder_host, holder_pid, acquired_at = row
+                stale = time.time() - acquired_at > ttl_seconds or (holder_host == host and not _process_alive(holder_pid))
+                if not stale:
+                    raise SweepInProgressError(
+                        f"Sweep {holder} over {window_days} days is already running (pid {holder_pid} on {holder_host})."
+                    )
+                logger.warning(f"Taking over stale sweep lock for {window_days} days from {holder}.")
+            conn.execute(
+                "INSERT OR REPLACE INTO sweep_locks (window_days, run_id, host, pid, acquired_at) VALUES (?, ?, ?, ?, ?)",
+                (window_days, run_id, host, os.getpid(), time.time()),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+    except BaseException:
+        conn.close()
+        raise
+    return conn
+
+def _release_sweep_lock(conn: sqlite3.Connection, window_days: int, run_id: str):
+    try:
+        conn.execute("DELETE FROM sweep_locks WHERE window_days = ? AND run_id = ?", (window_days, run_id))
+    finally:
+        conn.close()
+
+@asynccontextmanager
+async def sweep_lock(window_days: int, run_id: str, path: Optional[str] = None, ttl_seconds: Optional[float] = None) -> AsyncIterator[None]:
+    """
+    Holds the lock for sweeps over window_days while the block runs, across processes
+    (UI, CLI, workers) sharing the sweep checkpoint database. Raises SweepInProgressError
+    if another run holds it. A lock left by a dead process on this host, or older than
+    SWEEP_LOCK_TTL_SECONDS (default 6h), is taken over. The SQLite work, which may wait
+    up to 30s for the database, runs in a thread.
+    """
+    path = path or sweep_checkpoint_path()
+    if ttl_seconds is None:
+        ttl_seconds = float(os.getenv("SWEEP_LOCK_TTL_SECONDS", "21600"))
+    conn = await asyncio.to_thread(_acquire_sweep_lock, window_days, run_id, path, ttl_seconds)
+    try:
+        yield
+    finally:
+        await asyncio.to_thread(_release_sweep_lock, conn, window_days, run_id)
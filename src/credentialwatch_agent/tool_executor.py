@@ -0,0 +1,113 @@
+import os
+import json
+import time
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+from langchain_core.messages import ToolMessage
+from langchain_core.runnables import RunnableConfig
+from credentialwatch_agent.tool_index import canonical_name
+from credentialwatch_agent.metrics import agent_tool_calls, agent_tool_seconds
+from credentialwatch_agent.tracing import span
+from credentialwatch_agent.hedging import call_deadline
+
+logger = logging.getLogger("tool_executor")
+
+# Per-tool deadlines (seconds); other tools use AGENT_TOOL_TIMEOUT_SECONDS.
+# Override per tool with AGENT_TOOL_TIMEOUT_<TOOL_NAME>, e.g. AGENT_TOOL_TIMEOUT_SEARCH_PROVIDERS=10.
+DEFAULT_TOOL_TIMEOUTS: Dict[str, float] = {
+    "get_provider_by_npi": 15.0,
+    "search_providers": 20.0,
+    "get_open_alerts": 15.0,
+    "list_expiring_credentials": 45.0,
+}
+
+def tool_timeout(tool_name: str) -> float:
+    name = canonical_name(tool_name)
+    default = DEFAULT_TOOL_TIMEOUTS.get(name, float(os.getenv("AGENT_TOOL_TIMEOUT_SECONDS", "30")))
+    return float(os.getenv(f"AGENT_TOOL_TIMEOUT_{name.upper()}", default))
+
+class ToolExecutor:
+    """
+    Runs the tool calls of one AIMessage concurrently.
+    A semaphore shared by all conversations caps in-flight tool calls, and each call has
+    its own deadline; a call that misses it returns a structured timeout result instead
+    of blocking the turn.
+    """
+
+    def __init__(self, max_concurrency: Optional[int] = None):
+        if max_concurrency is None:
+            max_concurrency = int(os.getenv("AGENT_TOOL_CONCURRENCY", "4"))
+        self.max_concurrency = max(1, max_concurrency)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.calls = 0
+        self.timeouts = 0
+        self.errors = 0
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def run(self, tool_calls: List[Dict[str, Any]], tools_by_name: Dict[str, Any], config: Optional[RunnableConfig] = None) -> List[ToolMessage]:
+        """Executes tool calls concurrently and returns one ToolMessage per call, in call order."""
+        return list(await asyncio.gather(*(self._run_one(call, tools_by_name, config) for call in tool_calls)))
+
+    async def _run_one(self, tool_call: Dict[str, Any], tools_by_name: Dict[str, Any], config: Optional[RunnableConfig]) -> ToolMessage:
+        name = tool_call["name"]
+        tool = tools_by_name.get(name)
+        if tool is None:
+            self.errors += 1
+            agent_tool_calls.inc(tool=name, status="unknown_tool")
+            return ToolMessage(
+                content=f"Error: tool '{name}' is not available. Choose one of: {', '.join(tools_by_name)}.",
+                name=name, tool_call_id=tool_call["id"], status="error",
+            )
+
+        timeout = tool_timeout(name)
+        queued_at = time.perf_counter()
+        async with self._get_semaphore():
+            started = time.perf_counter()
+            status = "success"
+            outcome = "success"
+            try:
+                # The deadline is also visible to the MCP client, which will not hedge past it.
+                with span("agent.tool", tool=name, timeout_seconds=timeout), call_deadline(timeout):
+                    content = await asyncio.wait_for(tool.ainvoke(tool_call["args"], config), timeout)
+            except asyncio.TimeoutError:
+                status = "error"
+                outcome = "timeout"
+                self.timeouts += 1
+                content = json.dumps({
+                    "error": "timeout",
+                    "tool": name,
+                    "timeout_seconds": timeout,
+                    "message": "The tool did not respond in time and returned no data. "
+                               "Retry once, narrow the request, or answer without this result and say so.",
+                })
+            except Exception as e:
+                status = "error"
+                outcome = "error"
+                self.errors += 1
+                content = json.dumps({"error": type(e).__name__, "tool": name, "message": str(e)})
+        self.calls += 1
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        agent_tool_seconds.observe(elapsed_ms / 1000, tool=name)
+        agent_tool_calls.inc(tool=name, status=outcome)
+        waited_ms = (started - queued_at) * 1000
+        logger.info(f"Tool '{name}' {status} in {elapsed_ms:.1f} ms (queued {waited_ms:.1f} ms, timeout {timeout:g}s).")
+
+        if not isinstance(content, (str, list)):
+            content = json.dumps(content, default=str)
+        return ToolMessage(content=content, name=name, tool_call_id=tool_call["id"], status=status)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "calls": self.calls,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+        }
+
+# Global instance, so the concurrency cap applies across all conversations
+tool_executor = ToolExecutor()
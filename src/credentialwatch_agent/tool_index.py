@@ -0,0 +1,107 @@
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Servers known to the client. Remote tools are exposed with a server prefix,
+# e.g. "cred_db_mcp_list_expiring_credentials" or "npi_mcp_search_providers_tool".
+SERVER_NAMES = ("npi", "cred_db", "alert")
+
+# Key used for tools that carry no recognizable server prefix (e.g. local servers).
+ANY_SERVER = "*"
+
+def server_prefixes(server_name: str) -> Tuple[str, ...]:
+    """Returns the name prefixes a server's tools may carry, most specific first."""
+    return (f"{server_name}_mcp_", f"{server_name}_")
+
+def tool_aliases(full_name: str, server_names: Iterable[str] = SERVER_NAMES) -> List[Tuple[str, str]]:
+    """
+    Returns the (server_name, short_name) keys a full tool name resolves under.
+
+    The rules mirror the suffix matching callers rely on: a tool named
+    "<prefix>_x" or "<prefix>_x_tool" answers to "x", and "x_tool" answers to "x",
+    but only under the server whose prefix it carries.
+    """
+    keys = []
+    for server_name in server_names:
+        for prefix in server_prefixes(server_name):
+            if full_name.startswith(prefix) and len(full_name) > len(prefix):
+                short_name = full_name[len(prefix):]
+                keys.append((server_name, short_name))
+                if short_name.endswith("_tool"):
+                    keys.append((server_name, short_name[:-len("_tool")]))
+                break
+
+    if not keys:
+        keys.append((ANY_SERVER, full_name))
+        if full_name.endswith("_tool"):
+            keys.append((ANY_SERVER, full_name[:-len("_tool")]))
+    return keys
+
+def canonical_name(tool_name: str) -> str:
+    """Returns the shortest alias of a tool name, e.g. "npi_mcp_search_providers_tool" -> "search_providers"."""
+    return tool_aliases(tool_name)[-1][1]
+
+class ToolIndex:
+    """
+    O(1) lookup of loaded tools by (server_name, short_name).
+    Also remembers recent misses so unknown names don't trigger a tool refresh on every call.
+    """
+
+    def __init__(self, miss_ttl_seconds: Optional[float] = None):
+        if miss_ttl_seconds is None:
+            miss_ttl_seconds = float(os.getenv("MCP_TOOL_MISS_TTL_SECONDS", "300"))
+        self.miss_ttl_seconds = miss_ttl_seconds
+        self._by_name: Dict[str, Any] = {}
+        self._by_alias: Dict[Tuple[str, str], Any] = {}
+        self._server_of: Dict[str, str] = {}
+        self._misses: Dict[Tuple[str, str], float] = {}
+
+    def build(self, tools: Iterable[Any]):
+        """Rebuilds the index from a list of tools. Clears the negative cache."""
+        by_name = {}
+        by_alias = {}
+        server_of = {}
+        stripped = []
+        for tool in tools:
+            by_name[tool.name] = tool
+            keys = tool_aliases(tool.name)
+            server_of[tool.name] = keys[0][0]
+            # Exact short names take precedence over "_tool"-stripped ones.
+            by_alias.setdefault(keys[0], tool)
+            stripped.extend((key, tool) for key in keys[1:])
+        for key, tool in stripped:
+            by_alias.setdefault(key, tool)
+
+        self._by_name = by_name
+        self._by_alias = by_alias
+        self._server_of = server_of
+        self._misses = {}
+
+    def resolve(self, server_name: str, tool_name: str) -> Optional[Any]:
+        """Returns the tool for a full or short name, or None."""
+        tool = self._by_name.get(tool_name)
+        if tool is not None:
+            return tool
+        tool = self._by_alias.get((server_name, tool_name))
+        if tool is not None:
+            return tool
+        return self._by_alias.get((ANY_SERVER, tool_name))
+
+    def server_of(self, full_name: str) -> Optional[str]:
+        """Returns the server a loaded tool belongs to, ANY_SERVER if unprefixed, or None."""
+        return self._server_of.get(full_name)
+
+    def record_miss(self, server_name: str, tool_name: str):
+        self._misses[(server_name, tool_name)] = time.monotonic() + self.miss_ttl_seconds
+
+    def is_recent_miss(self, server_name: str, tool_name: str) -> bool:
+        expires_at = self._misses.get((server_name, tool_name))
+        if expires_at is None:
+            return False
+        if time.monotonic() >= expires_at:
+            del self._misses[(server_name, tool_name)]
+            return False
+        return True
+
+    def __len__(self) -> int:
+        return len(self._by_name)
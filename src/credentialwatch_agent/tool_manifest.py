@@ -0,0 +1,125 @@
+import os
+import json
+import time
+import hashlib
+import logging
+from typing import Any, Dict, List, Optional
+from mcp.types import Tool as MCPTool
+from langchain_mcp_adapters.tools import convert_mcp_tool_to_langchain_tool
+
+logger = logging.getLogger("tool_manifest")
+
+# Bumped when the manifest layout changes; older files are ignored.
+MANIFEST_FORMAT = 1
+
+def manifest_enabled() -> bool:
+    return os.getenv("MCP_MANIFEST_CACHE", "true").lower() in ("1", "true", "yes")
+
+def manifest_path() -> str:
+    return os.getenv("MCP_MANIFEST_PATH", "mcp_manifest.json")
+
+def _tool_spec(server_name: str, tool: Any) -> Dict[str, Any]:
+    schema = getattr(tool, "args_schema", None)
+    if schema is not None and not isinstance(schema, dict):
+        schema = schema.model_json_schema()
+    return {
+        "name": tool.name,
+        "server": server_name,
+        "description": tool.description,
+        "args_schema": schema,
+        "metadata": tool.metadata,
+    }
+
+def tools_etag(server_name: str, tools: List[Any]) -> str:
+    """Etag of one server's loaded tools, to tell whether a reload changed anything."""
+    return manifest_etag([_tool_spec(server_name, tool) for tool in tools])
+
+def manifest_etag(tools: List[Dict[str, Any]]) -> str:
+    """Content hash of tool specs: equal etags mean the same names, servers, descriptions and schemas."""
+    canonical = json.dumps(sorted(tools, key=lambda t: (t["server"], t["name"])), sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+def build_manifest(servers: Dict[str, Dict[str, Any]], tools_by_server: Dict[str, List[Any]]) -> Dict[str, Any]:
+    """
+    Manifest of the tools each server exposes, for the given server connections.
+    Only transports and URLs are kept from the connections, never headers.
+    """
+    tools = [_tool_spec(name, tool) for name, server_tools in tools_by_server.items() for tool in server_tools]
+    return {
+        "format": MANIFEST_FORMAT,
+        "etag": manifest_etag(tools),
+        "saved_at": time.time(),
+        "servers": _endpoints({name: conn for name, conn in servers.items() if name in tools_by_server}),
+        "tools": tools,
+    }
+
+def _endpoints(servers: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    return {name: {"transport": conn.get("transport"), "url": conn.get("url")} for name, conn in sorted(servers.items())}
+
+def load_manifest(servers: Dict[str, Dict[str, Any]], path: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Returns the saved manifest, keeping only the tools of servers whose endpoint is
+    unchanged, or None if no server's tools can be reused.
+    """
+    path = path or manifest_path()
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable tool manifest {path}: {e}")
+        return None
+    if manifest.get("format") != MANIFEST_FORMAT:
+        return None
+    saved = manifest.get("servers") or {}
+    current = _endpoints(servers)
+    reusable = {name for name, endpoint in current.items() if saved.get(name) == endpoint}
+    if reusable != set(current):
+        logger.info(f"Tool manifest {path} has no tools for the current endpoints of: {', '.join(sorted(set(current) - reusable))}.")
+    manifest["tools"] = [spec for spec in manifest.get("tools") or [] if spec.get("server") in reusable]
+    if not manifest["tools"]:
+        return None
+    return manifest
+
+def save_manifest(manifest: Dict[str, Any], path: Optional[str] = None):
+    """Writes the manifest atomically, so a crash mid-write never leaves a torn file."""
+    path = path or manifest_path()
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, default=str)
+        os.replace(temp_path, path)
+    except OSError as e:
+        logger.warning(f"Could not save tool manifest to {path}: {e}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def manifest_tools(manifest: Dict[str, Any], connections: Dict[str, Any]) -> Dict[str, List[Any]]:
+    """
+    LangChain tools rebuilt from a manifest, by server. They are the same as the ones
+    MultiServerMCPClient.get_tools() returns, so the agent can bind them before any
+    server has been contacted.
+    """
+    tools: Dict[str, List[Any]] = {}
+    for spec in manifest["tools"]:
+        connection = connections.get(spec["server"])
+        if connection is None:
+            continue
+        metadata = dict(spec.get("metadata") or {})
+        meta = metadata.pop("_meta", None)
+        definition = {
+            "name": spec["name"],
+            "description": spec.get("description"),
+            "inputSchema": spec.get("args_schema") or {"type": "object", "properties": {}},
+            "annotations": metadata or None,
+        }
+        if meta is not None:
+            definition["_meta"] = meta
+        tools.setdefault(spec["server"], []).append(convert_mcp_tool_to_langchain_tool(
+            None, MCPTool.model_validate(definition), connection=connection, server_name=spec["server"],
+        ))
+    return tools
@@ -0,0 +1,112 @@
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+import functools
+import contextvars
+from typing import Any, Callable, Dict, Optional
+from credentialwatch_agent.metrics import graph_node_seconds
+
+logger = logging.getLogger("tracing")
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+class SpanFileExporter:
+    """
+    Appends finished spans as JSON lines to TRACE_SPANS_PATH. Disabled when it is unset.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path if path is not None else os.getenv("TRACE_SPANS_PATH", "")
+        self._lock = threading.Lock()
+        self._file = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def export(self, record: Dict[str, Any]):
+        line = json.dumps(record, default=str)
+        with self._lock:
+            if self._file is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._file = open(self.path, "a", buffering=1)
+                logger.info(f"Exporting spans to {self.path}")
+            self._file.write(line + "\n")
+
+span_exporter = SpanFileExporter()
+
+class Span:
+    """
+    A timed operation. Nested spans (across awaits and tasks) share the trace id
+    of the outermost one. Use through span(...).
+    """
+
+    __slots__ = ("name", "attributes", "trace_id", "span_id", "parent_id", "start", "duration", "status", "_started", "_token")
+
+    def __init__(self, name: str, attributes: Dict[str, Any]):
+        parent = _current_span.get()
+        self.name = name
+        self.attributes = attributes
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.start = 0.0
+        self.duration = 0.0
+        self.status = "ok"
+        self._started = 0.0
+        self._token = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def __enter__(self) -> "Span":
+        self.start = time.time()
+        self._started = time.perf_counter()
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self._started
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.status = "cancelled" if exc_type.__name__ == "CancelledError" else "error"
+            self.attributes.setdefault("error", f"{exc_type.__name__}: {exc}")
+        if span_exporter.enabled:
+            span_exporter.export({
+                "trace_id": self.trace_id,
+                "span_id": self.span_id,
+                "parent_id": self.parent_id,
+                "name": self.name,
+                "start": self.start,
+                "duration_ms": round(self.duration * 1000, 3),
+                "status": self.status,
+                "attributes": self.attributes,
+            })
+        return False
+
+def span(name: str, **attributes: Any) -> Span:
+    """Context manager that times a block and exports it as a span when TRACE_SPANS_PATH is set."""
+    return Span(name, attributes)
+
+def timed_node(graph: str, node: str, fn: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Wraps an async graph node so each run is recorded in the graph_node_seconds
+    histogram and as a span. The wrapper keeps fn's signature, so LangGraph still
+    passes config to nodes that accept it.
+    """
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            with span(f"{graph}.{node}", graph=graph, node=node):
+                return await fn(*args, **kwargs)
+        finally:
+            graph_node_seconds.observe(time.perf_counter() - started, graph=graph, node=node)
+
+    return wrapper
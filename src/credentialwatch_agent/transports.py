@@ -0,0 +1,141 @@
+import os
+import sys
+import shlex
+import logging
+import importlib.util
+from typing import Any, Dict, List, Optional
+import httpx
+
+logger = logging.getLogger("transports")
+
+TRANSPORTS = ("auto", "sse", "streamable_http", "stdio")
+
+# Env prefix of each server's settings (<PREFIX>_MCP_URL, _MCP_TRANSPORT, _MCP_COMMAND).
+ENV_PREFIXES = {"npi": "NPI", "cred_db": "CRED_DB", "alert": "ALERT"}
+
+# Shared connection pool for all HTTP transports.
+MCP_HTTP_MAX_CONNECTIONS = int(os.getenv("MCP_HTTP_MAX_CONNECTIONS", "100"))
+MCP_HTTP_MAX_KEEPALIVE = int(os.getenv("MCP_HTTP_MAX_KEEPALIVE", "20"))
+MCP_HTTP_KEEPALIVE_SECONDS = float(os.getenv("MCP_HTTP_KEEPALIVE_SECONDS", "30"))
+# Matches the MCP SDK's defaults: a long read timeout, since servers hold response streams open.
+MCP_HTTP_TIMEOUT = httpx.Timeout(30.0, read=300.0)
+
+def server_transport(server_name: str) -> str:
+    """Transport for a server: <PREFIX>_MCP_TRANSPORT, else MCP_TRANSPORT, else "auto"."""
+    prefix = ENV_PREFIXES.get(server_name, server_name.upper())
+    value = os.getenv(f"{prefix}_MCP_TRANSPORT") or os.getenv("MCP_TRANSPORT") or "auto"
+    value = value.strip().lower().replace("-", "_")
+    if value not in TRANSPORTS:
+        raise ValueError(f"Unknown MCP transport '{value}' for '{server_name}' (expected one of {', '.join(TRANSPORTS)}).")
+    return value
+
+def sse_url(url: str) -> str:
+    """The SSE endpoint of a server URL, e.g. .../gradio_api/mcp/ -> .../gradio_api/mcp/sse."""
+    url = url.rstrip("/")
+    return url if url.endswith("/sse") else url + "/sse"
+
+def streamable_http_url(url: str) -> str:
+    """The streamable HTTP endpoint of a server URL, e.g. .../gradio_api/mcp/sse -> .../gradio_api/mcp/."""
+    url = url.rstrip("/")
+    if url.endswith("/sse"):
+        url = url[:-len("/sse")]
+    return url + "/"
+
+def stdio_command(server_name: str) -> List[str]:
+    """<PREFIX>_MCP_COMMAND, else the local stand-in server for this name over stdio."""
+    prefix = ENV_PREFIXES.get(server_name, server_name.upper())
+    command = os.getenv(f"{prefix}_MCP_COMMAND")
+    if command:
+        return shlex.split(command)
+    return [sys.executable, "-m", "credentialwatch_agent.cli", "local-servers", "--stdio", server_name]
+
+def connection_candidates(server_name: str, url: str, transport: str, headers: Optional[Dict[str, str]] = None, http_client_factory: Any = None) -> List[Dict[str, Any]]:
+    """
+    Connections to try for a server, in order. Gradio MCP endpoints serve both HTTP
+    transports under /gradio_api/mcp/, so "auto" tries the one the URL names first (SSE
+    for .../sse, streamable HTTP otherwise) and falls back to the other.
+    """
+    if transport == "stdio":
+        command = stdio_command(server_name)
+        # The MCP SDK starts stdio servers with a minimal environment; pass on what the
+        # local stand-ins need (the package path and their LOCAL_MCP_* fault settings).
+        env = {key: value for key, value in os.environ.items() if key == "PYTHONPATH" or key.startswith("LOCAL_MCP_")}
+        return [{"transport": "stdio", "command": command[0], "args": command[1:], "env": env}]
+
+    candidates = []
+    if transport in ("auto", "streamable_http"):
+        candidates.append({"transport": "streamable_http", "url": streamable_http_url(url)})
+    if transport in ("auto", "sse"):
+        candidates.append({"transport": "sse", "url": sse_url(url)})
+    if transport == "auto" and url.rstrip("/").endswith("/sse"):
+        candidates.reverse()
+    for connection in candidates:
+        if headers:
+            connection["headers"] = dict(headers)
+        if http_client_factory is not None:
+            connection["httpx_client_factory"] = http_client_factory
+    return candidates
+
+def http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+class _SharedTransport(httpx.AsyncBaseTransport):
+    # The MCP transports close the client they are given when their session ends;
+    # the pool underneath must outlive them.
+    def __init__(self, pool: "HttpPool"):
+        self._pool = pool
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._pool.transport().handle_async_request(request)
+
+    async def aclose(self):
+        pass
+
+class HttpPool:
+    """
+    One keep-alive connection pool shared by the HTTP sessions of all servers, handed to
+    the MCP transports as their httpx client factory. HTTP/2 is used when the h2 package
+    is installed (MCP_HTTP2=auto, the default), so concurrent calls to a server share one
+    connection. The pool (and its TLS context) is created on the first request, keeping
+    it out of a start served from the tool manifest.
+    """
+
+    def __init__(self, http2: Optional[bool] = None):
+        if http2 is None:
+            setting = os.getenv("MCP_HTTP2", "auto").lower()
+            http2 = http2_available() if setting == "auto" else setting in ("1", "true", "yes")
+        if http2 and not http2_available():
+            logger.warning("MCP_HTTP2 is on but the h2 package is not installed; using HTTP/1.1.")
+            http2 = False
+        self.http2 = http2
+        self._transport: Optional[httpx.AsyncHTTPTransport] = None
+        self._shared = _SharedTransport(self)
+        self.clients = 0
+
+    def transport(self) -> httpx.AsyncHTTPTransport:
+        if self._transport is None:
+            self._transport = httpx.AsyncHTTPTransport(
+                http2=self.http2,
+                limits=httpx.Limits(
+                    max_connections=MCP_HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=MCP_HTTP_MAX_KEEPALIVE,
+                    keepalive_expiry=MCP_HTTP_KEEPALIVE_SECONDS,
+                ),
+            )
+        return self._transport
+
+    def client_factory(self, headers: Optional[Dict[str, str]] = None, timeout: Optional[httpx.Timeout] = None, auth: Optional[httpx.Auth] = None) -> httpx.AsyncClient:
+        """httpx client factory for the MCP transports; every client shares this pool."""
+        self.clients += 1
+        return httpx.AsyncClient(headers=headers, timeout=timeout or MCP_HTTP_TIMEOUT, auth=auth, transport=self._shared)
+
+    def connections(self) -> int:
+        return len(self._transport._pool.connections) if self._transport else 0
+
+    async def aclose(self):
+        if self._transport is not None:
+            await self._transport.aclose()
+            self._transport = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {"http2": self.http2, "clients": self.clients, "connections": self.connections()}
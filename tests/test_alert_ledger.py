@@ -0,0 +1,97 @@
+import asyncio
+import sqlite3
+from datetime import date
+
+import pytest
+
+from credentialwatch_agent.alert_ledger import AlertLedger, ledger_expiry, ledger_key
+
+DAY = 86400
+KEY = ("7", "42")
+EXPIRY = date(2026, 3, 1).toordinal()
+
+@pytest.fixture
+def ledger(tmp_path):
+    ledger = AlertLedger(path=str(tmp_path / "ledger.db"), realert_after_days=0)
+    yield ledger
+    ledger.close()
+
+def test_new_credential_is_alerted(ledger):
+    assert ledger.should_alert(KEY, "medium", expiry=EXPIRY)
+
+def test_same_or_lower_severity_is_skipped_and_escalation_is_not(ledger):
+    ledger.record([(KEY, "high", EXPIRY)])
+    assert not ledger.should_alert(KEY, "high", expiry=EXPIRY)
+    assert not ledger.should_alert(KEY, "low", expiry=EXPIRY)
+    assert ledger.should_alert(KEY, "critical", expiry=EXPIRY)
+    assert ledger.should_alert(("7", "43"), "high", expiry=EXPIRY)
+
+def test_renewed_credential_is_alerted_again(ledger):
+    ledger.record([(KEY, "critical", EXPIRY)])
+    renewed = EXPIRY + 730
+    assert ledger.should_alert(KEY, "low", expiry=renewed)
+    ledger.record([(KEY, "low", renewed)])
+    # The old cycle's critical entry is cleared, so the new cycle escalates normally.
+    assert ledger.should_alert(KEY, "medium", expiry=renewed)
+    assert ledger.count() == 1
+
+def test_expiry_a_day_off_is_the_same_cycle(ledger):
+    ledger.record([(KEY, "high", EXPIRY)])
+    assert not ledger.should_alert(KEY, "high", expiry=EXPIRY + 1)
+    assert not ledger.should_alert(KEY, "high", expiry=EXPIRY - 1)
+    assert ledger.should_alert(KEY, "high", expiry=EXPIRY + 2)
+
+def test_unknown_expiry_matches_any_cycle(ledger):
+    ledger.record([(KEY, "high", None)])
+    assert not ledger.should_alert(KEY, "high", expiry=EXPIRY)
+    ledger.record([(("8", "1"), "high", EXPIRY)])
+    assert not ledger.should_alert(("8", "1"), "high", expiry=None)
+
+def test_realert_after_days(tmp_path):
+    ledger = AlertLedger(path=str(tmp_path / "ledger.db"), realert_after_days=7)
+    ledger.record([(KEY, "critical", EXPIRY)], now=0)
+    assert not ledger.should_alert(KEY, "critical", now=7 * DAY, expiry=EXPIRY)
+    assert ledger.should_alert(KEY, "critical", now=7 * DAY + 1, expiry=EXPIRY)
+    ledger.close()
+
+def test_zero_realert_days_never_resends(ledger):
+    ledger.record([(KEY, "critical", EXPIRY)], now=0)
+    assert not ledger.should_alert(KEY, "critical", now=3650 * DAY, expiry=EXPIRY)
+
+def test_realert_is_off_by_default(monkeypatch, tmp_path):
+    monkeypatch.delenv("ALERT_LEDGER_REALERT_DAYS", raising=False)
+    assert AlertLedger(path=str(tmp_path / "ledger.db")).realert_after_days == 0
+
+def test_pending_checks_many_entries(ledger):
+    ledger.record([(KEY, "high", EXPIRY)])
+    entries = [(KEY, "high", EXPIRY), (KEY, "critical", EXPIRY), (("9", "9"), "low", None)]
+    assert ledger.pending(entries) == [False, True, True]
+
+def test_async_variants(ledger):
+    async def run():
+        await ledger.record_async([(KEY, "high", EXPIRY)])
+        return await ledger.pending_async([(KEY, "high", EXPIRY), (KEY, "critical", EXPIRY)])
+    assert asyncio.run(run()) == [False, True]
+
+def test_ledger_without_expiry_column_is_upgraded(tmp_path):
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE alert_ledger (provider_id TEXT NOT NULL, credential_id TEXT NOT NULL, severity TEXT NOT NULL,"
+        " last_alerted_at REAL NOT NULL, PRIMARY KEY (provider_id, credential_id, severity))"
+    )
+    conn.execute("INSERT INTO alert_ledger VALUES ('7', '42', 'high', 0)")
+    conn.commit()
+    conn.close()
+    ledger = AlertLedger(path=path, realert_after_days=0)
+    assert not ledger.should_alert(KEY, "high", expiry=EXPIRY)
+    ledger.record([(KEY, "high", EXPIRY + 365)])
+    assert ledger.should_alert(KEY, "high", expiry=EXPIRY)
+    ledger.close()
+
+def test_ledger_key_and_expiry():
+    assert ledger_key({"provider_id": 7, "credential_id": 42}) == ("7", "42")
+    assert ledger_key({"provider_id": 7, "credential": "DEA Registration"}) == ("7", "DEA Registration")
+    assert ledger_expiry({"expiry_date": "2026-03-01", "days_remaining": 5}) == EXPIRY
+    assert ledger_expiry({"days_remaining": 10}, today=EXPIRY) == EXPIRY + 10
+    assert ledger_expiry({}) is None
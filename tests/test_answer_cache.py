@@ -0,0 +1,76 @@
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from credentialwatch_agent import answer_cache as answer_cache_module
+from credentialwatch_agent.answer_cache import AnswerCache
+
+@pytest.fixture
+def cache(monkeypatch):
+    monkeypatch.setattr(answer_cache_module, "mcp_client", SimpleNamespace(tools_version=3))
+    monkeypatch.setattr(answer_cache_module, "_model_name", lambda: "test-model")
+    return AnswerCache(enabled=True, ttl_seconds=600, max_entries=10, max_bytes=10_000)
+
+def turn(question, *tools, answer="Done."):
+    messages = [HumanMessage(question)]
+    for number, tool in enumerate(tools):
+        messages.append(AIMessage("", tool_calls=[{"name": tool, "args": {}, "id": str(number)}]))
+        messages.append(ToolMessage("{}", name=tool, tool_call_id=str(number)))
+    messages.append(AIMessage(answer))
+    return messages
+
+def store(cache, question, *tools):
+    key = cache.key(question)
+    assert cache.put(key, cache.generations(), turn(question, *tools))
+    return key
+
+def test_questions_are_normalized_into_the_key(cache):
+    key = cache.key("  How many OPEN alerts   are there?? ")
+    assert key == ("how many open alerts are there", 3, "test-model")
+    assert cache.key("how many open alerts are there") == key
+
+def test_questions_that_refer_back_to_the_conversation_are_not_cached(cache):
+    for question in ("What are their licenses?", "Show me the same for Texas", "And what about it?", "Anyone else?"):
+        assert cache.key(question) is None
+    # Whole words only.
+    assert cache.key("List items expiring this month") is not None
+    assert AnswerCache(enabled=False).key("How many open alerts are there?") is None
+
+def test_write_tool_call_drops_the_answers_it_made_stale(cache):
+    alerts = store(cache, "How many open alerts are there?", "get_open_alerts")
+    provider = store(cache, "Who is NPI 1234567890?", "npi_mcp_get_provider_by_npi_tool")
+    expiring = store(cache, "What expires this week?", "list_expiring_credentials")
+    assert cache.get(alerts) == "Done."
+
+    cache.on_tool_call("log_alert", 0.01, True)
+
+    assert cache.get(alerts) is None
+    # Registry lookups and reads log_alert does not touch are kept.
+    assert cache.get(provider) == "Done."
+    assert cache.get(expiring) == "Done."
+    assert cache.stats()["invalidations"] == 1
+
+def test_untracked_read_tools_are_dropped_by_any_write(cache):
+    summary = store(cache, "Summarize alerts", "summarize_alerts")
+    cache.on_tool_call("mark_alert_resolved", 0.01, True)
+    assert cache.get(summary) is None
+
+def test_write_during_the_turn_keeps_the_answer_out(cache):
+    key = cache.key("How many open alerts are there?")
+    generations = cache.generations()
+    cache.on_tool_call("log_alerts", 0.01, True)
+    assert not cache.put(key, generations, turn("How many open alerts are there?", "get_open_alerts"))
+
+def test_turns_that_wrote_are_not_cached(cache):
+    key = cache.key("Log an alert for NPI 1234567890")
+    assert not cache.put(key, cache.generations(), turn("Log an alert for NPI 1234567890", "log_alert"))
+
+def test_sweep_worker_alerts_invalidate_the_parent_cache(cache, monkeypatch):
+    from credentialwatch_agent import sweep_partitions
+
+    alerts = store(cache, "How many open alerts are there?", "get_open_alerts")
+    monkeypatch.setattr(answer_cache_module, "answer_cache", cache)
+    monkeypatch.setattr("credentialwatch_agent.mcp_client.mcp_client", SimpleNamespace(invalidate_for_write=lambda name: 0))
+    sweep_partitions._invalidate_worker_writes()
+    assert cache.get(alerts) is None
@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+from langchain_core.tools import StructuredTool, ToolException
+
+from credentialwatch_agent.cassette import CassettePlayer, CassetteRecorder
+
+SCHEMA = {"type": "object", "properties": {"npi": {"type": "string"}}, "required": ["npi"]}
+
+async def get_provider_by_npi(npi: str):
+    return {"npi": npi}
+
+TOOL = StructuredTool(name="npi_mcp_get_provider_by_npi_tool", description="Looks up a provider.", args_schema=SCHEMA, coroutine=get_provider_by_npi)
+
+@pytest.fixture(params=["cassette.jsonl", "cassette.jsonl.gz"])
+def cassette(tmp_path, request):
+    path = str(tmp_path / request.param)
+    recorder = CassetteRecorder(path)
+    recorder.record_tools([TOOL])
+    for npi, result in (("1", {"npi": "1", "name": "first"}), ("1", {"npi": "1", "name": "second"}), ("2", {"npi": "2"})):
+        recorder.record_call("npi", TOOL.name, {"npi": npi}, 0.0, 0.01, result=result)
+    recorder.record_call("npi", TOOL.name, {"npi": "3"}, 0.0, 0.01, error=RuntimeError("upstream 503"))
+    recorder.close()
+    return path
+
+def replay(player, npi):
+    [tool] = player.tools()
+    return asyncio.run(tool.ainvoke({"npi": npi}))
+
+def test_replay_serves_recorded_responses_in_order(cassette, monkeypatch):
+    monkeypatch.delenv("MCP_CASSETTE_STRICT", raising=False)
+    player = CassettePlayer(cassette, latency_scale=0)
+    [tool] = player.tools()
+    assert tool.name == TOOL.name and tool.description == TOOL.description
+    assert tool.args_schema == SCHEMA
+    assert replay(player, "1")["name"] == "first"
+    assert replay(player, "1")["name"] == "second"
+    # The last response repeats once the recorded ones run out.
+    assert replay(player, "1")["name"] == "second"
+    assert replay(player, "2") == {"npi": "2"}
+    assert player.stats()["exact_matches"] == 4
+
+def test_recorded_errors_are_replayed(cassette):
+    with pytest.raises(ToolException, match="upstream 503"):
+        asyncio.run(CassettePlayer(cassette, latency_scale=0).play(TOOL.name, {"npi": "3"}))
+
+def test_unrecorded_request_fails_by_default(cassette, monkeypatch):
+    monkeypatch.delenv("MCP_CASSETTE_STRICT", raising=False)
+    player = CassettePlayer(cassette, latency_scale=0)
+    assert player.strict
+    with pytest.raises(ToolException, match="no recorded call"):
+        asyncio.run(player.play(TOOL.name, {"npi": "9"}))
+
+def test_lenient_matching_is_opt_in(cassette, monkeypatch):
+    monkeypatch.setenv("MCP_CASSETTE_STRICT", "false")
+    player = CassettePlayer(cassette, latency_scale=0)
+    assert asyncio.run(player.play(TOOL.name, {"npi": "9"}))["name"] == "first"
+    assert player.stats()["fallback_matches"] == 1
@@ -0,0 +1,90 @@
+import asyncio
+import operator
+from types import SimpleNamespace
+from typing import Annotated, List, TypedDict
+
+import pytest
+from langgraph.graph import END, StateGraph
+
+from credentialwatch_agent import checkpointer as checkpointer_module
+from credentialwatch_agent.checkpointer import RetentionPolicy, create_chat_checkpointer, checkpointer_stats
+
+class ChatState(TypedDict):
+    turns: Annotated[List[str], operator.add]
+
+def build_graph(saver):
+    graph = StateGraph(ChatState)
+    graph.add_node("reply", lambda state: {"turns": ["reply"]})
+    graph.set_entry_point("reply")
+    graph.add_edge("reply", END)
+    return graph.compile(checkpointer=saver)
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=1000.0)
+    fake_time = SimpleNamespace(monotonic=lambda: clock.now, time=lambda: clock.now)
+    monkeypatch.setattr(checkpointer_module, "time", fake_time)
+    return clock
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path, monkeypatch):
+    monkeypatch.setenv("CHAT_CHECKPOINT_PATH", str(tmp_path / "chat.db"))
+    return request.param
+
+def run_turns(backend, policy, turns, clock):
+    """Runs (thread_id, seconds to advance first) turns and returns the stats and the threads with state."""
+
+    async def run():
+        saver = create_chat_checkpointer(backend, policy)
+        graph = build_graph(saver)
+        threads = set()
+        for thread_id, advance in turns:
+            clock.now += advance
+            threads.add(thread_id)
+            await graph.ainvoke({"turns": ["user"]}, {"configurable": {"thread_id": thread_id}})
+        kept = {
+            thread_id for thread_id in threads
+            if await saver.aget_tuple({"configurable": {"thread_id": thread_id}}) is not None
+        }
+        stats = await checkpointer_stats(saver)
+        if backend == "sqlite":
+            await saver.conn.close()
+        return stats, kept
+
+    return asyncio.run(run())
+
+def test_least_recently_used_threads_beyond_the_cap_are_evicted(backend, clock):
+    policy = RetentionPolicy(ttl_seconds=0, max_threads=3, keep_checkpoints=0)
+    # "a" is used again before "d" and "e" arrive, so "b" and "c" are the oldest.
+    turns = [("a", 1), ("b", 1), ("c", 1), ("a", 1), ("d", 1), ("e", 1)]
+    stats, kept = run_turns(backend, policy, turns, clock)
+    assert kept == {"a", "d", "e"}
+    assert stats["threads"] == 3
+    assert stats["evicted_threads"] == 2
+
+def test_idle_threads_expire_after_the_ttl(backend, clock):
+    policy = RetentionPolicy(ttl_seconds=60, max_threads=0, keep_checkpoints=0)
+    turns = [("idle", 0), ("active", 30), ("active", 40), ("new", 1)]
+    stats, kept = run_turns(backend, policy, turns, clock)
+    assert kept == {"active", "new"}
+    assert stats["evicted_threads"] == 1
+
+def test_old_checkpoints_are_pruned_and_the_latest_state_survives(backend, clock):
+    policy = RetentionPolicy(ttl_seconds=0, max_threads=0, keep_checkpoints=2)
+
+    async def run():
+        saver = create_chat_checkpointer(backend, policy)
+        graph = build_graph(saver)
+        config = {"configurable": {"thread_id": "t"}}
+        for _ in range(3):
+            await graph.ainvoke({"turns": ["user"]}, config)
+        state = await graph.aget_state(config)
+        checkpoints = [c async for c in saver.alist(config)]
+        if backend == "sqlite":
+            await saver.conn.close()
+        return state.values["turns"], len(checkpoints), saver.pruned_checkpoints
+
+    turns, checkpoints, pruned = asyncio.run(run())
+    assert turns == ["user", "reply"] * 3
+    assert checkpoints == 2
+    assert pruned > 0
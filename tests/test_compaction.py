@@ -0,0 +1,65 @@
+import json
+
+from credentialwatch_agent.compaction import compact_tool_result
+
+PROVIDER = {
+    "npi": "1234567890",
+    "full_name": "Dana Reyes",
+    "enumeration_type": "NPI-1",
+    "primary_specialty": "Cardiology",
+    "primary_address": {"address_1": "1 Main St", "city": "Austin", "state": "TX", "postal_code": "78701"},
+    "other_names": [{"name": "D. Reyes"}],
+    "licenses": [{"state": "TX", "number": "L123", "taxonomy": "207RC0000X"}],
+}
+
+def compact(tool_name, result, **kwargs):
+    return json.loads(compact_tool_result(tool_name, result, **kwargs))
+
+def test_list_result_rows_are_projected_and_capped():
+    rows = [dict(PROVIDER, npi=str(i)) for i in range(15)]
+    result = compact("npi_mcp_search_providers_tool", rows, max_bytes=0)
+    assert result["more_not_shown"] == 5
+    assert len(result["results"]) == 10
+    assert result["results"][0] == {
+        "npi": "0", "full_name": "Dana Reyes", "primary_specialty": "Cardiology",
+        "primary_address": {"city": "Austin", "state": "TX"},
+    }
+
+def test_short_list_result_has_no_marker():
+    result = compact("search_providers", [PROVIDER], max_bytes=0)
+    assert isinstance(result, list) and len(result) == 1
+    assert result[0]["npi"] == PROVIDER["npi"]
+
+def test_record_is_projected_and_keeps_its_lists():
+    result = compact("npi_mcp_get_provider_by_npi_tool", PROVIDER, max_bytes=0)
+    assert result == {
+        "npi": "1234567890", "full_name": "Dana Reyes", "enumeration_type": "NPI-1",
+        "primary_specialty": "Cardiology", "primary_address": {"city": "Austin", "state": "TX"},
+        "licenses": PROVIDER["licenses"],
+    }
+
+def test_lists_inside_a_record_are_capped_with_a_marker():
+    record = dict(PROVIDER, licenses=[{"state": "TX", "number": str(i)} for i in range(5)])
+    result = compact("get_provider_by_npi", record, max_rows=2, max_bytes=0)
+    assert result["licenses"] == record["licenses"][:2]
+    assert result["licenses_more_not_shown"] == 3
+
+def test_wrapper_dict_projects_the_rows_of_its_lists():
+    rows = [dict(PROVIDER, npi=str(i)) for i in range(12)]
+    result = compact("search_providers", {"results": rows, "result_count": 12}, max_bytes=0)
+    assert result["result_count"] == 12
+    assert result["results_more_not_shown"] == 2
+    assert result["results"][0]["primary_address"] == {"city": "Austin", "state": "TX"}
+    assert "licenses" not in result["results"][0]
+
+def test_unlisted_tool_keeps_every_field():
+    rows = [{"credential_id": i, "notes": "x"} for i in range(3)]
+    assert compact("list_expiring_credentials", {"expiring": rows, "total": 3}, max_bytes=0) == {"expiring": rows, "total": 3}
+
+def test_error_results_pass_through():
+    assert compact("get_provider_by_npi", {"error": "No provider found."}) == {"error": "No provider found."}
+
+def test_oversized_result_is_truncated_with_a_marker():
+    text = compact_tool_result("list_expiring_credentials", {"expiring": [{"name": "x" * 100}] * 5}, max_bytes=200)
+    assert len(text.encode("utf-8")) <= 200
+    assert text.endswith("chars total]")
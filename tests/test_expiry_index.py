@@ -0,0 +1,101 @@
+import asyncio
+from datetime import date, timedelta
+
+import pytest
+
+from credentialwatch_agent import expiry_index as expiry_index_module
+from credentialwatch_agent.expiry_index import ExpiryIndex
+
+TODAY = date.today()
+
+class FakeCredDb:
+    """
+    list_expiring_credentials with an updated_since cursor that, like a real database
+    query, only returns updated credentials still inside the window.
+    """
+
+    def __init__(self):
+        self.credentials = {}
+        self.version = 0
+        self.calls = []
+
+    def put(self, credential_id, days):
+        self.version += 1
+        self.credentials[credential_id] = {
+            "credential_id": credential_id,
+            "provider_id": credential_id,
+            "credential": "DEA",
+            "expiry_date": (TODAY + timedelta(days=days)).isoformat(),
+            "version": self.version,
+        }
+
+    def get_tool_schema(self, server_name, tool_name):
+        return {"properties": {"window_days": {}, "updated_since": {}}}
+
+    async def call_tool(self, server_name, tool_name, arguments):
+        self.calls.append(arguments)
+        end = (TODAY + timedelta(days=arguments["window_days"])).isoformat()
+        since = int(arguments.get("updated_since") or 0)
+        rows = [
+            dict(row) for row in self.credentials.values()
+            if row["expiry_date"] <= end and row["version"] > since
+        ]
+        return {"expiring": rows, "total": len(rows), "sync_cursor": str(self.version)}
+
+@pytest.fixture
+def cred_db(monkeypatch):
+    cred_db = FakeCredDb()
+    for credential_id, days in ((1, 10), (2, 20), (3, 200)):
+        cred_db.put(credential_id, days)
+    monkeypatch.setattr(expiry_index_module, "mcp_client", cred_db)
+    return cred_db
+
+def ids(result):
+    return [row["credential_id"] for row in result["expiring"]]
+
+def test_incremental_updates_miss_renewals_that_leave_the_window(cred_db):
+    index = ExpiryIndex(enabled=True, horizon_days=365, max_age=0)
+
+    async def run():
+        assert ids(await index.query(30)) == [1, 2]
+        cred_db.put(1, 900)
+        return await index.query(30)
+
+    # The update query no longer returns the renewed credential, so the index keeps it.
+    assert ids(asyncio.run(run())) == [1, 2]
+
+def test_fresh_query_drops_credentials_the_server_no_longer_returns(cred_db):
+    index = ExpiryIndex(enabled=True, horizon_days=365, max_age=60)
+
+    async def run():
+        assert ids(await index.query(30)) == [1, 2]
+        cred_db.put(1, 900)
+        cred_db.put(3, 5)
+        return await index.query(30, fresh=True)
+
+    assert ids(asyncio.run(run())) == [3, 2]
+    assert cred_db.calls[-1] == {"window_days": 30}
+    assert index.evicted == 1
+    assert index.stats()["credentials"] == 2
+
+def test_fresh_query_keeps_pending_writes_for_the_next_refresh(cred_db):
+    index = ExpiryIndex(enabled=True, horizon_days=365, max_age=60)
+
+    async def run():
+        await index.query(30)
+        index.on_tool_call("add_or_update_credential", 0.01, True)
+        await index.query(30, fresh=True)
+        return index._needs_refresh(30)
+
+    assert asyncio.run(run())
+
+def test_full_sync_interval_rehydrates(cred_db):
+    index = ExpiryIndex(enabled=True, horizon_days=365, max_age=0, full_sync_interval=0)
+
+    async def run():
+        await index.query(30)
+        cred_db.put(1, 900)
+        return await index.query(30)
+
+    assert ids(asyncio.run(run())) == [2]
+    assert index.hydrations == 2
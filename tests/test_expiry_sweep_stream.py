@@ -0,0 +1,122 @@
+import asyncio
+
+import pytest
+
+from credentialwatch_agent.agents import expiry_sweep
+
+PAGES = 20
+
+@pytest.fixture
+def pages(monkeypatch):
+    fetched = []
+
+    async def page_expiring_credentials(window_days, page_size, position=None):
+        # One credential per page and no total, like a server that only returns cursors.
+        for number in range((position or {}).get("offset", 0), PAGES):
+            fetched.append(number)
+            yield [{"provider_id": number, "credential_id": number, "credential": "DEA", "days_remaining": 10}], {"offset": number + 1, "cursor": str(number + 1)}, None
+
+    monkeypatch.setattr(expiry_sweep, "_page_expiring_credentials", page_expiring_credentials)
+    monkeypatch.setattr(expiry_sweep, "SWEEP_QUEUE_PAGES", 1)
+    return fetched
+
+def other_tasks():
+    return [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+
+@pytest.fixture
+def alerted(monkeypatch):
+    alerted = []
+
+    async def alert_items(batch, semaphore, full):
+        alerted.extend(batch.credential_ids)
+        return len(batch), [], 0
+
+    monkeypatch.setattr(expiry_sweep, "_alert_items", alert_items)
+    return alerted
+
+def test_all_pages_are_alerted(pages, alerted):
+    result = asyncio.run(expiry_sweep.stream_expiring_credentials({}))
+    assert result["pages_fetched"] == PAGES
+    assert result["alerts_created"] == PAGES
+    assert result["page_position"] == {"offset": PAGES, "cursor": str(PAGES), "done": True}
+
+def test_each_step_records_where_paging_resumes(pages, alerted, monkeypatch):
+    monkeypatch.setattr(expiry_sweep, "SWEEP_CHECKPOINT_CHUNK", 3)
+    state = asyncio.run(expiry_sweep.stream_expiring_credentials({}))
+    assert state["page_position"] == {"offset": 3, "cursor": "3", "done": False}
+    assert alerted == [0, 1, 2]
+    assert len(pages) == 3
+
+    # Without a total from the server, each step handles as many items as all earlier ones.
+    state = asyncio.run(expiry_sweep.stream_expiring_credentials(state))
+    assert alerted == list(range(6))
+    assert state["alerts_cursor"] == state["items_scanned"] == 6
+    assert expiry_sweep.pages_remaining(state) == "stream_expiring_credentials"
+
+def test_streaming_graph_loops_until_the_last_page(pages, alerted, monkeypatch):
+    monkeypatch.setattr(expiry_sweep, "SWEEP_CHECKPOINT_CHUNK", 3)
+    graph = expiry_sweep.build_expiry_sweep_graph(streaming=True)
+    state = asyncio.run(graph.ainvoke({"window_days": 90, "page_position": {}, "alerts_cursor": 0}))
+    assert alerted == list(range(PAGES))
+    assert state["alerts_created"] == state["pages_fetched"] == PAGES
+    assert state["page_position"]["done"]
+
+def test_failed_consumer_stops_the_producer(pages, monkeypatch):
+    async def alert_items(batch, semaphore, full):
+        raise RuntimeError("alert service down")
+
+    monkeypatch.setattr(expiry_sweep, "_alert_items", alert_items)
+
+    async def run():
+        with pytest.raises(RuntimeError):
+            await expiry_sweep.stream_expiring_credentials({})
+        return other_tasks()
+
+    assert asyncio.run(run()) == []
+    # The producer stopped at the full queue instead of fetching every page.
+    assert len(pages) < PAGES
+
+def test_cancelled_sweep_does_not_leave_the_producer_blocked(pages, monkeypatch):
+    started = asyncio.Event()
+
+    async def alert_items(batch, semaphore, full):
+        started.set()
+        await asyncio.sleep(3600)
+
+    monkeypatch.setattr(expiry_sweep, "_alert_items", alert_items)
+
+    async def run():
+        sweep = asyncio.create_task(expiry_sweep.stream_expiring_credentials({}))
+        await started.wait()
+        sweep.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await sweep
+        return other_tasks()
+
+    assert asyncio.run(asyncio.wait_for(run(), 5)) == []
+
+class UnpagedCredDb:
+    def __init__(self):
+        self.calls = 0
+
+    def get_tool_schema(self, server_name, tool_name):
+        return {"properties": {"window_days": {}}}
+
+    async def call_tool(self, server_name, tool_name, arguments):
+        self.calls += 1
+        return {"expiring": [{"credential_id": number} for number in range(PAGES)], "total": PAGES}
+
+def test_unpaged_server_is_fetched_once(monkeypatch):
+    cred_db = UnpagedCredDb()
+    monkeypatch.setattr(expiry_sweep, "mcp_client", cred_db)
+    assert not expiry_sweep.supports_paging()
+
+    async def run():
+        return [page async for page in expiry_sweep._page_expiring_credentials(90, 3, {"offset": 5})]
+
+    pages = asyncio.run(run())
+    assert cred_db.calls == 1
+    assert len(pages) == 1
+    page, position, total = pages[0]
+    assert [item["credential_id"] for item in page] == list(range(5, PAGES))
+    assert position == {"offset": PAGES, "cursor": None} and total == PAGES
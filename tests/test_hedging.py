@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+from credentialwatch_agent.hedging import HEDGEABLE_TOOLS, Hedger, call_deadline
+from credentialwatch_agent.result_cache import INVALIDATES
+
+SERVER, TOOL = "npi", "get_provider_by_npi"
+
+def hedger(**kwargs):
+    options = dict(enabled=True, budget=1.0, burst=5, percentile=95, min_samples=10, min_delay=0.01, window=100)
+    options.update(kwargs)
+    hedger = Hedger(**options)
+    for _ in range(10):
+        hedger.record(SERVER, TOOL, 0.02)
+    return hedger
+
+def attempts(*delays, results=None):
+    """attempt() whose n-th call sleeps delays[n] and returns n (or raises results[n] if it is an exception)."""
+    calls = []
+
+    async def attempt():
+        number = len(calls)
+        calls.append(number)
+        await asyncio.sleep(delays[number])
+        outcome = (results or {}).get(number, number)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+    return attempt, calls
+
+def test_hedge_delay_needs_samples_and_follows_the_percentile():
+    fresh = Hedger(enabled=True, min_samples=10, min_delay=0.01, percentile=95)
+    assert fresh.hedge_delay(SERVER, TOOL) is None
+    assert hedger().hedge_delay(SERVER, TOOL) == 0.02
+    assert hedger(min_delay=0.5).hedge_delay(SERVER, TOOL) == 0.5
+
+def test_slow_call_is_hedged_and_the_faster_answer_wins():
+    h = hedger()
+    attempt, calls = attempts(1.0, 0.0)
+    assert asyncio.run(h.run(SERVER, TOOL, attempt)) == 1
+    assert calls == [0, 1]
+    assert (h.hedges, h.wins) == (1, 1)
+
+def test_fast_call_is_not_hedged():
+    h = hedger()
+    attempt, calls = attempts(0.0)
+    assert asyncio.run(h.run(SERVER, TOOL, attempt)) == 0
+    assert calls == [0] and h.hedges == 0
+
+def test_exhausted_budget_skips_the_hedge():
+    h = hedger(budget=0.5, burst=1)
+    attempt, calls = attempts(0.05, 0.0)
+    # The first call earns half a hedge, which is not enough to send one.
+    assert asyncio.run(h.run(SERVER, TOOL, attempt)) == 0
+    assert calls == [0] and h.skipped_budget == 1
+
+def test_deadline_too_close_for_a_typical_answer_skips_the_hedge():
+    h = hedger()
+    for _ in range(20):
+        h.record(SERVER, TOOL, 0.5)
+    h.min_delay = 0.0
+    h.percentile = 0
+    attempt, calls = attempts(0.05, 0.0)
+
+    async def run():
+        with call_deadline(0.2):
+            return await h.run(SERVER, TOOL, attempt)
+
+    assert asyncio.run(run()) == 0
+    assert calls == [0] and h.skipped_deadline == 1
+
+def test_failed_or_cancelled_attempt_waits_for_the_other_one():
+    for failure in (RuntimeError("reset"), asyncio.CancelledError()):
+        h = hedger()
+        attempt, calls = attempts(0.05, 0.1, results={0: failure})
+        assert asyncio.run(h.run(SERVER, TOOL, attempt)) == 1
+        assert h.wins == 1
+
+def test_both_attempts_failing_raises():
+    h = hedger()
+    attempt, _ = attempts(0.05, 0.0, results={0: RuntimeError("first"), 1: RuntimeError("second")})
+    with pytest.raises(RuntimeError):
+        asyncio.run(h.run(SERVER, TOOL, attempt))
+
+def test_write_tools_are_never_hedged():
+    h = hedger()
+    assert h.can_hedge(TOOL)
+    for tool in INVALIDATES:
+        assert tool not in HEDGEABLE_TOOLS
+        assert not h.can_hedge(tool)
+    assert not Hedger(enabled=False).can_hedge(TOOL)
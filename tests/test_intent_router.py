@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+
+from credentialwatch_agent import intent_router
+from credentialwatch_agent.intent_router import match_intent
+
+def expiring(window_days, specialty=None, credential=None):
+    return "expiring_credentials", {"window_days": window_days, "specialty": specialty, "credential": credential}
+
+@pytest.mark.parametrize("question, intent", [
+    ("Who has credentials expiring in the next 60 days?", expiring(60)),
+    ("which credentials expire in the next 2 weeks", expiring(14)),
+    ("who has credentials expiring in the next 60 days in Cardiology", expiring(60, "cardiology")),
+    ("which providers in cardiology have licenses expiring in 30 days", expiring(30, "cardiology", "license")),
+    ("which licenses expire in 30 days", expiring(30, credential="license")),
+    ("who has DEA registrations expiring in 3 months", expiring(90, credential="dea")),
+    ("show me the snapshot for NPI 1234567890", ("provider_snapshot", {"npi": "1234567890"})),
+])
+def test_templated_questions_match(question, intent):
+    assert match_intent(question) == intent
+
+@pytest.mark.parametrize("question", [
+    "who has credentials expiring in 90 days in the last year",
+    "who has credentials expiring in the next 60 days and log alerts",
+    "which credentials expired 30 days ago",
+    "who has credentials expiring in 0 days",
+    "credentials expiring soon?",
+    "what is the weather",
+])
+def test_other_questions_do_not_match(question):
+    assert match_intent(question) is None
+
+ROWS = [
+    {"provider_id": 1, "name": "A", "credential": "State Medical License", "expiry_date": "2026-11-01", "days_remaining": 14},
+    {"provider_id": 2, "name": "B", "credential": "DEA Registration", "expiry_date": "2026-11-02", "days_remaining": 15},
+]
+
+class FakeIndex:
+    def __init__(self, result=None, recognized=True):
+        self.result = result
+        self.recognized = recognized
+
+    async def query(self, window_days, taxonomy=None, credential=None, limit=None):
+        return self.result
+
+    def recognizes(self, taxonomy=None, credential=None):
+        return self.recognized
+
+class FakeCredDb:
+    def __init__(self, result, schema=None):
+        self.result = result
+        self.schema = schema or {}
+        self.calls = []
+
+    def get_tool_schema(self, server_name, tool_name):
+        return {"properties": self.schema}
+
+    async def call_tool(self, server_name, tool_name, arguments):
+        self.calls.append((tool_name, arguments))
+        return self.result
+
+@pytest.fixture
+def use(monkeypatch):
+    def use(index, cred_db=None):
+        monkeypatch.setattr(intent_router, "expiry_index", index)
+        monkeypatch.setattr(intent_router, "mcp_client", cred_db or FakeCredDb({}))
+        return cred_db
+    return use
+
+def route(question):
+    return asyncio.run(intent_router.route(question))
+
+def test_answers_from_the_index(use):
+    use(FakeIndex({"expiring": ROWS, "total": 2}))
+    assert route("who has credentials expiring in the next 30 days").startswith("**2 credentials expire in the next 30 days**")
+
+def test_unknown_specialty_falls_back_to_the_agent(use):
+    use(FakeIndex({"expiring": [], "total": 0}, recognized=False))
+    assert route("who has credentials expiring in the next 30 days in astrology") is None
+
+def test_credential_filter_is_applied_without_the_index(use):
+    use(FakeIndex(None), FakeCredDb({"expiring": ROWS, "total": 2}))
+    answer = route("which licenses expire in 30 days")
+    assert answer.startswith("**1 license credential expires in the next 30 days**")
+    assert "DEA" not in answer
+
+def test_limit_is_only_sent_when_the_tool_takes_it(use):
+    cred_db = use(FakeIndex(None), FakeCredDb({"expiring": ROWS}))
+    route("who has credentials expiring in the next 30 days")
+    assert cred_db.calls == [("list_expiring_credentials", {"window_days": 30})]
+
+def test_total_is_a_lower_bound_when_the_server_does_not_report_it(use, monkeypatch):
+    monkeypatch.setattr(intent_router, "INTENT_ROUTER_MAX_ROWS", 2)
+    cred_db = use(FakeIndex(None), FakeCredDb({"expiring": ROWS}, schema={"limit": {}}))
+    answer = route("who has credentials expiring in the next 30 days")
+    assert cred_db.calls[0][1] == {"window_days": 30, "limit": 2}
+    assert answer.startswith("**At least 2 credentials expire")
+
+def test_filtered_question_with_cut_off_rows_falls_back(use, monkeypatch):
+    monkeypatch.setattr(intent_router, "INTENT_ROUTER_MAX_LOOKUPS", 1)
+    use(FakeIndex(None), FakeCredDb({"expiring": ROWS * 2, "total": 10}, schema={"limit": {}}))
+    assert route("which licenses expire in 30 days") is None
+
+def test_tool_errors_fall_back(use):
+    use(FakeIndex(None), FakeCredDb({"error": "cred_db is down"}))
+    assert route("who has credentials expiring in the next 30 days") is None
@@ -0,0 +1,87 @@
+import re
+import math
+
+import pytest
+
+from credentialwatch_agent import metrics
+from credentialwatch_agent.metrics import Counter, Gauge, Histogram, MetricsRegistry, _Metric
+
+# Prometheus text exposition format 0.0.4.
+_NAME = r"[a-zA-Z_:][a-zA-Z0-9_:]*"
+_LABEL = r'[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\\n]|\\[\\"n])*"'
+_HELP = re.compile(rf"# HELP ({_NAME}) (.*)")
+_TYPE = re.compile(rf"# TYPE ({_NAME}) (counter|gauge|histogram|summary|untyped)")
+_SAMPLE = re.compile(rf"({_NAME})(\{{(?:{_LABEL}(?:,{_LABEL})*)?\}})? (\S+)")
+_SUFFIXES = {"counter": ("_total",), "gauge": ("",), "histogram": ("_bucket", "_sum", "_count"), "untyped": ("",)}
+
+def parse(text):
+    """Parses exposition text into {family: (type, [(sample name, labels, value)])}, failing on anything malformed."""
+    assert text.endswith("\n")
+    families = {}
+    current = None
+    for line in text.splitlines():
+        if line.startswith("# HELP"):
+            match = _HELP.fullmatch(line)
+            assert match, line
+            assert match.group(1) not in families, f"duplicate family {match.group(1)}"
+            current = match.group(1)
+        elif line.startswith("# TYPE"):
+            match = _TYPE.fullmatch(line)
+            assert match and match.group(1) == current, line
+            families[current] = (match.group(2), [])
+        else:
+            match = _SAMPLE.fullmatch(line)
+            assert match, line
+            name, labels, value = match.groups()
+            kind, samples = families[current]
+            assert name in {current + suffix for suffix in _SUFFIXES[kind]}, f"{name} in family {current}"
+            parsed = float(value)
+            assert not math.isnan(parsed), line
+            samples.append((name, dict(re.findall(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"', labels or "")), parsed))
+    return families
+
+def test_metric_classes_must_implement_samples():
+    with pytest.raises(TypeError):
+        _Metric("credentialwatch_incomplete", "No samples.")
+
+def test_rendered_metrics_parse_as_prometheus_text():
+    registry = MetricsRegistry()
+    calls = registry.counter("test_calls", "Calls.", ("tool", "status"))
+    calls.inc(tool='say "hi"\nback\\slash', status="ok")
+    calls.inc(2, tool="search", status="error")
+    latency = registry.histogram("test_seconds", "Latency.", ("tool",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        latency.observe(value, tool="search")
+    registry.gauge("test_depth", "Queue depth.").set(3)
+    registry.add_collector(lambda: metrics.stats_gauges("test_cache", "Cache", {"hits": 4, "hit_rate": 0.5, "enabled": True, "path": "x"}))
+
+    families = parse(registry.render())
+
+    assert families["test_calls"] == ("counter", [
+        ("test_calls_total", {"tool": 'say \\"hi\\"\\nback\\\\slash', "status": "ok"}, 1.0),
+        ("test_calls_total", {"tool": "search", "status": "error"}, 2.0),
+    ])
+    kind, samples = families["test_seconds"]
+    buckets = [(labels["le"], value) for name, labels, value in samples if name == "test_seconds_bucket"]
+    assert kind == "histogram"
+    assert buckets == [("0.1", 1.0), ("1", 2.0), ("+Inf", 3.0)]
+    assert ("test_seconds_count", {"tool": "search"}, 3.0) in samples
+    assert families["test_depth"] == ("gauge", [("test_depth", {}, 3.0)])
+    assert set(families) == {"test_calls", "test_seconds", "test_depth", "test_cache_hits", "test_cache_hit_rate"}
+
+def test_metrics_endpoint_serves_the_global_registry():
+    from fastapi.testclient import TestClient
+    from credentialwatch_agent.main import create_app
+
+    metrics.mcp_requests.inc(server="npi", tool="search_providers", outcome="ok")
+    metrics.mcp_request_seconds.observe(0.2, server="npi", tool="search_providers")
+    # Without a `with` block the lifespan (and its MCP connections) does not run.
+    response = TestClient(create_app()).get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    families = parse(response.text)
+    assert families["credentialwatch_mcp_requests"][0] == "counter"
+    assert families["credentialwatch_mcp_request_seconds"][0] == "histogram"
+    # Collector gauges, e.g. the answer cache's, render in the same output.
+    assert families["credentialwatch_answer_cache_hits"][0] == "gauge"
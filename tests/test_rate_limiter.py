@@ -0,0 +1,91 @@
+import time
+import asyncio
+import email.utils
+from types import SimpleNamespace
+
+import pytest
+
+from credentialwatch_agent.rate_limiter import RateLimiter, RateLimits, retry_after_seconds
+
+def test_share_scales_configured_limits(monkeypatch):
+    monkeypatch.setenv("RATE_LIMIT_ALERT_RPS", "40")
+    monkeypatch.setenv("RATE_LIMIT_ALERT_BURST", "6")
+    limits = RateLimits(enabled=True)
+    assert (limits.get("alert").rate, limits.get("alert").burst) == (40, 6)
+    limits.set_share(1 / 4)
+    assert (limits.get("alert").rate, limits.get("alert").burst) == (10, 1.5)
+
+def test_shared_burst_still_allows_one_request():
+    limits = RateLimits(enabled=True, share=1 / 500)
+    assert limits.get("llm").burst == 1
+
+def grant_order(limiter, requests):
+    """Queues (priority, session, label) requests behind an empty bucket; returns labels in grant order."""
+    order = []
+
+    async def request(priority, session, label):
+        await limiter.acquire(priority, session)
+        order.append(label)
+
+    async def run():
+        await limiter.acquire("batch", "setup")  # empties the bucket, so everything below queues
+        tasks = []
+        for priority, session, label in requests:
+            tasks.append(asyncio.create_task(request(priority, session, label)))
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+    return order
+
+def test_interactive_requests_go_before_queued_batch_work():
+    limiter = RateLimiter("alert", rate=200, burst=1)
+    order = grant_order(limiter, [
+        ("batch", "sweep", "batch-1"), ("batch", "sweep", "batch-2"), ("interactive", "chat", "chat-1"),
+    ])
+    assert order == ["chat-1", "batch-1", "batch-2"]
+
+def test_sessions_are_served_round_robin():
+    limiter = RateLimiter("npi", rate=200, burst=1)
+    order = grant_order(limiter, [
+        ("interactive", "a", "a1"), ("interactive", "a", "a2"), ("interactive", "a", "a3"), ("interactive", "b", "b1"),
+    ])
+    assert order == ["a1", "b1", "a2", "a3"]
+
+class Throttled(Exception):
+    def __init__(self, retry_after):
+        super().__init__("429 Too Many Requests")
+        self.response = SimpleNamespace(status_code=429, headers={"retry-after": retry_after})
+
+def test_retry_after_pauses_the_limiter_before_retrying():
+    limits = RateLimits(enabled=True, max_retries=2)
+    attempts = []
+
+    async def call():
+        attempts.append(time.monotonic())
+        if len(attempts) == 1:
+            raise Throttled("0.2")
+        return "ok"
+
+    assert asyncio.run(limits.call("cred_db", call)) == "ok"
+    assert attempts[1] - attempts[0] >= 0.2
+    assert limits.get("cred_db").throttled == 1
+
+def test_retries_stop_after_max_retries():
+    limits = RateLimits(enabled=True, max_retries=1)
+
+    async def call():
+        raise Throttled("0")
+
+    with pytest.raises(Throttled):
+        asyncio.run(limits.call("cred_db", call))
+    assert limits.get("cred_db").throttled == 1
+
+def test_retry_after_header_formats(monkeypatch):
+    monkeypatch.setenv("RATE_LIMIT_DEFAULT_RETRY_AFTER", "3")
+    assert retry_after_seconds(Throttled("5")) == 5
+    assert retry_after_seconds(Throttled("")) == 3
+    later = email.utils.formatdate(time.time() + 30, usegmt=True)
+    assert 25 < retry_after_seconds(Throttled(later)) <= 30
+    # Errors without a 429/503 response are not retried.
+    assert retry_after_seconds(RuntimeError("boom")) is None
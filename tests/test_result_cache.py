@@ -0,0 +1,53 @@
+import asyncio
+
+from credentialwatch_agent.result_cache import ResultCache
+
+ARGS = {"provider_id": 7}
+
+def make_cache():
+    return ResultCache(ttls={"get_provider_snapshot": 60.0}, max_entries=16, max_bytes=1 << 20, enabled=True)
+
+def test_identical_calls_share_one_request():
+    cache = make_cache()
+    calls = []
+
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"expiry": "2026-01-01"}
+
+    async def run():
+        return await asyncio.gather(*(cache.get_or_call("get_provider_snapshot", ARGS, call) for _ in range(3)))
+
+    assert asyncio.run(run()) == [{"expiry": "2026-01-01"}] * 3
+    assert len(calls) == 1
+    assert cache.coalesced == 2
+
+def test_read_after_write_does_not_join_a_call_started_before_it():
+    cache = make_cache()
+    server = {"expiry": "2026-01-01"}
+    calls = []
+    sent = asyncio.Event()
+
+    async def call():
+        calls.append(1)
+        answer = dict(server)
+        sent.set()
+        await asyncio.sleep(0.02)
+        return answer
+
+    async def run():
+        before = asyncio.ensure_future(cache.get_or_call("get_provider_snapshot", ARGS, call))
+        await sent.wait()
+        server["expiry"] = "2028-01-01"
+        cache.invalidate_for_write("add_or_update_credential")
+        after = await cache.get_or_call("get_provider_snapshot", ARGS, call)
+        # A third read joins the post-write call or hits its cached result.
+        again = await cache.get_or_call("get_provider_snapshot", ARGS, call)
+        return await before, after, again
+
+    before, after, again = asyncio.run(run())
+    assert before == {"expiry": "2026-01-01"}
+    assert after == again == {"expiry": "2028-01-01"}
+    assert len(calls) == 2
+    assert cache.stats()["entries"] == 1
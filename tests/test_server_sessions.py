@@ -0,0 +1,152 @@
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from langchain_core.tools import ToolException
+from mcp.shared.exceptions import McpError
+from mcp.types import CONNECTION_CLOSED, ErrorData
+
+from credentialwatch_agent import server_sessions
+from credentialwatch_agent.server_sessions import (
+    CircuitBreaker, ServerSession, ServerUnavailableError, SessionClosedError, is_connection_failure,
+)
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(server_sessions.time, "monotonic", clock)
+    monkeypatch.setattr(server_sessions.random, "uniform", lambda low, high: 1.0)
+    return clock
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker("npi", failures=3, backoff=2, max_backoff=60)
+
+def open_breaker(breaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure(ConnectionError("refused"))
+
+def test_breaker_opens_after_consecutive_failures(breaker):
+    breaker.record_failure(ConnectionError("refused"))
+    breaker.record_failure(ConnectionError("refused"))
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.record_failure(ConnectionError("refused"))
+    assert breaker.state == "open"
+    assert breaker.last_error == "ConnectionError: refused"
+
+def test_success_resets_the_failure_count(breaker):
+    breaker.record_failure(ConnectionError("refused"))
+    breaker.record_failure(ConnectionError("refused"))
+    breaker.record_success()
+    breaker.record_failure(ConnectionError("refused"))
+    assert breaker.state == "closed"
+
+def test_open_breaker_fails_fast_until_the_backoff_ends(breaker, clock):
+    open_breaker(breaker)
+    with pytest.raises(ServerUnavailableError) as raised:
+        breaker.check()
+    assert raised.value.retry_in == pytest.approx(2)
+    assert breaker.rejected == 1
+    clock.now += 1.9
+    assert not breaker.allow()
+    clock.now += 0.2
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+
+def test_half_open_lets_one_probe_through(breaker, clock):
+    open_breaker(breaker)
+    clock.now += 2
+    assert breaker.allow()
+    assert not breaker.allow()
+
+def test_successful_probe_closes_the_breaker(breaker, clock):
+    open_breaker(breaker)
+    clock.now += 2
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow() and breaker.allow()
+
+def test_failed_probe_reopens_with_doubled_backoff(breaker, clock):
+    open_breaker(breaker)
+    clock.now += 2
+    assert breaker.allow()
+    breaker.record_failure(ConnectionError("refused"))
+    assert breaker.state == "open"
+    assert breaker.retry_in() == pytest.approx(4)
+    clock.now += 4
+    assert breaker.allow()
+    breaker.record_failure(ConnectionError("refused"))
+    assert breaker.retry_in() == pytest.approx(8)
+
+def test_backoff_is_capped(clock):
+    breaker = CircuitBreaker("npi", failures=1, backoff=2, max_backoff=5)
+    for _ in range(4):
+        breaker.record_failure(ConnectionError("refused"))
+        clock.now += breaker.retry_in()
+        breaker.allow()
+    assert breaker.retry_in() == 0
+    breaker.record_failure(ConnectionError("refused"))
+    assert breaker.retry_in() == pytest.approx(5)
+
+@pytest.mark.parametrize("error", [
+    ConnectionResetError("reset"),
+    EOFError(),
+    httpx.ConnectError("refused"),
+    McpError(ErrorData(code=CONNECTION_CLOSED, message="Connection closed")),
+    McpError(ErrorData(code=32600, message="Session terminated")),
+    ExceptionGroup("transport", [httpx.ReadError("eof")]),
+])
+def test_connection_failures(error):
+    assert is_connection_failure(error)
+
+@pytest.mark.parametrize("error", [
+    TimeoutError(),
+    RuntimeError("boom"),
+    McpError(ErrorData(code=-32603, message="Internal error")),
+    ToolException("no such provider"),
+])
+def test_other_errors_are_not_connection_failures(error):
+    assert not is_connection_failure(error)
+
+@pytest.fixture
+def session(clock):
+    client = SimpleNamespace(connections={"npi": {"transport": "stdio"}})
+    session = ServerSession("npi", client, breaker=CircuitBreaker("npi", failures=3, backoff=2))
+    session._session = object()
+    session._tools = {"search_providers": object()}
+    return session
+
+def test_tool_errors_do_not_count_against_the_server(session):
+    session.record_failure(ToolException("bad arguments"))
+    assert session.breaker.failures == 0
+    assert session.generation == 0
+    assert session._session is not None
+
+def test_connection_failure_resets_the_session(session):
+    session.record_failure(ConnectionResetError("reset"), 0)
+    assert session.breaker.consecutive_failures == 1
+    assert session.generation == 1
+    assert session._session is None and not session._tools
+
+def test_server_error_counts_but_keeps_the_session(session):
+    session.record_failure(McpError(ErrorData(code=-32603, message="Internal error")), 0)
+    assert session.breaker.consecutive_failures == 1
+    assert session.generation == 0
+    assert session._session is not None
+
+def test_calls_aborted_by_a_reset_are_not_counted(session):
+    # Two calls in flight on generation 0; the first failure resets the session.
+    session.record_failure(ConnectionResetError("reset"), 0)
+    with pytest.raises(SessionClosedError) as raised:
+        session.record_failure(McpError(ErrorData(code=CONNECTION_CLOSED, message="Connection closed")), 0)
+    assert isinstance(raised.value.__cause__, McpError)
+    assert session.breaker.consecutive_failures == 1
+    assert session.generation == 1
@@ -0,0 +1,28 @@
+import numpy as np
+
+from credentialwatch_agent.alert_ledger import ledger_expiry
+from credentialwatch_agent.sweep_batch import DEFAULT_DAYS_REMAINING, ExpiringBatch
+
+ROWS = [
+    {"provider_id": 1, "credential_id": 10, "name": "A", "credential": "DEA", "expiry_date": "2026-11-01", "days_remaining": 14},
+    {"provider_id": 2, "credential_id": 20, "name": "B", "credential": "State License", "expiry_date": "2026-12-01", "days_remaining": None},
+    {"provider_id": 3, "credential_id": 30, "name": "C", "credential": "DEA", "days_remaining": "soon"},
+    {"provider_id": 4, "credential_id": 40, "name": "D", "credential": "DEA"},
+]
+
+def test_unusable_days_remaining_fall_back_to_the_default():
+    batch = ExpiringBatch.from_rows(ROWS)
+    assert batch.days_remaining.tolist() == [14] + [DEFAULT_DAYS_REMAINING] * 3
+
+def test_expiry_dates_survive_state_and_row_access():
+    batch = ExpiringBatch.from_state(ExpiringBatch.from_rows(ROWS).to_state())
+    assert [row["expiry_date"] for row in batch.rows()] == ["2026-11-01", "2026-12-01", None, None]
+    assert batch.take(np.array([1, 0])).row(0)["expiry_date"] == "2026-12-01"
+    assert batch.slice(1, 2).expiry_dates == ["2026-12-01"]
+    # The ledger keys a renewal off the expiry date rather than days remaining.
+    assert ledger_expiry(batch.row(1), today=0) == ledger_expiry({"expiry_date": "2026-12-01"})
+
+def test_state_without_expiry_dates_still_loads():
+    state = ExpiringBatch.from_rows(ROWS).to_state()
+    del state["expiry_dates"]
+    assert ExpiringBatch.from_state(state).expiry_dates == [None] * len(ROWS)
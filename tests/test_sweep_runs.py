@@ -0,0 +1,31 @@
+import asyncio
+
+import pytest
+
+from credentialwatch_agent.sweep_runs import SweepInProgressError, sweep_lock
+
+def test_second_sweep_over_a_window_is_refused(tmp_path):
+    path = str(tmp_path / "sweeps.db")
+
+    async def run():
+        async with sweep_lock(30, "run-1", path=path):
+            with pytest.raises(SweepInProgressError):
+                async with sweep_lock(30, "run-2", path=path):
+                    pass
+            # Other windows are not locked.
+            async with sweep_lock(90, "run-3", path=path):
+                pass
+        async with sweep_lock(30, "run-2", path=path):
+            pass
+
+    asyncio.run(run())
+
+def test_stale_lock_is_taken_over(tmp_path):
+    path = str(tmp_path / "sweeps.db")
+
+    async def run():
+        async with sweep_lock(30, "run-1", path=path):
+            async with sweep_lock(30, "run-2", path=path, ttl_seconds=0):
+                pass
+
+    asyncio.run(run())
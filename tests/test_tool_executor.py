@@ -0,0 +1,79 @@
+import json
+import asyncio
+
+from langchain_core.tools import StructuredTool
+
+from credentialwatch_agent.hedging import remaining_time
+from credentialwatch_agent.tool_executor import DEFAULT_TOOL_TIMEOUTS, ToolExecutor, tool_timeout
+
+SCHEMA = {"type": "object", "properties": {"seconds": {"type": "number"}}}
+
+def sleeper(name, log):
+    async def sleep(seconds: float):
+        log.append(("start", name, remaining_time()))
+        await asyncio.sleep(seconds)
+        log.append(("end", name, None))
+        return {"slept": seconds}
+
+    return StructuredTool(name=name, description=name, args_schema=SCHEMA, coroutine=sleep)
+
+def call(name, seconds, call_id):
+    return {"name": name, "args": {"seconds": seconds}, "id": call_id}
+
+def test_tool_calls_run_concurrently_up_to_the_cap():
+    log = []
+    tools = {name: sleeper(name, log) for name in ("search_providers", "get_open_alerts", "get_provider_by_npi")}
+    executor = ToolExecutor(max_concurrency=2)
+    calls = [call("search_providers", 0.2, "1"), call("get_open_alerts", 0.2, "2"), call("get_provider_by_npi", 0.0, "3")]
+
+    messages = asyncio.run(executor.run(calls, tools))
+
+    # Results come back in call order even though the calls overlapped.
+    assert [m.tool_call_id for m in messages] == ["1", "2", "3"]
+    assert json.loads(messages[0].content) == {"slept": 0.2}
+    events = [(event, name) for event, name, _ in log]
+    assert events[:2] == [("start", "search_providers"), ("start", "get_open_alerts")]
+    # The third call waited for a free slot.
+    assert events.index(("start", "get_provider_by_npi")) > events.index(("end", "search_providers"))
+
+def test_timed_out_call_returns_a_structured_error(monkeypatch):
+    monkeypatch.setenv("AGENT_TOOL_TIMEOUT_SEARCH_PROVIDERS", "0.05")
+    log = []
+    executor = ToolExecutor()
+    tools = {"search_providers": sleeper("search_providers", log), "get_open_alerts": sleeper("get_open_alerts", log)}
+
+    slow, fast = asyncio.run(executor.run([call("search_providers", 5, "1"), call("get_open_alerts", 0, "2")], tools))
+
+    assert slow.status == "error" and slow.tool_call_id == "1"
+    content = json.loads(slow.content)
+    assert content["error"] == "timeout"
+    assert content["tool"] == "search_providers"
+    assert content["timeout_seconds"] == 0.05
+    assert fast.status == "success"
+    assert executor.stats()["timeouts"] == 1
+    # The deadline is visible to the MCP client inside the call.
+    assert 0 < log[0][2] <= 0.05
+
+def test_failures_and_unknown_tools_become_error_messages():
+    async def broken(seconds: float):
+        raise ValueError("bad npi")
+
+    tools = {"get_provider_by_npi": StructuredTool(name="get_provider_by_npi", description="", args_schema=SCHEMA, coroutine=broken)}
+    executor = ToolExecutor()
+    failed, unknown = asyncio.run(executor.run([call("get_provider_by_npi", 0, "1"), call("nope", 0, "2")], tools))
+    assert json.loads(failed.content) == {"error": "ValueError", "tool": "get_provider_by_npi", "message": "bad npi"}
+    assert unknown.status == "error" and "get_provider_by_npi" in unknown.content
+    assert executor.stats()["errors"] == 2
+
+def test_tool_timeouts_come_from_defaults_and_environment(monkeypatch):
+    monkeypatch.delenv("AGENT_TOOL_TIMEOUT_SEARCH_PROVIDERS", raising=False)
+    monkeypatch.delenv("AGENT_TOOL_TIMEOUT_SUMMARIZE_ALERTS", raising=False)
+    monkeypatch.setenv("AGENT_TOOL_TIMEOUT_SECONDS", "12")
+    assert tool_timeout("search_providers") == DEFAULT_TOOL_TIMEOUTS["search_providers"]
+    # Prefixed MCP tool names share the canonical tool's timeout.
+    assert tool_timeout("npi_mcp_search_providers_tool") == DEFAULT_TOOL_TIMEOUTS["search_providers"]
+    assert tool_timeout("summarize_alerts") == 12
+    monkeypatch.setenv("AGENT_TOOL_TIMEOUT_SEARCH_PROVIDERS", "3")
+    monkeypatch.setenv("AGENT_TOOL_TIMEOUT_SUMMARIZE_ALERTS", "4.5")
+    assert tool_timeout("npi_mcp_search_providers_tool") == 3
+    assert tool_timeout("summarize_alerts") == 4.5
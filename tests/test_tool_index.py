@@ -0,0 +1,91 @@
+from types import SimpleNamespace
+
+from credentialwatch_agent import tool_index
+from credentialwatch_agent.tool_index import ANY_SERVER, ToolIndex, canonical_name, tool_aliases
+
+def _tools(*names):
+    return [SimpleNamespace(name=name) for name in names]
+
+def test_server_prefix_is_stripped():
+    assert tool_aliases("cred_db_mcp_list_expiring_credentials") == [("cred_db", "list_expiring_credentials")]
+    assert tool_aliases("alert_log_alert") == [("alert", "log_alert")]
+
+def test_longest_prefix_wins():
+    # "npi_mcp_" is tried before "npi_", so the short name never keeps "mcp_".
+    assert tool_aliases("npi_mcp_run_diagnostics") == [("npi", "run_diagnostics")]
+
+def test_tool_suffix_adds_an_alias():
+    assert tool_aliases("npi_mcp_search_providers_tool") == [
+        ("npi", "search_providers_tool"),
+        ("npi", "search_providers"),
+    ]
+
+def test_unprefixed_names_resolve_under_any_server():
+    assert tool_aliases("summarize_tool") == [(ANY_SERVER, "summarize_tool"), (ANY_SERVER, "summarize")]
+    assert tool_aliases("npi_mcp_") == [("npi", "mcp_")]
+
+def test_canonical_name_is_the_shortest_alias():
+    assert canonical_name("npi_mcp_search_providers_tool") == "search_providers"
+    assert canonical_name("cred_db_mcp_get_provider_snapshot") == "get_provider_snapshot"
+    assert canonical_name("log_alert") == "log_alert"
+
+def test_resolve_by_full_and_short_name():
+    index = ToolIndex(miss_ttl_seconds=60)
+    index.build(_tools("npi_mcp_search_providers_tool", "cred_db_mcp_list_expiring_credentials"))
+    assert index.resolve("npi", "search_providers").name == "npi_mcp_search_providers_tool"
+    assert index.resolve("npi", "search_providers_tool").name == "npi_mcp_search_providers_tool"
+    assert index.resolve("cred_db", "cred_db_mcp_list_expiring_credentials").name == "cred_db_mcp_list_expiring_credentials"
+    assert index.server_of("npi_mcp_search_providers_tool") == "npi"
+    assert len(index) == 2
+
+def test_short_names_are_scoped_to_their_server():
+    index = ToolIndex(miss_ttl_seconds=60)
+    index.build(_tools("cred_db_mcp_get_status", "alert_mcp_get_status"))
+    assert index.resolve("cred_db", "get_status").name == "cred_db_mcp_get_status"
+    assert index.resolve("alert", "get_status").name == "alert_mcp_get_status"
+    assert index.resolve("npi", "get_status") is None
+
+def test_exact_short_name_beats_stripped_tool_suffix():
+    # "x_tool" stripped to "x" collides with a tool really named "x"; the exact one wins in either order.
+    for names in (("npi_mcp_lookup_tool", "npi_mcp_lookup"), ("npi_mcp_lookup", "npi_mcp_lookup_tool")):
+        index = ToolIndex(miss_ttl_seconds=60)
+        index.build(_tools(*names))
+        assert index.resolve("npi", "lookup").name == "npi_mcp_lookup"
+        assert index.resolve("npi", "lookup_tool").name == "npi_mcp_lookup_tool"
+
+def test_first_tool_wins_a_same_name_collision():
+    index = ToolIndex(miss_ttl_seconds=60)
+    index.build(_tools("npi_lookup", "npi_mcp_lookup"))
+    assert index.resolve("npi", "lookup").name == "npi_lookup"
+
+def test_unprefixed_tools_resolve_from_any_server():
+    index = ToolIndex(miss_ttl_seconds=60)
+    index.build(_tools("ping_tool"))
+    assert index.resolve("alert", "ping").name == "ping_tool"
+    assert index.server_of("ping_tool") == ANY_SERVER
+
+def test_miss_expires_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(tool_index.time, "monotonic", lambda: now[0])
+    index = ToolIndex(miss_ttl_seconds=30)
+    index.record_miss("npi", "nope")
+    assert index.is_recent_miss("npi", "nope")
+    assert not index.is_recent_miss("cred_db", "nope")
+    now[0] += 29.9
+    assert index.is_recent_miss("npi", "nope")
+    now[0] += 0.1
+    assert not index.is_recent_miss("npi", "nope")
+    # An expired miss is forgotten, not just reported as expired.
+    now[0] -= 10
+    assert not index.is_recent_miss("npi", "nope")
+
+def test_rebuild_clears_misses():
+    index = ToolIndex(miss_ttl_seconds=300)
+    index.record_miss("npi", "nope")
+    index.build(_tools("npi_mcp_nope"))
+    assert not index.is_recent_miss("npi", "nope")
+    assert index.resolve("npi", "nope").name == "npi_mcp_nope"
+
+def test_miss_ttl_defaults_from_env(monkeypatch):
+    monkeypatch.setenv("MCP_TOOL_MISS_TTL_SECONDS", "12")
+    assert ToolIndex().miss_ttl_seconds == 12
@@ -0,0 +1,121 @@
+import os
+import sys
+import json
+import asyncio
+
+import pytest
+from langchain_core.tools import StructuredTool
+
+from credentialwatch_agent.mcp_client import MCPClient
+from credentialwatch_agent.tool_manifest import MANIFEST_FORMAT, build_manifest, load_manifest, manifest_tools, save_manifest
+
+SERVERS = {
+    "npi": {"transport": "streamable_http", "url": "http://npi.test/mcp", "headers": {"Authorization": "Bearer secret"}},
+    "alert": {"transport": "sse", "url": "http://alert.test/sse"},
+}
+
+def fake_tool(name, description="A tool."):
+    async def call(**arguments):
+        return arguments
+
+    schema = {"type": "object", "properties": {"npi": {"type": "string"}}, "required": ["npi"]}
+    return StructuredTool(name=name, description=description, args_schema=schema, coroutine=call)
+
+TOOLS = {"npi": [fake_tool("get_provider_by_npi")], "alert": [fake_tool("log_alert")]}
+
+def test_manifest_round_trip_keeps_tools_but_not_headers(tmp_path):
+    path = str(tmp_path / "manifest.json")
+    manifest = build_manifest(SERVERS, TOOLS)
+    save_manifest(manifest, path)
+
+    with open(path, encoding="utf-8") as f:
+        assert "secret" not in f.read()
+    loaded = load_manifest(SERVERS, path)
+    assert loaded["etag"] == manifest["etag"]
+    assert loaded["tools"] == manifest["tools"]
+    assert [name for name in os.listdir(tmp_path)] == ["manifest.json"]
+
+def test_only_servers_with_unchanged_endpoints_are_reused(tmp_path):
+    path = str(tmp_path / "manifest.json")
+    save_manifest(build_manifest(SERVERS, TOOLS), path)
+    moved = {**SERVERS, "alert": {"transport": "sse", "url": "http://alert.example/sse"}}
+    assert [spec["name"] for spec in load_manifest(moved, path)["tools"]] == ["get_provider_by_npi"]
+    everything_moved = {name: {**server, "url": "http://elsewhere/mcp"} for name, server in SERVERS.items()}
+    assert load_manifest(everything_moved, path) is None
+
+def test_unusable_manifests_are_ignored(tmp_path):
+    path = tmp_path / "manifest.json"
+    assert load_manifest(SERVERS, str(path)) is None
+    path.write_text("{not json")
+    assert load_manifest(SERVERS, str(path)) is None
+    path.write_text(json.dumps({**build_manifest(SERVERS, TOOLS), "format": MANIFEST_FORMAT + 1}))
+    assert load_manifest(SERVERS, str(path)) is None
+
+def test_manifest_tools_are_callable_before_the_server_was_listed(tmp_path):
+    from mcp.shared.memory import create_connected_server_and_client_session
+    from langchain_mcp_adapters.tools import load_mcp_tools
+    from credentialwatch_agent.local_servers.servers import FaultProfile, build_npi_server
+    from credentialwatch_agent.local_servers.synthetic import SyntheticDataset
+
+    async def listed_tools():
+        server = build_npi_server(SyntheticDataset(50, seed=7), FaultProfile())
+        async with create_connected_server_and_client_session(server) as session:
+            return await load_mcp_tools(session, server_name="npi")
+
+    tools = asyncio.run(listed_tools())
+    path = str(tmp_path / "manifest.json")
+    save_manifest(build_manifest({"npi": {"transport": "stdio", "url": None}}, {"npi": tools}), path)
+
+    source = os.path.join(os.path.dirname(__file__), os.pardir, "src")
+    connection = {
+        "transport": "stdio",
+        "command": sys.executable,
+        "args": ["-m", "credentialwatch_agent.cli", "local-servers", "--stdio", "npi", "--providers", "50", "--seed", "7"],
+        "env": {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, (source, os.getenv("PYTHONPATH"))))},
+    }
+    rebuilt = manifest_tools(load_manifest({"npi": {"transport": "stdio", "url": None}}, path), {"npi": connection})["npi"]
+
+    assert [(t.name, t.description, t.args_schema) for t in rebuilt] == [(t.name, t.description, t.args_schema) for t in tools]
+    search = next(t for t in rebuilt if "search_providers" in t.name)
+    result = asyncio.run(asyncio.wait_for(search.ainvoke({"query": "a", "limit": 2}), 60))
+    assert result
+
+class FakeSession:
+    def __init__(self, tools):
+        self.tools = tools
+
+    async def load_tools(self, reload=False):
+        return self.tools
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setenv("MCP_MANIFEST_PATH", str(tmp_path / "manifest.json"))
+    monkeypatch.setenv("MCP_MANIFEST_CACHE", "true")
+    client = MCPClient()
+    # As connect() leaves it after serving the npi tools from a cached manifest.
+    client._servers = {"npi": SERVERS["npi"]}
+    client._server_tools = {"npi": TOOLS["npi"]}
+    client._set_tools(TOOLS["npi"])
+    client._manifest_etag = build_manifest(client._servers, client._server_tools)["etag"]
+    return client
+
+def test_revalidation_keeps_an_unchanged_manifest(client):
+    version = client.tools_version
+    client._sessions = {"npi": FakeSession([fake_tool("get_provider_by_npi")])}
+    asyncio.run(client._revalidate_manifest(["npi"]))
+    assert client.startup_stats()["revalidation"] == "unchanged"
+    assert client.tools_version == version
+
+def test_etag_mismatch_replaces_the_cached_tools(client):
+    version = client.tools_version
+    cached_etag = client._manifest_etag
+    client._sessions = {"npi": FakeSession([fake_tool("get_provider_by_npi", "Looks up one provider by NPI.")])}
+    asyncio.run(client._revalidate_manifest(["npi"]))
+
+    assert client.startup_stats()["revalidation"] == "changed"
+    assert client._manifest_etag != cached_etag
+    # Same tool names, new schema or description: graphs bound to the old tools must be rebuilt.
+    assert client.tools_version == version + 1
+    assert client._tools["get_provider_by_npi"].description == "Looks up one provider by NPI."
+    saved = load_manifest(client._servers)
+    assert saved["etag"] == client._manifest_etag